@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from config.instrumentation import timed_phase
+from config.shards import activate_client
+
+
+# Claims ajoutés au jeton par TenantTokenObtainPairSerializer
+CLIENT_ID_CLAIM = 'client_id'
+IS_STAFF_CLAIM = 'is_staff'
+IS_SUPERUSER_CLAIM = 'is_superuser'
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+def token_version_cache_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def publish_token_version(user_id, version):
+    # cache local à chaque processus : une révocation faite ailleurs est vue
+    # au plus tard après TOKEN_VERSION_CACHE_SECONDS
+    cache.set(token_version_cache_key(user_id), version, getattr(settings, 'TOKEN_VERSION_CACHE_SECONDS', 30))
+
+
+def current_token_version(user_id):
+    """
+    Version courante des jetons de l'utilisateur, lue en base (celle de la
+    requête) quand le cache ne l'a pas : un jeton n'est jamais accepté sans
+    que sa version ait été vérifiée.
+    """
+    version = cache.get(token_version_cache_key(user_id))
+    if version is None:
+        version = get_user_model()._base_manager.filter(id=user_id, is_active=True).values_list(
+            'token_version', flat=True,
+        ).first()
+        if version is None:
+            raise AuthenticationFailed("Utilisateur introuvable.", code='user_not_found')
+        publish_token_version(user_id, version)
+    return version
+
+
+def bump_token_version(user):
+    """
+    Invalide tous les jetons déjà émis pour l'utilisateur, à appeler quand un
+    claim du jeton (is_staff, is_superuser...) n'est plus à jour.
+    """
+    user.token_version += 1
+    user.save(update_fields=['token_version'])
+    publish_token_version(user.id, user.token_version)
+
+
+class TenantUser(SimpleLazyObject):
+    """
+    Utilisateur construit à partir des claims du jeton. id, client_id, is_staff
+    et is_superuser sont lus dans le jeton ; tout autre accès (assignation à une
+    clé étrangère, username, client...) charge l'utilisateur en base une seule fois.
+    """
+
+    def __init__(self, validated_token, loader):
+        super().__init__(loader)
+        self.__dict__['_token'] = validated_token
+
+    @property
+    def id(self):
+        return int(self._token[api_settings.USER_ID_CLAIM])
+
+    pk = id
+
+    @property
+    def client_id(self):
+        return self._token[CLIENT_ID_CLAIM]
+
+    @property
+    def is_staff(self):
+        return self._token[IS_STAFF_CLAIM]
+
+    @property
+    def is_superuser(self):
+        return self._token[IS_SUPERUSER_CLAIM]
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    Authentification JWT sans lecture de la table des utilisateurs quand le
+    jeton porte les claims du client, qui désignent aussi la base de la
+    requête (config.shards). Les jetons émis avant l'ajout de ces claims sont
+    traités comme par JWTAuthentication, sur default.
+    """
+
+    def authenticate(self, request):
+        with timed_phase('auth'):
+            header = self.get_header(request)
+            if header is None:
+                return None
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+            validated_token = self.get_validated_token(raw_token)
+            # la suite de la requête, version du jeton comprise, lit et écrit
+            # dans la base du client
+            activate_client(validated_token.get(CLIENT_ID_CLAIM), request.method)
+            return self.get_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        if CLIENT_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+            version = validated_token[TOKEN_VERSION_CLAIM]
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken("Le jeton ne contient pas d'identification utilisateur valide.")
+
+        if current_token_version(user_id) != version:
+            raise AuthenticationFailed("Jeton révoqué.", code='token_revoked')
+
+        def load_user():
+            try:
+                user = self.user_model.objects.get(id=user_id)
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed("Utilisateur introuvable.", code='user_not_found')
+            if not user.is_active or user.token_version != version:
+                raise AuthenticationFailed("Jeton révoqué.", code='token_revoked')
+            return user
+
+        return TenantUser(validated_token, load_user)
@@ -2,22 +2,23 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.exceptions import ValidationError
 from client.models import Client
+from client.resolver import domain_resolver
 
 
 class CustomUserManager(UserManager):
 
     def _assign_client_by_email(self, email):
+        # le résolveur garde les domaines en mémoire : pas de requête en régime établi
         if email and "@" in email:
-            domain = email.split('@')[-1].lower()
-            try:
-                return Client.objects.get(domain=domain)
-            except Client.DoesNotExist:
+            client_id = domain_resolver.resolve(email)
+            if client_id is None:
                 raise ValidationError("Ce domaine d'email n'est rattaché à aucun client.")
+            return client_id
         return None
 
     def create_user(self, username, email=None, password=None, **extra_fields):
-        client = self._assign_client_by_email(email)
-        extra_fields.setdefault('client', client)
+        if 'client' not in extra_fields:
+            extra_fields.setdefault('client_id', self._assign_client_by_email(email))
         
         return super().create_user(username, email, password, **extra_fields)
 
@@ -32,6 +33,8 @@ class User(AbstractUser):
         on_delete=models.CASCADE,
         related_name="users",
     )
+    # incrémenté pour invalider les jetons déjà émis (voir authentication.authentication)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
     # En Django, REQUIRED_FIELDS ne sert que pour la commande createsuperuser dans le terminal.
     REQUIRED_FIELDS = ['date_birth']
 
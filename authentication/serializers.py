@@ -1,18 +1,68 @@
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from authentication.models import User
 from support.models import Project, ProjectContributors, Issue, Comment
+from support.access import get_project_access, invalidate_project_access
 from authentication.validators import MinAgeValidator
+from authentication.authentication import (
+    CLIENT_ID_CLAIM,
+    IS_STAFF_CLAIM,
+    IS_SUPERUSER_CLAIM,
+    TOKEN_VERSION_CLAIM,
+    publish_token_version,
+)
 
-from client.models import Client
+from client.resolver import domain_resolver
+from config.shards import client_shard, sharding_enabled, user_shard, using_shard
 
 from datetime import date
 
 UserModel = get_user_model()
 
 
+class TenantTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # Les claims ajoutés permettent à TenantJWTAuthentication d'autoriser
+    # les lectures sans charger l'utilisateur.
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[CLIENT_ID_CLAIM] = user.client_id
+        token[IS_STAFF_CLAIM] = user.is_staff
+        token[IS_SUPERUSER_CLAIM] = user.is_superuser
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        # évite la lecture de la version en base aux premières requêtes
+        publish_token_version(user.id, user.token_version)
+        return token
+
+    def validate(self, attrs):
+        # l'utilisateur est cherché dans la base de son client (config.shards)
+        with using_shard(user_shard(attrs.get(self.username_field))):
+            return super().validate(attrs)
+
+
+class TenantTokenRefreshSerializer(TokenRefreshSerializer):
+    # Le rafraîchissement est rare : on vérifie ici en base que la version du
+    # jeton est toujours la bonne avant d'émettre un nouveau jeton d'accès.
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        with using_shard(client_shard(refresh.payload.get(CLIENT_ID_CLAIM))):
+            if TOKEN_VERSION_CLAIM in refresh.payload:
+                is_current = UserModel.objects.filter(
+                    id=refresh.payload.get('user_id'),
+                    token_version=refresh.payload[TOKEN_VERSION_CLAIM],
+                ).exists()
+                if not is_current:
+                    raise AuthenticationFailed("Jeton révoqué.", code='token_revoked')
+            return super().validate(attrs)
+
+
 class UserInputSerializer(serializers.ModelSerializer):
     # Avec ModelSerializer, le check "username unique" est ajouté automatiquement par
     # Django REST Framework car il lit les contraintes du modèle.
@@ -43,15 +93,23 @@ class UserInputSerializer(serializers.ModelSerializer):
         }
 
 
+    def validate_username(self, value):
+        # le contrôle d'unicité du modèle ne lit que la base courante
+        if sharding_enabled() and user_shard(value) is not None:
+            raise serializers.ValidationError("Un utilisateur avec ce nom existe déjà.")
+        return value
+
     def validate_email(self, value):
-        domain = value.split('@')[-1].lower()
-        if not Client.objects.filter(domain=domain).exists():
+        if domain_resolver.resolve(value) is None:
             raise serializers.ValidationError("Domaine non autorisé.")
         return value
     
     def create(self, validated_data):
-            # On appelle explicitement create_user du manager
-            return UserModel.objects.create_user(**validated_data)
+            client_id = domain_resolver.resolve(validated_data.get('email'))
+            # l'utilisateur est créé dans la base de son client
+            with using_shard(client_shard(client_id)):
+                # On appelle explicitement create_user du manager
+                return UserModel.objects.create_user(client_id=client_id, **validated_data)
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
@@ -96,7 +154,7 @@ class ChangeProjectAuthorSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and request.user:
             self.fields['author'].queryset = User.objects.filter(
-                client=request.user.client
+                client_id=request.user.client_id
             )
 
 
@@ -140,6 +198,8 @@ class AddProjectContributorSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectContributors
         fields = ["contributor", "project"]
+        # l'unicité (contributor, project) est contrôlée dans validate avec un message explicite
+        validators = []
 
 
     def validate(self, data):
@@ -153,19 +213,19 @@ class AddProjectContributorSerializer(serializers.ModelSerializer):
             contributor_id = request.data.get('contributor')
             user = request.user
 
+        access = get_project_access(request)
+
         # Le projet doit exister dans les projets du client
-        existing_project = Project.objects.filter(
-            author__client=user.client,
+        # (seul le staff peut viser un projet qui n'est pas dans son index)
+        existing_project = access.is_known(project_id) or (user.is_staff and Project.objects.filter(
+            author__client_id=user.client_id,
             id=project_id,
-        ).exists()
+        ).exists())
         if not existing_project :
             raise serializers.ValidationError("Référence projet incorrecte.")
         
         # L'utilisateur doit être auteur du projet ou membre du staff
-        is_author = Project.objects.filter(
-            id=project_id,
-            author=user,
-        ).exists()
+        is_author = access.is_author(project_id)
         if not is_author and not user.is_staff:
             raise serializers.ValidationError("L'utilisateur n'est pas auteur du projet.")
             
@@ -179,7 +239,7 @@ class AddProjectContributorSerializer(serializers.ModelSerializer):
 
         # Le contributeur doit être un utilisateur du client
         existing_user = User.objects.filter(
-            client=user.client,
+            client_id=user.client_id,
             id=contributor_id,
         ).exists()
         if not existing_user :
@@ -194,6 +254,8 @@ class DeleteProjectContributorSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectContributors
         fields = ["contributor", "project"]
+        # l'unicité (contributor, project) est contrôlée dans validate avec un message explicite
+        validators = []
 
     
     def validate(self, data):
@@ -208,8 +270,8 @@ class DeleteProjectContributorSerializer(serializers.ModelSerializer):
             user = request.user
 
         # Le projet doit exister dans les projets du client
-        existing_project = Project.objects.filter(
-            author__client=user.client,
+        existing_project = get_project_access(request).is_known(project_id) or Project.objects.filter(
+            author__client_id=user.client_id,
             id=project_id,
         ).exists()
         if not existing_project :
@@ -233,15 +295,124 @@ class DeleteProjectContributorSerializer(serializers.ModelSerializer):
         return data
     
 
+class ProjectContributorsBatchSerializer(serializers.Serializer):
+    # Lot de (projets x contributeurs) : chaque table est lue une seule fois
+    # et les références sont contrôlées par opérations d'ensembles
+
+    projects = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=100)
+    contributors = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+
+    def validate(self, data):
+
+        request = self.context.get('request')
+
+        if not request:
+            raise serializers.ValidationError("Object request manquant.")
+        user = request.user
+        project_ids = set(data['projects'])
+        contributor_ids = set(data['contributors'])
+
+        # Les projets doivent exister dans les projets actifs du client
+        authors = dict(Project.objects.filter(
+            author__client_id=user.client_id,
+            is_active=True,
+            id__in=project_ids,
+        ).values_list('id', 'author_id'))
+        unknown_projects = project_ids - authors.keys()
+        if unknown_projects:
+            raise serializers.ValidationError({"projects": f"Références projet incorrectes : {sorted(unknown_projects)}."})
+
+        # L'utilisateur doit être auteur de tous les projets ou membre du staff
+        not_authored = {project_id for project_id, author_id in authors.items() if author_id != user.id}
+        if not_authored and not user.is_staff:
+            raise serializers.ValidationError({"projects": f"L'utilisateur n'est pas auteur des projets {sorted(not_authored)}."})
+
+        # Les contributeurs doivent être des utilisateurs du client
+        known_users = set(User.objects.filter(
+            client_id=user.client_id,
+            id__in=contributor_ids,
+        ).values_list('id', flat=True))
+        unknown_users = contributor_ids - known_users
+        if unknown_users:
+            raise serializers.ValidationError({"contributors": f"Références contributeur incorrectes : {sorted(unknown_users)}."})
+
+        data['projects'] = project_ids
+        data['contributors'] = contributor_ids
+        return data
+
+    def existing_links(self, project_ids, contributor_ids=None):
+        links = ProjectContributors.objects.filter(project_id__in=project_ids)
+        if contributor_ids is not None:
+            links = links.filter(contributor_id__in=contributor_ids)
+        return set(links.values_list('project_id', 'contributor_id'))
+
+
+class AddProjectContributorsSerializer(ProjectContributorsBatchSerializer):
+
+    def create(self, validated_data):
+        project_ids = validated_data['projects']
+        contributor_ids = validated_data['contributors']
+        existing = self.existing_links(project_ids, contributor_ids)
+        links = [
+            ProjectContributors(project_id=project_id, contributor_id=contributor_id)
+            for project_id in sorted(project_ids)
+            for contributor_id in sorted(contributor_ids)
+            if (project_id, contributor_id) not in existing
+        ]
+        # ignore_conflicts : un lien ajouté entre-temps n'annule pas le lot
+        ProjectContributors.objects.bulk_create(links, ignore_conflicts=True)
+        # bulk_create n'envoie pas post_save
+        invalidate_project_access(contributor_ids)
+        return {"added": len(links), "skipped": len(existing)}
+
+
+class DeleteProjectContributorsSerializer(ProjectContributorsBatchSerializer):
+
+    def validate(self, data):
+        data = super().validate(data)
+
+        # Aucun projet ne doit perdre son dernier contributeur
+        members = {}
+        for project_id, contributor_id in self.existing_links(data['projects']):
+            members.setdefault(project_id, set()).add(contributor_id)
+        emptied = sorted(
+            project_id for project_id in data['projects']
+            if not members.get(project_id, set()) - data['contributors']
+        )
+        if emptied:
+            raise serializers.ValidationError(f"Impossible de supprimer le dernier contributeur des projets {emptied}.")
+
+        # liens réellement supprimés, pour les traces de synchronisation
+        data['removed_links'] = sorted(
+            (project_id, contributor_id)
+            for project_id in data['projects']
+            for contributor_id in members.get(project_id, set()) & data['contributors']
+        )
+        return data
+
+    def delete(self):
+        ProjectContributors.objects.filter(
+            project_id__in=self.validated_data['projects'],
+            contributor_id__in=self.validated_data['contributors'],
+        ).delete()
+        return {"removed": len(self.validated_data['removed_links'])}
+
+
 class ChangeIssuetAttributionSerializer(serializers.ModelSerializer):
 
     attribution = serializers.PrimaryKeyRelatedField(queryset=User.objects.none())
 
 
     class Meta:
-        model = Project
+        model = Issue
         fields = ['attribution']
 
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        issue = self.instance
+        self.fields['attribution'].queryset = issue.project.contributors.all()
+
     def validate(self, data):
 
         request = self.context.get('request')
@@ -249,7 +420,7 @@ class ChangeIssuetAttributionSerializer(serializers.ModelSerializer):
         if not request:
             raise serializers.ValidationError("Object request manquant.")
         else:
-            project = self.instance
+            project = self.instance.project
             attribution_id = request.data.get('attribution')
         
         # L'utilisateur a qui est attribué le projet doit être contributeur du projet
@@ -260,6 +431,8 @@ class ChangeIssuetAttributionSerializer(serializers.ModelSerializer):
         if not existing_contributor :
             raise serializers.ValidationError("Utilisateur attribué non associé au projet.")
 
+        return data
+
 
 class UpgradeUserSerializer(serializers.ModelSerializer):
 
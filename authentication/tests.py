@@ -1,3 +1,197 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from authentication.authentication import bump_token_version
+from support.tests import create_client, create_user, create_project
+
+
+class TenantJWTAuthenticationTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        create_project(cls.alicia, "GeoNode")
+
+    def setUp(self):
+        cache.clear()
+
+    def obtain_access_token(self):
+        response = self.client.post(reverse("token_obtain_pair"), {"username": "Alicia", "password": "pwd_2026"})
+        return response.data["access"]
+
+    def test_access_token_carries_tenant_claims(self):
+        token = AccessToken(self.obtain_access_token())
+
+        self.assertEqual(token["client_id"], self.client_company.id)
+        self.assertFalse(token["is_staff"])
+        self.assertFalse(token["is_superuser"])
+        self.assertEqual(token["token_version"], 0)
+
+    def test_read_endpoint_does_not_load_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.obtain_access_token()}")
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("project-list"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+        user_queries = [q for q in captured.captured_queries if 'FROM "authentication_user"' in q["sql"]]
+        self.assertEqual(user_queries, [])
+
+    def test_write_endpoint_loads_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.obtain_access_token()}")
+
+        response = self.client.post(reverse("admin_project-list"), {"name": "Leaflet", "type": "Android"})
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_bumped_version_revokes_token(self):
+        access = self.obtain_access_token()
+        bump_token_version(self.alicia)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        response = self.client.get(reverse("project-list"))
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_bumped_version_revokes_token_on_read_without_cache(self):
+        access = self.obtain_access_token()
+        bump_token_version(self.alicia)
+        # autre processus : version absente de son cache
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        response = self.client.get(reverse("project-list"))
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_bumped_version_revokes_token_on_user_load_without_cache(self):
+        access = self.obtain_access_token()
+        bump_token_version(self.alicia)
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        response = self.client.post(reverse("admin_project-list"), {"name": "Leaflet", "type": "Android"})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_is_refused_after_bump(self):
+        response = self.client.post(reverse("token_obtain_pair"), {"username": "Alicia", "password": "pwd_2026"})
+        bump_token_version(self.alicia)
+
+        response = self.client.post(reverse("token_refresh"), {"refresh": response.data["refresh"]})
+
+        self.assertEqual(response.status_code, 401)
+
+
+class ProjectContributorViewsTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode")
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def test_add_contributor(self):
+        data = {"project": self.project.id, "contributor": self.bob.id}
+
+        response = self.client.post(reverse("project_add_contributor"), data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.project.contributors.filter(id=self.bob.id).exists())
+
+    def test_add_existing_contributor_keeps_explicit_message(self):
+        data = {"project": self.project.id, "contributor": self.alicia.id}
+
+        response = self.client.post(reverse("project_add_contributor"), data)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["non_field_errors"], ["Contributeur déjà associé au projet."])
+
+    def test_delete_contributor(self):
+        self.project.contributors.add(self.bob)
+        data = {"project": self.project.id, "contributor": self.bob.id}
+
+        response = self.client.delete(reverse("project_delete_contributor"), data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.project.contributors.filter(id=self.bob.id).exists())
+
+
+class ProjectContributorsBatchViewsTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.department = [create_user(f"Agent {i}", cls.client_company) for i in range(30)]
+        cls.esri = create_client("Esri France", "esri.fr")
+        cls.andre = create_user("Andre", cls.esri)
+        cls.projects = [create_project(cls.alicia, f"Projet {i}") for i in range(3)]
+        cls.bob_project = create_project(cls.bob, "Carto")
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def body(self, projects=None, contributors=None):
+        return {
+            "projects": [project.id for project in projects or self.projects],
+            "contributors": [user.id for user in contributors or self.department],
+        }
+
+    def test_add_contributors_uses_constant_queries(self):
+        self.projects[0].contributors.add(self.department[0])
+
+        # projets, utilisateurs, liens existants, insertion, version des projets
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse("project_add_contributors"), self.body(), format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["added"], 89)
+        self.assertEqual(response.data["skipped"], 1)
+        for project in self.projects:
+            self.assertEqual(project.contributors.count(), 31)
+
+    def test_add_contributors_rejects_foreign_references(self):
+        cases = [
+            self.body(contributors=[self.bob, self.andre]),
+            self.body(projects=[self.projects[0], self.bob_project]),
+        ]
+        for body in cases:
+            response = self.client.post(reverse("project_add_contributors"), body, format="json")
+            self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.projects[0].contributors.count(), 1)
+
+    def test_delete_contributors(self):
+        for project in self.projects:
+            project.contributors.add(*self.department)
+
+        response = self.client.delete(reverse("project_delete_contributors"), self.body(), format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["removed"], 90)
+        for project in self.projects:
+            self.assertEqual(list(project.contributors.all()), [self.alicia])
+
+    def test_delete_contributors_keeps_last_contributor(self):
+        self.projects[0].contributors.add(self.bob)
+
+        response = self.client.delete(
+            reverse("project_delete_contributors"),
+            self.body(contributors=[self.alicia, self.bob]),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.projects[0].contributors.count(), 2)
@@ -6,6 +6,7 @@ from rest_framework.exceptions import (
 )
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
 from django.shortcuts import get_object_or_404
 
@@ -21,6 +22,8 @@ from authentication.serializers import (
     ChangeProjectAuthorSerializer,
     AddProjectContributorSerializer,
     DeleteProjectContributorSerializer,
+    AddProjectContributorsSerializer,
+    DeleteProjectContributorsSerializer,
     ChangeIssuetAttributionSerializer,
     UserUpdateSerializer,
     ChangeIssueAuthorSerializer,
@@ -28,7 +31,10 @@ from authentication.serializers import (
     UpgradeUserSerializer,
 )
 
-from support.models import Project, Issue, ProjectContributors, Comment
+from authentication.authentication import bump_token_version
+from support.versions import touch, touch_user
+from support.models import Project, Issue, ProjectContributors, Comment, Tombstone
+from support.sync import record_deletions
 
 UserModel = get_user_model()
 
@@ -60,7 +66,12 @@ class UserUpdateView(APIView):
         )
         
         if serializer.is_valid():
-            serializer.save()
+            if 'username' in serializer.validated_data:
+                with transaction.atomic():
+                    serializer.save()
+                    touch_user(user.id)
+            else:
+                serializer.save()
             return Response(
                 {"detail": f"Utilisateur modifié."},
                 status=status.HTTP_200_OK
@@ -95,6 +106,7 @@ class UserDeleteView(APIView):
         if remaining_project_contributor:
             raise ValidationError({"detail": "Cet utilisateur est encore contributeur d'au moins un projet."})
         
+        # vérifié ci-dessus : aucune lecture n'affiche plus son nom, rien à invalider
         user.delete()
 
         return Response(
@@ -128,6 +140,7 @@ class ProjectChangeAuthorView(APIView):
             # si le nouvel auteur n'est pas contributeur du projet, on l'ajoute aux contributeurs
             if not is_contributor:
                 project.contributors.add(request.user)
+            touch(project_ids=[project.id])
 
             return Response(
                 {"detail": f"Propriété transférée avec succès à {project.author.username}"},
@@ -156,6 +169,7 @@ class IssueChangeAuthorView(APIView):
 
         if serializer.is_valid():
             serializer.save()
+            touch(project_ids=[issue.project_id])
             return Response(
                 {"detail": f"Propriété transférée avec succès à {issue.author.username}"},
                 status=status.HTTP_200_OK
@@ -180,6 +194,7 @@ class CommentChangeAuthorView(APIView):
 
         if serializer.is_valid():
             serializer.save()
+            touch(project_ids=[comment.issue.project_id], issue_ids=[comment.issue_id])
             return Response(
                 {"detail": f"Propriété transférée avec succès à {comment.author.username}"},
                 status=status.HTTP_200_OK
@@ -201,6 +216,7 @@ class ProjectAddContributorView(APIView):
         
         if serializer.is_valid():
             serializer.save()
+            touch(project_ids=[serializer.validated_data['project'].id])
             return Response(
                 {"detail": f"Contributeur ajouté avec succés."},
                 status=status.HTTP_200_OK
@@ -221,10 +237,15 @@ class ProjectDeleteContributorView(APIView):
         )
         
         if serializer.is_valid():
-            ProjectContributors.objects.filter(
-                project_id=serializer.validated_data['project'],
-                contributor_id=serializer.validated_data['contributor'],
-            ).delete()
+            project = serializer.validated_data['project']
+            contributor = serializer.validated_data['contributor']
+            with transaction.atomic():
+                ProjectContributors.objects.filter(
+                    project_id=project,
+                    contributor_id=contributor,
+                ).delete()
+                record_deletions(Tombstone.Kind.CONTRIBUTOR, [(contributor.id, project.id, contributor.id)])
+                touch(project_ids=[project.id])
 
             return Response(
                 {"detail": f"Contributeur supprimé avec succés."},
@@ -234,6 +255,56 @@ class ProjectDeleteContributorView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
+class ProjectAddContributorsView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+
+        serializer = AddProjectContributorsSerializer(
+            data=request.data,
+            context={'request': request}
+        )
+
+        if serializer.is_valid():
+            result = serializer.save()
+            touch(project_ids=serializer.validated_data['projects'])
+            return Response(
+                {"detail": "Contributeurs ajoutés avec succés.", **result},
+                status=status.HTTP_200_OK
+            )
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProjectDeleteContributorsView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request):
+
+        # le contrôle du dernier contributeur et la suppression voient les mêmes liens
+        with transaction.atomic():
+            serializer = DeleteProjectContributorsSerializer(
+                data=request.data,
+                context={'request': request}
+            )
+
+            if serializer.is_valid():
+                result = serializer.delete()
+                record_deletions(Tombstone.Kind.CONTRIBUTOR, [
+                    (contributor_id, project_id, contributor_id)
+                    for project_id, contributor_id in serializer.validated_data['removed_links']
+                ])
+                touch(project_ids=serializer.validated_data['projects'])
+                return Response(
+                    {"detail": "Contributeurs supprimés avec succés.", **result},
+                    status=status.HTTP_200_OK
+                )
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 class IssueChangeAttributionView(APIView):
     
     permission_classes = [IsAuthenticated, IsObjectAuthor]
@@ -250,6 +321,7 @@ class IssueChangeAttributionView(APIView):
         
         if serializer.is_valid():
             serializer.save()
+            touch(project_ids=[issue.project_id])
             return Response(
                 {"detail": f"Atttribution transférée avec succès à {issue.attribution.username}"},
                 status=status.HTTP_200_OK
@@ -273,6 +345,8 @@ class UserUpgradeView(APIView):
 
         if serializer.is_valid():
             serializer.save()
+            # le claim is_staff des jetons déjà émis n'est plus à jour
+            bump_token_version(user)
             return Response(
                 {"detail": f"L'utilisateur {user.username} fait maintenant partie du staff"},
                 status=status.HTTP_200_OK
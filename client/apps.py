@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ClientConfig(AppConfig):
     name = "client"
+
+    def ready(self):
+        # enregistre les receivers de signaux
+        from client import signals  # noqa: F401
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("client", "0002_client_domain"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="client",
+            name="domain",
+            field=models.CharField(db_index=True, max_length=128),
+        ),
+    ]
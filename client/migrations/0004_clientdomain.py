@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("client", "0003_alter_client_domain"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClientDomain",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("domain", models.CharField(max_length=128, unique=True)),
+                (
+                    "client",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="extra_domains",
+                        to="client.client",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("client", "0004_clientdomain"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="client",
+            name="shard",
+            field=models.CharField(default="default", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="client",
+            name="moving",
+            field=models.BooleanField(default=False),
+        ),
+    ]
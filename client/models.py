@@ -5,4 +5,21 @@ class Client(models.Model):
     name = models.CharField(max_length=128)
     description = models.CharField(max_length=2048, blank=True)
     time_created = models.DateTimeField(auto_now_add=True)
-    domain = models.CharField(max_length=128)
+    # recherché à chaque inscription pour rattacher l'utilisateur à son client
+    domain = models.CharField(max_length=128, db_index=True)
+    # alias de DATABASES qui porte les données du client (config.shards)
+    shard = models.CharField(max_length=64, default="default")
+    # écritures refusées pendant un déplacement vers une autre base (move_client)
+    moving = models.BooleanField(default=False)
+
+
+class ClientDomain(models.Model):
+    # Domaines supplémentaires d'un client (rachats, filiales...).
+    # Les sous-domaines (eu.corp.com) sont rattachés au client de corp.com
+    # par client.resolver, il n'est pas nécessaire de les déclarer ici.
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name="extra_domains",
+    )
+    domain = models.CharField(max_length=128, unique=True)
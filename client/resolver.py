@@ -0,0 +1,82 @@
+import threading
+import time
+
+from django.conf import settings
+
+from client.models import Client, ClientDomain
+
+
+class DomainTrie:
+    """
+    Arbre des domaines indexé par labels inversés : corp.com est rangé sous
+    com -> corp. Une recherche retourne le client du plus long suffixe connu,
+    eu.corp.com est donc résolu vers le client de corp.com.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, domain, client_id):
+        node = self.root
+        for label in reversed(domain.lower().strip('.').split('.')):
+            node = node.setdefault(label, {})
+        node[None] = client_id
+
+    def lookup(self, domain):
+        node = self.root
+        client_id = None
+        for label in reversed(domain.lower().strip('.').split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            client_id = node.get(None, client_id)
+        return client_id
+
+
+class DomainResolver:
+    """
+    Cache en mémoire du processus des domaines de tous les clients. L'arbre est
+    construit au premier appel (deux requêtes), vidé par les signaux de Client
+    et ClientDomain, et reconstruit au plus tard après CLIENT_DOMAIN_RESOLVER_TTL
+    secondes pour prendre en compte les écritures faites par d'autres processus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trie = None
+        self._built_at = 0
+
+    def _build(self):
+        trie = DomainTrie()
+        for client_id, domain in Client.objects.values_list('id', 'domain'):
+            trie.add(domain, client_id)
+        for client_id, domain in ClientDomain.objects.values_list('client_id', 'domain'):
+            trie.add(domain, client_id)
+        return trie
+
+    def _get_trie(self):
+        ttl = getattr(settings, 'CLIENT_DOMAIN_RESOLVER_TTL', 300)
+        trie = self._trie
+        if trie is not None and time.monotonic() - self._built_at < ttl:
+            return trie
+        with self._lock:
+            if self._trie is None or time.monotonic() - self._built_at >= ttl:
+                self._trie = self._build()
+                self._built_at = time.monotonic()
+            return self._trie
+
+    def invalidate(self):
+        with self._lock:
+            self._trie = None
+
+    def resolve(self, email_or_domain):
+        """Retourne l'id du client rattaché au domaine (ou à l'email), None sinon."""
+        if not email_or_domain:
+            return None
+        domain = email_or_domain.split('@')[-1]
+        if not domain:
+            return None
+        return self._get_trie().lookup(domain)
+
+
+domain_resolver = DomainResolver()
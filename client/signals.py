@@ -0,0 +1,23 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from client.models import Client, ClientDomain
+from client.resolver import domain_resolver
+from config.shards import copy_client, shard_aliases, shard_map
+
+
+@receiver([post_save, post_delete], sender=Client)
+@receiver([post_save, post_delete], sender=ClientDomain)
+def invalidate_domain_resolver(sender, **kwargs):
+    domain_resolver.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Client)
+def invalidate_shard_map(sender, instance, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    shard_map.invalidate()
+    # copie du client dans sa base, à jour à chaque enregistrement
+    if kwargs['signal'] is post_save and instance.shard != DEFAULT_DB_ALIAS and instance.shard in shard_aliases():
+        copy_client(instance, instance.shard)
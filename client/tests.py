@@ -1,3 +1,93 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from client.models import Client, ClientDomain
+from client.resolver import DomainTrie, domain_resolver
+
+
+class ClientQueryPlanTest(TestCase):
+
+    def test_domain_lookup_uses_index(self):
+        plan = Client.objects.filter(domain="meridien.fr").explain()
+
+        self.assertIn("SEARCH client_client USING INDEX client_client_domain_", plan)
+
+
+class DomainTrieTest(TestCase):
+
+    def setUp(self):
+        self.trie = DomainTrie()
+        self.trie.add("corp.com", 1)
+        self.trie.add("labs.corp.com", 2)
+
+    def test_exact_domain(self):
+        self.assertEqual(self.trie.lookup("corp.com"), 1)
+
+    def test_subdomain_maps_to_parent(self):
+        self.assertEqual(self.trie.lookup("eu.corp.com"), 1)
+
+    def test_longest_suffix_wins(self):
+        self.assertEqual(self.trie.lookup("paris.labs.corp.com"), 2)
+
+    def test_lookup_is_case_insensitive(self):
+        self.assertEqual(self.trie.lookup("EU.Corp.COM"), 1)
+
+    def test_unknown_domain(self):
+        self.assertIsNone(self.trie.lookup("com"))
+        self.assertIsNone(self.trie.lookup("notcorp.com"))
+
+
+class DomainResolverTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.meridien = Client.objects.create(name="Meridien", domain="meridien.fr")
+
+    def setUp(self):
+        domain_resolver.invalidate()
+
+    def test_extra_domain_and_subdomain(self):
+        ClientDomain.objects.create(client=self.meridien, domain="meridien.io")
+
+        self.assertEqual(domain_resolver.resolve("alicia@meridien.io"), self.meridien.id)
+        self.assertEqual(domain_resolver.resolve("bob@eu.meridien.fr"), self.meridien.id)
+        self.assertIsNone(domain_resolver.resolve("carla@esri.fr"))
+
+    def test_client_changes_invalidate_resolver(self):
+        self.assertIsNone(domain_resolver.resolve("andre@esri.fr"))
+
+        esri = Client.objects.create(name="Esri France", domain="esri.fr")
+
+        self.assertEqual(domain_resolver.resolve("andre@esri.fr"), esri.id)
+
+    def test_signup_does_not_query_clients(self):
+        domain_resolver.resolve("meridien.fr")
+        data = {
+            "username": "Alicia",
+            "password": "pwd_2026",
+            "date_birth": "1980-01-01",
+            "email": "alicia@eu.meridien.fr",
+        }
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse("user_inscription"), data)
+
+        self.assertEqual(response.status_code, 201)
+        client_queries = [q for q in captured.captured_queries if "client_client" in q["sql"]]
+        self.assertEqual(client_queries, [])
+
+    def test_signup_refuses_unknown_domain(self):
+        data = {
+            "username": "Carla",
+            "password": "pwd_2026",
+            "date_birth": "1980-01-01",
+            "email": "carla@unknown.org",
+        }
+
+        response = self.client.post(reverse("user_inscription"), data)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.data)
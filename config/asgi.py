@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# pas de connexions persistantes sous ASGI (voir DATABASES dans config.settings)
+os.environ.setdefault("DJANGO_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
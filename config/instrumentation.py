@@ -0,0 +1,107 @@
+"""
+Mesure des phases d'une requête (authentification, sérialisation, rendu...).
+
+Les durées sont cumulées dans un RequestTimings posé dans une ContextVar par
+RequestInstrumentationMiddleware. Hors requête instrumentée timed_phase ne
+fait rien, il peut donc rester dans le code sans coût.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.queries = 0
+        self.db_duration = 0
+        # compteurs d'évènements (succès de cache...), repris dans le log de la requête
+        self.events = {}
+        # réplica des lectures (config.replicas) et son retard en secondes
+        self.replica = None
+        self.replica_lag = None
+        # profondeur par phase : une phase imbriquée dans elle-même n'est comptée qu'une fois
+        self._depth = {}
+
+    def add(self, name, duration):
+        self.durations[name] = self.durations.get(name, 0) + duration
+
+    def count(self, name):
+        self.events[name] = self.events.get(name, 0) + 1
+
+    def use_replica(self, alias, lag):
+        self.replica = alias
+        self.replica_lag = lag
+
+    @contextmanager
+    def phase(self, name):
+        depth = self._depth.get(name, 0)
+        self._depth[name] = depth + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[name] = depth
+            if depth == 0:
+                self.add(name, time.perf_counter() - started)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_duration += time.perf_counter() - started
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def count_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute_wrapper(execute, sql, params, many, context)
+
+
+def install_query_counter():
+    """
+    Pose count_query sur les connexions du thread courant. Il reste en place :
+    hors requête instrumentée il ne fait qu'appeler execute, et lit sinon le
+    RequestTimings de la requête courante dans la ContextVar (propagée par
+    sync_to_async jusqu'au thread qui exécute le SQL des vues asynchrones).
+    """
+    for connection in connections.all():
+        if count_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(count_query)
+
+
+@contextmanager
+def timed_phase(name):
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.phase(name):
+        yield
+
+
+def count_event(name):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.count(name)
+
+
+class TimedSerializerMixin:
+    """Compte le temps passé dans to_representation dans la phase serialize."""
+
+    def to_representation(self, instance):
+        with timed_phase('serialize'):
+            return super().to_representation(instance)
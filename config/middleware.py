@@ -0,0 +1,199 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.permissions import SAFE_METHODS
+
+from config.instrumentation import RequestTimings, current_timings, install_query_counter
+from config.replicas import ReadRouting, current_routing, pin_to_primary, read_replicas
+from config.shards import TenantShard, current_shard, sharding_enabled
+
+logger = logging.getLogger('softdesk.requests')
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Activé par REQUEST_INSTRUMENTATION. Pour chaque requête compte les requêtes
+    SQL et leur durée, mesure les phases (auth, view, serialize, render), les
+    renvoie dans les en-têtes Server-Timing et X-Query-Count et écrit une ligne
+    JSON dans le logger softdesk.requests.
+
+    La phase view englobe db, auth et serialize, render est mesurée à part.
+    Une requête lue sur un réplica renvoie aussi son retard dans X-Replica-Lag.
+    """
+
+    sync_capable = True
+    # sous ASGI une middleware seulement synchrone ferait passer toute la
+    # requête, vues asynchrones comprises, par un thread
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            install_query_counter()
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            # l'ORM asynchrone exécute le SQL dans le thread de sync_to_async
+            await sync_to_async(install_query_counter)()
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+
+        # le log lit request.user, qui peut charger la session en base
+        return await sync_to_async(self.finish)(request, response, timings)
+
+    def finish(self, request, response, timings):
+        view_started = getattr(request, '_instrumentation_view_started', None)
+        if view_started is not None and 'view' not in timings.durations:
+            timings.add('view', time.perf_counter() - view_started)
+
+        self.add_headers(response, timings)
+        self.log(request, response, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumentation_view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # les Response DRF sont rendues après la vue : on sépare view et render
+        timings = current_timings.get()
+        now = time.perf_counter()
+        view_started = getattr(request, '_instrumentation_view_started', None)
+        if view_started is not None:
+            timings.add('view', now - view_started)
+
+        def render_done(rendered):
+            timings.add('render', time.perf_counter() - now)
+
+        response.add_post_render_callback(render_done)
+        return response
+
+    def add_headers(self, response, timings):
+        metrics = [f'db;dur={timings.db_duration * 1000:.2f};desc="{timings.queries} queries"']
+        for name, duration in timings.durations.items():
+            metrics.append(f'{name};dur={duration * 1000:.2f}')
+        metrics.append(f'total;dur={timings.total() * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(metrics)
+        response['X-Query-Count'] = str(timings.queries)
+        if timings.replica is not None:
+            response['X-Replica-Lag'] = f'{timings.replica_lag:.3f}'
+
+    def log(self, request, response, timings):
+        user = getattr(request, 'user', None)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'user_id': getattr(user, 'id', None),
+            'queries': timings.queries,
+            'db_ms': round(timings.db_duration * 1000, 2),
+            'phases_ms': {name: round(duration * 1000, 2) for name, duration in timings.durations.items()},
+            'events': timings.events,
+            'replica': timings.replica,
+            'replica_lag_ms': None if timings.replica is None else round(timings.replica_lag * 1000, 2),
+            'total_ms': round(timings.total() * 1000, 2),
+        }))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Activée par DATABASE_READ_REPLICAS. Pose le ReadRouting de la requête
+    (config.replicas) et, après une écriture réussie, garde les lectures de
+    l'utilisateur sur default pendant DATABASE_REPLICA_STICKY_SECONDS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not read_replicas():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = current_routing.set(ReadRouting())
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = current_routing.set(ReadRouting())
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        # request.user peut charger la session en base
+        await sync_to_async(self.pin)(request, response)
+        return response
+
+    def pin(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(response, user.id)
+
+
+class ShardMiddleware:
+    """
+    Activée par DATABASE_SHARDS (plus d'une base). Pose le TenantShard de la
+    requête (config.shards), renseigné par l'authentification avec la base du
+    client de l'utilisateur.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not sharding_enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = current_shard.set(TenantShard())
+        try:
+            return self.get_response(request)
+        finally:
+            current_shard.reset(token)
+
+    async def __acall__(self, request):
+        token = current_shard.set(TenantShard())
+        try:
+            return await self.get_response(request)
+        finally:
+            current_shard.reset(token)
@@ -0,0 +1,179 @@
+"""
+Réplicas en lecture (DATABASE_READ_REPLICAS) avec lecture de ses propres
+écritures.
+
+ReplicaRoutingMiddleware pose un ReadRouting par requête dans une ContextVar.
+Les vues qui héritent de ReplicaReadsMixin l'activent une fois l'utilisateur
+authentifié, pour les méthodes sûres, sauf s'il a écrit depuis moins de
+DATABASE_REPLICA_STICKY_SECONDS : ses lectures restent alors sur default et
+voient ses écritures. Cette écriture récente est retenue par un cookie signé
+renvoyé par le client, valable quel que soit le processus ou le serveur qui
+reçoit la requête suivante. ReplicaRouter envoie les lectures activées vers un
+réplica dont le retard ne dépasse pas DATABASE_REPLICA_MAX_LAG, toutes les
+autres vers default.
+
+En local un réplica est un second fichier SQLite recopié par l'API de
+sauvegarde (commande sync_replicas). Le retard se mesure à une ligne
+horodatée écrite dans default juste avant chaque copie.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from config.instrumentation import current_timings
+
+current_routing = ContextVar('current_routing', default=None)
+
+# un retard lu dans un réplica sert pendant LAG_CHECK_INTERVAL secondes
+LAG_CHECK_INTERVAL = 1
+_lags = {}
+
+
+def read_replicas():
+    return getattr(settings, 'DATABASE_READ_REPLICAS', [])
+
+
+PIN_COOKIE = 'replica_pin'
+PIN_SALT = 'config.replicas.pin'
+
+
+def sticky_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5)
+
+
+def pin_to_primary(response, user_id):
+    if sticky_seconds() <= 0:
+        response.delete_cookie(PIN_COOKIE)
+        return
+    response.set_signed_cookie(
+        PIN_COOKIE, str(user_id), salt=PIN_SALT, max_age=sticky_seconds(), httponly=True, samesite='Lax',
+    )
+
+
+def is_pinned(request, user_id):
+    # la signature porte l'heure d'écriture : max_age borne la durée côté serveur
+    pinned = request.get_signed_cookie(PIN_COOKIE, default=None, salt=PIN_SALT, max_age=sticky_seconds())
+    return pinned == str(user_id)
+
+
+def write_heartbeat(connection):
+    with connection.cursor() as cursor:
+        # hors migrations : la table ne sert qu'aux copies, jamais aux modèles
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS replica_heartbeat '
+            '(id INTEGER PRIMARY KEY CHECK (id = 1), written_at REAL NOT NULL)'
+        )
+        cursor.execute(
+            'INSERT OR REPLACE INTO replica_heartbeat (id, written_at) VALUES (1, %s)', [time.time()],
+        )
+
+
+def sync_replica(primary, replica):
+    """
+    Recopie primary dans replica (connexions SQLite) avec l'API de sauvegarde :
+    les lecteurs du réplica voient l'ancienne ou la nouvelle copie, jamais un
+    mélange des deux.
+    """
+    write_heartbeat(primary)
+    primary.ensure_connection()
+    replica.ensure_connection()
+    primary.connection.backup(replica.connection)
+    _lags.pop(replica.alias, None)
+
+
+def measure_lag(connection):
+    """Secondes depuis la dernière copie vers ce réplica, None s'il n'a jamais été copié."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT written_at FROM replica_heartbeat WHERE id = 1')
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return None if row is None else max(0.0, time.time() - row[0])
+
+
+def replica_lag(alias):
+    now = time.monotonic()
+    checked = _lags.get(alias)
+    if checked is None or now - checked[0] >= LAG_CHECK_INTERVAL:
+        checked = _lags[alias] = (now, measure_lag(connections[alias]))
+    return checked[1]
+
+
+def choose_replica():
+    """Un réplica au hasard parmi ceux assez à jour, None sinon."""
+    max_lag = getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 30)
+    candidates = []
+    for alias in read_replicas():
+        lag = replica_lag(alias)
+        if lag is not None and lag <= max_lag:
+            candidates.append((alias, lag))
+    return random.choice(candidates) if candidates else (None, None)
+
+
+class ReadRouting:
+    """Base des lectures d'une requête, choisie une fois pour toute la requête."""
+
+    def __init__(self):
+        self.enabled = False
+        self.chosen = False
+        self.alias = None
+
+    def enable(self, request):
+        user_id = getattr(request.user, 'id', None)
+        self.enabled = request.method in SAFE_METHODS and (user_id is None or not is_pinned(request, user_id))
+
+    def database(self):
+        if not self.enabled:
+            return None
+        if not self.chosen:
+            self.chosen = True
+            self.alias, lag = choose_replica()
+            timings = current_timings.get()
+            if self.alias is not None and timings is not None:
+                timings.use_replica(self.alias, lag)
+        return self.alias
+
+
+class ReplicaReadsMixin:
+    """
+    Lectures des méthodes sûres de la vue sur un réplica. Décidé après
+    l'authentification : un utilisateur qui vient d'écrire reste sur default.
+    """
+
+    def perform_authentication(self, request):
+        super().perform_authentication(request)
+        routing = current_routing.get()
+        if routing is not None:
+            routing.enable(request)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        return routing.database() if routing is not None else None
+
+    def db_for_write(self, model, **hints):
+        # un objet lu sur un réplica s'enregistre quand même dans default
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in read_replicas():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *read_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # les réplicas reçoivent le schéma avec les données
+        if db in read_replicas():
+            return False
+        return None
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -46,6 +47,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # premier de la liste pour mesurer toute la requête, inactif sans REQUEST_INSTRUMENTATION
+    "config.middleware.RequestInstrumentationMiddleware",
+    # inactive sans DATABASE_READ_REPLICAS
+    "config.middleware.ReplicaRoutingMiddleware",
+    # inactive avec une seule base dans DATABASE_SHARDS
+    "config.middleware.ShardMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,13 +85,74 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Bases des données des clients (Client.shard) et premier identifiant attribué
+# dans chacune : des plages disjointes gardent les identifiants uniques d'une
+# base à l'autre. default seule : pas de sharding. Exemple local :
+# {"default": 0, "shard1": 1_000_000_000}, puis migrate_shards.
+# La base de chaque client est relue au plus tard après DATABASE_SHARD_MAP_TTL
+# secondes.
+DATABASE_SHARDS = {"default": 0}
+DATABASE_SHARD_MAP_TTL = 2
+
+# Alias de DATABASES qui servent les lectures des vues de support (méthodes
+# sûres), vide : tout passe par default. Après une écriture, les lectures de
+# l'utilisateur restent sur default DATABASE_REPLICA_STICKY_SECONDS secondes
+# (cookie signé replica_pin) ; un réplica en retard de plus de
+# DATABASE_REPLICA_MAX_LAG secondes est ignoré.
+DATABASE_READ_REPLICAS = []
+DATABASE_REPLICA_STICKY_SECONDS = 5
+DATABASE_REPLICA_MAX_LAG = 30
+
+# config.sqlite : SQLite en WAL avec BEGIN IMMEDIATE, PRAGMA réglables dans
+# OPTIONS["pragmas"] (voir config.sqlite.base.PRAGMAS). Connexions gardées
+# CONN_MAX_AGE secondes par thread WSGI. Sous ASGI chaque requête s'exécute
+# dans son propre thread, une connexion persistante n'y serait jamais
+# réutilisée : config.asgi fixe DJANGO_CONN_MAX_AGE à 0.
+CONN_MAX_AGE = int(os.environ.get("DJANGO_CONN_MAX_AGE", 600))
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "config.sqlite",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        "OPTIONS": {
+            "pragmas": {},
+            "optimize_interval": 3600,
+        },
+    },
 }
 
+# Bases locales supplémentaires, déclarées dans DATABASES seulement si
+# DATABASE_READ_REPLICAS ou DATABASE_SHARDS les nomment
+LOCAL_DATABASES = {
+    # réplica local en lecture : copie de db.sqlite3 tenue à jour par sync_replicas
+    "replica": {
+        "ENGINE": "config.sqlite",
+        "NAME": BASE_DIR / "db_replica.sqlite3",
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        "TEST": {"MIRROR": "default"},
+    },
+    # seconde base de clients locale, voir DATABASE_SHARDS
+    "shard1": {
+        "ENGINE": "config.sqlite",
+        "NAME": BASE_DIR / "db_shard1.sqlite3",
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        "OPTIONS": {
+            "pragmas": {},
+            "optimize_interval": 3600,
+        },
+    },
+}
+
+DATABASES.update({
+    alias: LOCAL_DATABASES[alias]
+    for alias in [*DATABASE_READ_REPLICAS, *DATABASE_SHARDS]
+    if alias in LOCAL_DATABASES
+})
+
+# ShardRouter d'abord : les lectures d'un client sur default passent ensuite
+# par les réplicas
+DATABASE_ROUTERS = ["config.shards.ShardRouter", "config.replicas.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -127,10 +195,77 @@ AUTH_USER_MODEL = "authentication.User"
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 5,
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('authentication.authentication.TenantJWTAuthentication',),
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=120),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-}
\ No newline at end of file
+    'TOKEN_OBTAIN_SERIALIZER': 'authentication.serializers.TenantTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.TenantTokenRefreshSerializer',
+}
+
+# Durée (en secondes) pendant laquelle la version des jetons d'un utilisateur
+# est gardée dans le cache de chaque processus avant d'être relue en base :
+# délai maximal de prise en compte d'une révocation par un autre processus.
+TOKEN_VERSION_CACHE_SECONDS = 30
+
+# Durée (en secondes) pendant laquelle l'index des projets accessibles d'un
+# utilisateur est partagé entre requêtes via le cache. 0 : un chargement par requête.
+SUPPORT_PROJECT_ACCESS_CACHE_TIMEOUT = 0
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # à remplacer par un cache partagé (Redis, Memcached) avec plusieurs processus
+    "project_detail": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "project_detail",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
+# Cache des réponses de GET /api/project/<id>/ (support.caching) : alias dans
+# CACHES, durée de vie (0 : désactivé) et délai pendant lequel une version
+# obsolète peut être servie après une écriture, le temps de la reconstruire.
+SUPPORT_PROJECT_DETAIL_CACHE = "project_detail"
+SUPPORT_PROJECT_DETAIL_CACHE_TIMEOUT = 300
+SUPPORT_PROJECT_DETAIL_STALE_TIMEOUT = 5
+
+# Synchronisation différentielle (support.sync) : conservation des traces de
+# suppression (jours). Un jeton plus ancien que cette conservation demande une
+# synchronisation complète.
+SUPPORT_SYNC_TOMBSTONE_DAYS = 90
+
+# Durée de vie maximale (en secondes) de l'arbre des domaines clients gardé en
+# mémoire par client.resolver, les signaux le vident dès qu'un client change.
+CLIENT_DOMAIN_RESOLVER_TTL = 300
+
+# Mesure par requête (requêtes SQL, phases, en-têtes Server-Timing et X-Query-Count)
+# et une ligne JSON par requête dans request_timings.jsonl
+REQUEST_INSTRUMENTATION = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'request_timings': {
+            'class': 'logging.FileHandler',
+            'filename': BASE_DIR / 'request_timings.jsonl',
+            'formatter': 'message',
+            # le fichier n'est créé qu'à la première ligne écrite
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'softdesk.requests': {
+            'handlers': ['request_timings'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
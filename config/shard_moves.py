@@ -0,0 +1,190 @@
+"""
+Déplacement en ligne des données d'un client vers une autre base
+(commande move_client).
+
+1. copie de toutes les lignes du client, écritures permises ;
+2. Client.moving : écritures refusées (503), attente que tous les processus
+   le voient ;
+3. rattrapage : lignes modifiées depuis le début de la copie, lignes
+   supprimées entre-temps ;
+4. Client.shard vers la nouvelle base, attente, puis Client.moving levé ;
+5. suppression des lignes de l'ancienne base.
+
+Les lignes gardent leurs identifiants : la base cible doit numéroter au-delà
+des identifiants du client (DATABASE_SHARDS), un client ne va donc que vers
+une base de plage plus haute. Les copies sont faites par INSERT ... ON
+CONFLICT DO UPDATE (les triggers de l'index de recherche suivent) et non par
+bulk_create qui réécrirait les dates auto_now.
+
+Les traces de suppression (Tombstone) des projets déjà supprimés ne sont
+rattachées à aucun client et restent dans l'ancienne base.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.fields import AutoFieldMixin
+from django.utils import timezone
+
+from authentication.models import User
+from config.shards import copy_client, id_offset, seed_ids, shard_map
+from support.models import Project, ProjectContributors, Issue, Comment, Tombstone, ImportCheckpoint, ImportedRecord
+
+
+class MoveError(Exception):
+    pass
+
+
+def tenant_tables(client):
+    """
+    (modèle, lignes du client, champ de date de modification ou None), des
+    parents vers les enfants. Sans date, la table est recopiée en entier au
+    rattrapage.
+    """
+    projects = Project.all_objects.filter(author__client_id=client.id)
+    tables = [(User, User._base_manager.filter(client_id=client.id), None)]
+    for field in User._meta.many_to_many:
+        through = field.remote_field.through
+        tables.append((through, through._base_manager.filter(user__client_id=client.id), None))
+    return tables + [
+        (Project, projects, 'updated_at'),
+        (ProjectContributors, ProjectContributors._base_manager.filter(project__in=projects), 'time_created'),
+        (Issue, Issue._base_manager.filter(project__in=projects), 'updated_at'),
+        (Comment, Comment._base_manager.filter(issue__project__in=projects), 'updated_at'),
+        (Tombstone, Tombstone._base_manager.filter(project_id__in=projects.values('id')), 'time_deleted'),
+        (ImportCheckpoint, ImportCheckpoint._base_manager.filter(client_id=client.id), 'time_updated'),
+        (ImportedRecord, ImportedRecord._base_manager.filter(checkpoint__client_id=client.id), None),
+    ]
+
+
+def upsert_sql(model, connection):
+    quote = connection.ops.quote_name
+    fields = model._meta.concrete_fields
+    pk = model._meta.pk.column
+    return (
+        f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))}) "
+        f"ON CONFLICT ({quote(pk)}) DO UPDATE SET "
+        + ', '.join(f"{quote(field.column)} = excluded.{quote(field.column)}" for field in fields if field.column != pk)
+    )
+
+
+def copy_rows(model, queryset, source, target, batch_size):
+    """Copie les lignes par lots dans l'ordre des clés primaires, retourne leur nombre."""
+    connection = connections[target]
+    fields = model._meta.concrete_fields
+    pk_index = fields.index(model._meta.pk)
+    sql = upsert_sql(model, connection)
+    queryset = queryset.using(source).order_by('pk')
+    copied = 0
+    while True:
+        rows = list(queryset.values_list(*(field.attname for field in fields))[:batch_size])
+        if not rows:
+            return copied
+        with transaction.atomic(using=target), connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                [field.get_db_prep_save(value, connection) for field, value in zip(fields, row)]
+                for row in rows
+            ])
+        copied += len(rows)
+        queryset = queryset.filter(pk__gt=rows[-1][pk_index])
+
+
+def delete_rows(model, pks, database, batch_size):
+    # DELETE direct : ni cascade ni signaux, les enfants sont supprimés avant
+    connection = connections[database]
+    quote = connection.ops.quote_name
+    pk = model._meta.pk
+    for start in range(0, len(pks), batch_size):
+        batch = [pk.get_db_prep_value(value, connection) for value in pks[start:start + batch_size]]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(pk.column)} IN ({', '.join(['%s'] * len(batch))})",
+                batch,
+            )
+
+
+class ClientMove:
+    """Déplacement d'un client, étape par étape (voir le module)."""
+
+    def __init__(self, client, target, wait=None, batch_size=1000, log=None):
+        self.client = client
+        self.source = client.shard
+        self.target = target
+        self.wait = getattr(settings, 'DATABASE_SHARD_MAP_TTL', 2) + 1 if wait is None else wait
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.tables = tenant_tables(client)
+
+    def check(self):
+        if self.target == self.source:
+            raise MoveError(f"Le client est déjà dans {self.target}.")
+        if self.target not in getattr(settings, 'DATABASE_SHARDS', {}):
+            raise MoveError(f"{self.target} n'est pas dans DATABASE_SHARDS.")
+        offset = id_offset(self.target)
+        for model, queryset, changed in self.tables:
+            if not isinstance(model._meta.pk, AutoFieldMixin):
+                continue
+            highest = queryset.using(self.source).order_by('-pk').values_list('pk', flat=True).first()
+            if highest is not None and highest >= offset:
+                raise MoveError(
+                    f"{model._meta.db_table} : identifiant {highest} au-delà de la plage de {self.target} ({offset})."
+                )
+
+    def run(self, keep_source=False):
+        self.check()
+        seed_ids(self.target)
+        copy_client(self.client, self.target)
+
+        started = timezone.now()
+        self.copy(self.tables)
+
+        self.set_client(moving=True)
+        try:
+            self.pause("écritures suspendues")
+            # marge pour les dates posées par une transaction ouverte avant started
+            self.catch_up(started - timedelta(seconds=self.wait))
+            self.set_client(shard=self.target)
+            self.pause(f"lectures sur {self.target}")
+        finally:
+            # en cas d'échec avant le changement de base, le client reste dans l'ancienne
+            self.set_client(moving=False)
+
+        if not keep_source:
+            self.delete_source()
+
+    def copy(self, tables, since=None):
+        for model, queryset, changed in tables:
+            if since is not None and changed is not None:
+                queryset = queryset.filter(**{f'{changed}__gte': since})
+            copied = copy_rows(model, queryset, self.source, self.target, self.batch_size)
+            self.log(f"{model._meta.db_table} : {copied} lignes copiées")
+
+    def catch_up(self, since):
+        self.copy(self.tables, since)
+        for model, queryset, changed in reversed(self.tables):
+            kept = set(queryset.using(self.source).values_list('pk', flat=True))
+            removed = [pk for pk in queryset.using(self.target).values_list('pk', flat=True) if pk not in kept]
+            delete_rows(model, removed, self.target, self.batch_size)
+            if removed:
+                self.log(f"{model._meta.db_table} : {len(removed)} lignes supprimées depuis la copie")
+
+    def delete_source(self):
+        for model, queryset, changed in reversed(self.tables):
+            pks = list(queryset.using(self.source).values_list('pk', flat=True))
+            delete_rows(model, pks, self.source, self.batch_size)
+        if self.source != DEFAULT_DB_ALIAS:
+            type(self.client)._base_manager.using(self.source).filter(pk=self.client.pk).delete()
+        self.log(f"lignes du client supprimées de {self.source}")
+
+    def set_client(self, **values):
+        for name, value in values.items():
+            setattr(self.client, name, value)
+        self.client.save(using=DEFAULT_DB_ALIAS, update_fields=list(values))
+        shard_map.invalidate()
+
+    def pause(self, reason):
+        self.log(f"{reason}, attente de {self.wait} s")
+        time.sleep(self.wait)
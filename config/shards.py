@@ -0,0 +1,205 @@
+"""
+Une base par client (sharding), optionnelle.
+
+client.models.Client.shard désigne l'alias de DATABASES qui porte les
+utilisateurs, projets, problèmes et commentaires du client (applications
+SHARDED_APPS) ; default garde le catalogue des clients et tout le reste.
+DATABASE_SHARDS liste ces alias, default seul désactive le sharding.
+
+TenantJWTAuthentication active la base du client du jeton pour la requête :
+ShardMiddleware pose un TenantShard dans une ContextVar, ShardRouter le lit.
+Hors requête (commandes, tests) tout va sur default, using_shard() choisit
+une autre base. Une base de client qui est default laisse la main aux
+routeurs suivants (réplicas en lecture).
+
+Chaque base numérote ses lignes à partir de DATABASE_SHARDS[alias] (voir
+seed_ids) : les identifiants restent uniques sur toutes les bases et un
+client déplacé par move_client garde les siens. Les lignes de Client sont
+recopiées dans la base de leur client pour que la clé étrangère des
+utilisateurs tienne.
+
+La base de chaque client est gardée DATABASE_SHARD_MAP_TTL secondes en
+mémoire par processus. Pendant un déplacement Client.moving fait refuser
+les écritures du client (503) ; move_client attend ce délai avant chaque
+étape pour que tous les processus suivent.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.fields import AutoFieldMixin
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+
+SHARDED_APPS = ('authentication', 'support')
+CATALOG_APP = 'client'
+
+current_shard = ContextVar('current_shard', default=None)
+
+
+class TenantMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Les données du client sont en cours de déplacement, réessayez dans quelques secondes."
+    default_code = 'tenant_moving'
+
+
+def shard_aliases():
+    return list(getattr(settings, 'DATABASE_SHARDS', {DEFAULT_DB_ALIAS: 0}))
+
+
+def sharding_enabled():
+    return len(shard_aliases()) > 1
+
+
+def id_offset(alias):
+    return getattr(settings, 'DATABASE_SHARDS', {DEFAULT_DB_ALIAS: 0})[alias]
+
+
+class ShardMap:
+    """
+    Base et état (déplacement en cours) de chaque client, lus dans le
+    catalogue en une requête et gardés en mémoire comme client.resolver.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shards = None
+        self._built_at = 0
+
+    def _build(self):
+        from client.models import Client
+
+        return {
+            client_id: (shard, moving)
+            for client_id, shard, moving in Client.objects.using(DEFAULT_DB_ALIAS).values_list('id', 'shard', 'moving')
+        }
+
+    def _get_shards(self):
+        ttl = getattr(settings, 'DATABASE_SHARD_MAP_TTL', 2)
+        shards = self._shards
+        if shards is not None and time.monotonic() - self._built_at < ttl:
+            return shards
+        with self._lock:
+            if self._shards is None or time.monotonic() - self._built_at >= ttl:
+                self._shards = self._build()
+                self._built_at = time.monotonic()
+            return self._shards
+
+    def invalidate(self):
+        with self._lock:
+            self._shards = None
+
+    def lookup(self, client_id):
+        """(alias, moving) du client, default pour un client inconnu."""
+        return self._get_shards().get(client_id, (DEFAULT_DB_ALIAS, False))
+
+
+shard_map = ShardMap()
+
+
+class TenantShard:
+    """Base du client de la requête, connue après l'authentification."""
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+
+def activate_client(client_id, method):
+    """Envoie les requêtes SQL de la requête en cours vers la base du client."""
+    tenant = current_shard.get()
+    if tenant is None or client_id is None:
+        return
+    alias, moving = shard_map.lookup(client_id)
+    if moving and method not in SAFE_METHODS:
+        raise TenantMoving()
+    tenant.alias = alias
+
+
+def client_shard(client_id):
+    return shard_map.lookup(client_id)[0] if sharding_enabled() else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def using_shard(alias):
+    token = current_shard.set(TenantShard(alias))
+    try:
+        yield
+    finally:
+        current_shard.reset(token)
+
+
+def user_shard(username):
+    """Base qui contient l'utilisateur, pour la connexion par nom d'utilisateur."""
+    if not sharding_enabled():
+        return DEFAULT_DB_ALIAS
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    for alias in shard_aliases():
+        if user_model.objects.using(alias).filter(username=username).exists():
+            return alias
+    return None
+
+
+def copy_client(client, alias):
+    """Recopie la ligne du client dans sa base, cible de la clé étrangère des utilisateurs."""
+    values = {field.attname: getattr(client, field.attname) for field in client._meta.concrete_fields}
+    values.pop('id')
+    type(client).objects.using(alias).update_or_create(id=client.id, defaults=values)
+
+
+def sharded_models():
+    for label in SHARDED_APPS:
+        yield from apps.get_app_config(label).get_models(include_auto_created=True)
+
+
+def seed_ids(alias):
+    """
+    Fait démarrer la numérotation des tables des clients à l'offset de la
+    base. SQLite (AUTOINCREMENT) ne descend jamais sous la plus grande valeur
+    déjà attribuée : sans effet sur une base déjà au-delà.
+    """
+    connection = connections[alias]
+    offset = id_offset(alias)
+    if connection.vendor != 'sqlite' or not offset:
+        return
+    with connection.cursor() as cursor:
+        for model in sharded_models():
+            if not isinstance(model._meta.pk, AutoFieldMixin):
+                continue
+            table = model._meta.db_table
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT %s, 0 '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                [table, table],
+            )
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [offset, table, offset])
+
+
+class ShardRouter:
+
+    def db_for_read(self, model, **hints):
+        return self.database(model)
+
+    def db_for_write(self, model, **hints):
+        return self.database(model)
+
+    def database(self, model):
+        if model._meta.app_label == CATALOG_APP:
+            return DEFAULT_DB_ALIAS if sharding_enabled() else None
+        if model._meta.app_label not in SHARDED_APPS:
+            return None
+        tenant = current_shard.get()
+        if tenant is None or tenant.alias in (None, DEFAULT_DB_ALIAS):
+            return None
+        return tenant.alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # le catalogue des clients est recopié dans chaque base
+        if CATALOG_APP in (obj1._meta.app_label, obj2._meta.app_label):
+            return True
+        return None
@@ -0,0 +1,93 @@
+"""
+Backend SQLite réglé pour les écritures concurrentes (ENGINE "config.sqlite").
+
+OPTIONS accepte, en plus des options de django.db.backends.sqlite3 :
+  - pragmas : PRAGMA appliqués à chaque nouvelle connexion, fusionnés avec
+    PRAGMAS (None retire un réglage par défaut)
+  - optimize_interval : secondes entre deux PRAGMA optimize sur une connexion
+    persistante (CONN_MAX_AGE), 0 pour désactiver
+
+transaction_mode vaut IMMEDIATE par défaut : un bloc atomic prend le verrou
+d'écriture dès BEGIN et attend busy_timeout si un autre écrivain le tient. En
+mode DEFERRED une transaction qui lit puis écrit échoue aussitôt avec
+« database is locked » quand le verrou est pris entre les deux, SQLite ne
+pouvant pas la faire attendre sans risque d'interblocage.
+"""
+
+import time
+
+from django.db import DatabaseError
+from django.db.backends.sqlite3 import base
+from django.utils.asyncio import async_unsafe
+
+PRAGMAS = {
+    # les lecteurs ne bloquent plus l'écrivain ni l'inverse
+    'journal_mode': 'WAL',
+    # en WAL, fsync aux points de contrôle seulement : une coupure de courant
+    # peut perdre les dernières transactions, jamais corrompre la base
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    # en Kio quand la valeur est négative
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    # borne le coût de l'ANALYZE lancé par PRAGMA optimize
+    'analysis_limit': 1000,
+}
+OPTIMIZE_INTERVAL = 3600
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    optimized_at = None
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.optimize_interval = kwargs.pop('optimize_interval', OPTIMIZE_INTERVAL)
+        if 'transaction_mode' not in self.settings_dict['OPTIONS']:
+            self.transaction_mode = 'IMMEDIATE'
+        return kwargs
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            if value is not None:
+                conn.execute(f'PRAGMA {name} = {value}')
+        self.optimized_at = time.monotonic()
+        return conn
+
+    def close_if_unusable_or_obsolete(self):
+        # appelé en début et fin de requête (close_old_connections)
+        super().close_if_unusable_or_obsolete()
+        if self.connection is not None and self.optimize_due():
+            self.optimize()
+
+    def optimize_due(self):
+        return (
+            bool(self.optimize_interval)
+            and not self.in_atomic_block
+            and time.monotonic() - self.optimized_at >= self.optimize_interval
+        )
+
+    def optimize(self):
+        """
+        Met à jour les statistiques du planificateur des tables lues par cette
+        connexion qui en ont besoin, ANALYZE borné par analysis_limit.
+        """
+        with self.cursor() as cursor:
+            cursor.execute('PRAGMA optimize')
+        self.optimized_at = time.monotonic()
+
+    def _close(self):
+        # recommandation SQLite : optimize avant de fermer une connexion longue
+        try:
+            if self.connection is not None and self.optimize_due():
+                with self.wrap_database_errors:
+                    self.connection.execute('PRAGMA optimize')
+        except DatabaseError:
+            # connexion inutilisable : elle est fermée quand même
+            pass
+        finally:
+            super()._close()
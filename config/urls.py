@@ -1,21 +1,27 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from support.views import (
     ProjectViewset, 
+    ProjectListView,
+    ProjectDetailView,
     AdminProjectViewset,
     AdminIssueViewset,
     AdminCommentViewset,
     ProjectIssuesView,
     IssueCommentsView,
+    SearchView,
+    SyncView,
 )
 from authentication.views import (
     UserInscriptionView,
     ProjectChangeAuthorView,
     ProjectAddContributorView,
     ProjectDeleteContributorView,
+    ProjectAddContributorsView,
+    ProjectDeleteContributorsView,
     IssueChangeAuthorView,
     UserUpdateView,
     UserDeleteView,
@@ -51,15 +57,22 @@ urlpatterns = [
     path('api/user_update/<int:user_id>/', UserUpdateView.as_view(), name="user_update"),
     path('api/user_delete/<int:user_id>/', UserDeleteView.as_view(), name="user_delete"),
     path('api/user_upgrade/<int:user_id>/', UserUpgradeView.as_view(), name="user_upgrade"),
+    # lectures asynchrones, project/<pk>/export/ reste dans ProjectViewset
+    path('api/project/', ProjectListView.as_view(), name='project-list'),
+    re_path(r'^api/project/(?P<pk>[^/.]+)/$', ProjectDetailView.as_view(), name='project-detail'),
     path("api/", include(router.urls)),
     path('api/admin/user/<int:project_id>/project_change_author/', ProjectChangeAuthorView.as_view(), name='project_change_author'),
     path('api/admin/user/<int:issue_id>/issue_change_author/', IssueChangeAuthorView.as_view(), name='issue_change_author'),
-    path('api/admin/user/<int:comment_id>/comment_change_author/', CommentChangeAuthorView.as_view(), name='comment_change_author'),
+    path('api/admin/user/<uuid:comment_id>/comment_change_author/', CommentChangeAuthorView.as_view(), name='comment_change_author'),
     path('api/admin/user/project_add_contributor/', ProjectAddContributorView.as_view(), name='project_add_contributor'),
     path('api/admin/user/project_delete_contributor/', ProjectDeleteContributorView.as_view(), name='project_delete_contributor'),
+    path('api/admin/user/project_add_contributors/', ProjectAddContributorsView.as_view(), name='project_add_contributors'),
+    path('api/admin/user/project_delete_contributors/', ProjectDeleteContributorsView.as_view(), name='project_delete_contributors'),
     path('api/admin/user/<int:issue_id>/issue_change_attribution/',IssueChangeAttributionView.as_view(), name='issue_change_attribution'),
     path('api/project/<int:project_id>/issues/', ProjectIssuesView.as_view(), name='project_issues'),
     path('api/issue/<int:issue_id>/comments/', IssueCommentsView.as_view(), name='issue_comments'),
+    path('api/search/', SearchView.as_view(), name='search'),
+    path('api/sync/', SyncView.as_view(), name='sync'),
 
     # création d'un nouvel utilisateur => doit être authentifié en tant que is_staff
     # path("api/sign-up/", "", name=""),
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+
+from support.models import Project, ProjectContributors
+
+
+class ProjectAccess:
+    """
+    Index des projets actifs du client que l'utilisateur peut toucher :
+    ceux dont il est contributeur et ceux dont il est auteur.
+    Il est construit en une seule requête puis consulté par les permissions
+    et les validateurs au lieu d'un exists() chacun.
+    """
+
+    def __init__(self, contributed_ids, authored_ids):
+        self.contributed_ids = frozenset(contributed_ids)
+        self.authored_ids = frozenset(authored_ids)
+
+    @classmethod
+    def load(cls, user):
+        return cls.from_rows(user, cls.rows(user))
+
+    @classmethod
+    async def aload(cls, user):
+        return cls.from_rows(user, [row async for row in cls.rows(user)])
+
+    @staticmethod
+    def rows(user):
+        is_contributor = Exists(
+            ProjectContributors.objects.filter(project=OuterRef('pk'), contributor_id=user.id)
+        )
+        return Project.objects.filter(
+            author__client_id=user.client_id,
+        ).annotate(
+            is_contributor=is_contributor,
+        ).filter(
+            Q(author_id=user.id) | Q(is_contributor=True)
+        ).order_by().values_list('id', 'author_id', 'is_contributor')
+
+    @classmethod
+    def from_rows(cls, user, rows):
+        contributed_ids = set()
+        authored_ids = set()
+        for project_id, author_id, contributor in rows:
+            if contributor:
+                contributed_ids.add(project_id)
+            if author_id == user.id:
+                authored_ids.add(project_id)
+        return cls(contributed_ids, authored_ids)
+
+    def is_contributor(self, project_id):
+        return self._as_id(project_id) in self.contributed_ids
+
+    def is_author(self, project_id):
+        return self._as_id(project_id) in self.authored_ids
+
+    def is_known(self, project_id):
+        """Vrai si le projet est un projet actif du client connu de l'utilisateur."""
+        project_id = self._as_id(project_id)
+        return project_id in self.contributed_ids or project_id in self.authored_ids
+
+    @staticmethod
+    def _as_id(value):
+        # les vues reçoivent souvent l'id tel qu'envoyé dans le JSON ou l'URL
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+
+def _cache_key(user_id):
+    return f'project_access:{user_id}'
+
+
+def get_project_access(request):
+    """
+    Retourne l'index de l'utilisateur de la requête, chargé au plus une fois
+    par requête. Si SUPPORT_PROJECT_ACCESS_CACHE_TIMEOUT est positif l'index est
+    aussi partagé entre requêtes via le cache Django pendant ce délai.
+    """
+    access = getattr(request, '_project_access', None)
+    if access is not None:
+        return access
+
+    user = request.user
+    timeout = getattr(settings, 'SUPPORT_PROJECT_ACCESS_CACHE_TIMEOUT', 0)
+    if timeout:
+        access = cache.get(_cache_key(user.id))
+    if access is None:
+        access = ProjectAccess.load(user)
+        if timeout:
+            cache.set(_cache_key(user.id), access, timeout)
+
+    request._project_access = access
+    return access
+
+
+async def aget_project_access(request):
+    """get_project_access pour les vues asynchrones."""
+    access = getattr(request, '_project_access', None)
+    if access is not None:
+        return access
+
+    user = request.user
+    timeout = getattr(settings, 'SUPPORT_PROJECT_ACCESS_CACHE_TIMEOUT', 0)
+    if timeout:
+        access = await cache.aget(_cache_key(user.id))
+    if access is None:
+        access = await ProjectAccess.aload(user)
+        if timeout:
+            await cache.aset(_cache_key(user.id), access, timeout)
+
+    request._project_access = access
+    return access
+
+
+def invalidate_project_access(user_ids):
+    """À appeler quand les liens projet/contributeur des utilisateurs changent."""
+    if getattr(settings, 'SUPPORT_PROJECT_ACCESS_CACHE_TIMEOUT', 0):
+        cache.delete_many([_cache_key(user_id) for user_id in set(user_ids)])
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SupportConfig(AppConfig):
     name = "support"
+
+    def ready(self):
+        # enregistre les receivers de signaux
+        from support import signals  # noqa: F401
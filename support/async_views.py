@@ -0,0 +1,84 @@
+"""
+Vues DRF asynchrones pour un déploiement ASGI (config.asgi).
+
+DRF n'appelle que des vues synchrones : sous ASGI chaque requête occupe alors
+un thread du début à la fin de la réponse, y compris pendant qu'un client
+lent la reçoit. AsyncAPIView réécrit dispatch pour attendre des méthodes
+async def get... ; les requêtes SQL passent par l'ORM asynchrone (aget,
+afirst, async for) et le thread n'est occupé que le temps de chacune.
+
+Sous WSGI ces vues restent utilisables, Django les exécute avec async_to_sync.
+"""
+
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView dont les méthodes HTTP sont des coroutines. Les permissions qui
+    définissent ahas_permission / ahas_object_permission sont attendues, les
+    autres sont appelées directement (elles ne doivent pas lire la base).
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # OPTIONS reste la méthode synchrone d'APIView
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        # les jetons émis sans les claims du client lisent la table des utilisateurs
+        await sync_to_async(self.perform_authentication)(request)
+        await self.acheck_permissions(request)
+        self.check_throttles(request)
+
+    async def acheck_permissions(self, request):
+        for permission in self.get_permissions():
+            if not await self.call_permission(permission, 'has_permission', request, self):
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, 'message', None),
+                    code=getattr(permission, 'code', None),
+                )
+
+    async def acheck_object_permissions(self, request, obj):
+        for permission in self.get_permissions():
+            if not await self.call_permission(permission, 'has_object_permission', request, self, obj):
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, 'message', None),
+                    code=getattr(permission, 'code', None),
+                )
+
+    @staticmethod
+    async def call_permission(permission, name, *args):
+        method = getattr(permission, f'a{name}', None)
+        if method is not None:
+            return await method(*args)
+        return getattr(permission, name)(*args)
@@ -0,0 +1,369 @@
+"""
+Mesure des endpoints de l'API à travers le client de test DRF : latence
+(p50/p95), nombre de requêtes SQL et pic mémoire par endpoint. Utilisé par la
+commande benchmark_endpoints.
+"""
+
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from authentication.serializers import TenantTokenObtainPairSerializer
+from support.models import Project, ProjectContributors, Issue, Comment
+from support.sync import current_sequence, encode_token, sequence_database
+
+UserModel = get_user_model()
+
+
+class Scenario:
+    """
+    Un appel d'endpoint. url et data sont des fonctions (context, i, prepared)
+    où i est le numéro d'itération et prepared la valeur retournée par setup,
+    appelé avant chaque itération en dehors de la mesure.
+    """
+
+    def __init__(self, name, method, url, data=None, user='author', setup=None, expected_status=200):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.data = data
+        self.user = user
+        self.setup = setup
+        self.expected_status = expected_status
+
+
+class BenchmarkContext:
+    """Objets de référence choisis dans le jeu de données généré."""
+
+    def __init__(self, password):
+        self.password = password
+        # le plus gros projet : c'est le cas le plus coûteux pour les lectures
+        self.project = Project.objects.order_by('-issues_count').first()
+        self.author = self.project.author
+        self.client_domain = self.author.client.domain
+        self.issue = Issue.objects.filter(project=self.project).order_by('-comments_count').first()
+        self.comment = Comment.objects.filter(issue=self.issue).first()
+
+        # objets dont l'utilisateur de référence est l'auteur pour les vues d'administration
+        self.own_issue = Issue.objects.create(
+            name="Benchmark", priority=Issue.Priority.LOW, balise=Issue.Balise.TASK,
+            author=self.author, attribution=self.author, project=self.project,
+        )
+        self.own_comment = Comment.objects.create(
+            description="Benchmark", issue=self.issue, author=self.author,
+        )
+        self.outsider = self.create_user("bench_outsider")
+        self.admin = self.create_user("bench_admin", is_staff=True, is_superuser=True)
+        self.upgraded = self.create_user("bench_upgraded")
+        # synchronisation différentielle : les écritures des scénarios précédents
+        self.sync_token = encode_token(current_sequence(), sequence_database())
+
+        self.tokens = {}
+        for name in ('author', 'admin'):
+            refresh = TenantTokenObtainPairSerializer.get_token(getattr(self, name))
+            self.tokens[name] = {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+    def create_user(self, username, **extra_fields):
+        return UserModel.objects.create_user(
+            username=username,
+            password=self.password,
+            date_birth="1980-01-01",
+            email=f"{username}@{self.client_domain}",
+            **extra_fields,
+        )
+
+
+def build_scenarios():
+    """Un scénario par route de config/urls.py (hors admin Django et api-auth)."""
+
+    def new_project(ctx, i):
+        return Project.objects.create(name=f"Jetable {i}", type=Project.Type.IOS, author=ctx.author)
+
+    def new_issue(ctx, i):
+        return Issue.objects.create(
+            name=f"Jetable {i}", priority=Issue.Priority.LOW, balise=Issue.Balise.TASK,
+            author=ctx.author, attribution=ctx.author, project=ctx.project,
+        )
+
+    def new_comment(ctx, i):
+        return Comment.objects.create(description=f"Jetable {i}", issue=ctx.issue, author=ctx.author)
+
+    def without_outsider(ctx, i):
+        ProjectContributors.objects.filter(project=ctx.project, contributor=ctx.outsider).delete()
+
+    def with_outsider(ctx, i):
+        ProjectContributors.objects.get_or_create(project=ctx.project, contributor=ctx.outsider)
+
+    def contributor_body(ctx, i, prepared):
+        return {'project': ctx.project.id, 'contributor': ctx.outsider.id}
+
+    def without_batch(ctx, i):
+        ProjectContributors.objects.filter(project=ctx.project, contributor__in=[ctx.outsider, ctx.upgraded]).delete()
+
+    def with_batch(ctx, i):
+        for user in (ctx.outsider, ctx.upgraded):
+            ProjectContributors.objects.get_or_create(project=ctx.project, contributor=user)
+
+    def contributors_body(ctx, i, prepared):
+        return {'projects': [ctx.project.id], 'contributors': [ctx.outsider.id, ctx.upgraded.id]}
+
+    return [
+        Scenario(
+            'token_obtain_pair', 'post', lambda ctx, i, p: reverse('token_obtain_pair'),
+            data=lambda ctx, i, p: {'username': ctx.author.username, 'password': ctx.password},
+            user=None,
+        ),
+        Scenario(
+            'token_refresh', 'post', lambda ctx, i, p: reverse('token_refresh'),
+            data=lambda ctx, i, p: {'refresh': ctx.tokens['author']['refresh']},
+            user=None,
+        ),
+        Scenario(
+            'user_inscription', 'post', lambda ctx, i, p: reverse('user_inscription'),
+            data=lambda ctx, i, p: {
+                'username': f"bench_signup_{i}", 'password': ctx.password,
+                'date_birth': "1980-01-01", 'email': f"signup{i}@{ctx.client_domain}",
+            },
+            user=None, expected_status=201,
+        ),
+        Scenario(
+            'user_update', 'patch', lambda ctx, i, p: reverse('user_update', args=[ctx.author.id]),
+            data=lambda ctx, i, p: {'can_be_contacted': bool(i % 2)},
+        ),
+        Scenario(
+            'user_delete', 'delete', lambda ctx, i, p: reverse('user_delete', args=[p.id]),
+            setup=lambda ctx, i: ctx.create_user(f"bench_deleted_{i}"), user='admin',
+        ),
+        Scenario(
+            'user_upgrade', 'patch', lambda ctx, i, p: reverse('user_upgrade', args=[ctx.upgraded.id]),
+            data=lambda ctx, i, p: {'is_staff': bool(i % 2)}, user='admin',
+        ),
+        Scenario('project-list', 'get', lambda ctx, i, p: reverse('project-list')),
+        Scenario('project-detail', 'get', lambda ctx, i, p: reverse('project-detail', args=[ctx.project.id])),
+        Scenario('project-export', 'get', lambda ctx, i, p: reverse('project-export', args=[ctx.project.id])),
+        Scenario('admin_project-list', 'get', lambda ctx, i, p: reverse('admin_project-list')),
+        Scenario(
+            'admin_project-create', 'post', lambda ctx, i, p: reverse('admin_project-list'),
+            data=lambda ctx, i, p: {'name': f"Benchmark {i}", 'type': Project.Type.IOS},
+            expected_status=201,
+        ),
+        Scenario(
+            'admin_project-retrieve', 'get',
+            lambda ctx, i, p: reverse('admin_project-detail', args=[ctx.project.id]),
+        ),
+        Scenario(
+            'admin_project-partial-update', 'patch',
+            lambda ctx, i, p: reverse('admin_project-detail', args=[ctx.project.id]),
+            data=lambda ctx, i, p: {'description': f"Révision {i}"},
+        ),
+        Scenario(
+            'admin_project-destroy', 'delete', lambda ctx, i, p: reverse('admin_project-detail', args=[p.id]),
+            setup=new_project, expected_status=204,
+        ),
+        Scenario(
+            'admin_issue-list', 'get',
+            lambda ctx, i, p: reverse('admin_issue-list') + f"?project={ctx.project.id}",
+        ),
+        Scenario(
+            'admin_issue-create', 'post', lambda ctx, i, p: reverse('admin_issue-list'),
+            data=lambda ctx, i, p: {
+                'name': f"Benchmark {i}", 'priority': Issue.Priority.HIGH, 'balise': Issue.Balise.BUG,
+                'progression': Issue.Progression.TODO, 'project': ctx.project.id, 'attribution': ctx.author.id,
+            },
+            expected_status=201,
+        ),
+        Scenario(
+            'admin_issue-retrieve', 'get',
+            lambda ctx, i, p: reverse('admin_issue-detail', args=[ctx.own_issue.id]),
+        ),
+        Scenario(
+            'admin_issue-partial-update', 'patch',
+            lambda ctx, i, p: reverse('admin_issue-detail', args=[ctx.own_issue.id]),
+            data=lambda ctx, i, p: {'description': f"Révision {i}"},
+        ),
+        Scenario(
+            'admin_issue-destroy', 'delete', lambda ctx, i, p: reverse('admin_issue-detail', args=[p.id]),
+            setup=new_issue, expected_status=204,
+        ),
+        Scenario(
+            'admin_comment-list', 'get',
+            lambda ctx, i, p: reverse('admin_comment-list') + f"?issue={ctx.issue.id}",
+        ),
+        Scenario(
+            'admin_comment-create', 'post', lambda ctx, i, p: reverse('admin_comment-list'),
+            data=lambda ctx, i, p: {'description': f"Benchmark {i}", 'issue': ctx.issue.id},
+            expected_status=201,
+        ),
+        Scenario(
+            'admin_comment-retrieve', 'get',
+            lambda ctx, i, p: reverse('admin_comment-detail', args=[ctx.own_comment.id]),
+        ),
+        Scenario(
+            'admin_comment-partial-update', 'patch',
+            lambda ctx, i, p: reverse('admin_comment-detail', args=[ctx.own_comment.id]),
+            data=lambda ctx, i, p: {'description': f"Révision {i}"},
+        ),
+        Scenario(
+            'admin_comment-destroy', 'delete', lambda ctx, i, p: reverse('admin_comment-detail', args=[p.id]),
+            setup=new_comment, expected_status=204,
+        ),
+        Scenario(
+            'project_change_author', 'patch',
+            lambda ctx, i, p: reverse('project_change_author', args=[ctx.project.id]),
+            data=lambda ctx, i, p: {'author': ctx.author.id},
+        ),
+        Scenario(
+            'issue_change_author', 'patch',
+            lambda ctx, i, p: reverse('issue_change_author', args=[ctx.own_issue.id]),
+            data=lambda ctx, i, p: {'author': ctx.author.id},
+        ),
+        Scenario(
+            'comment_change_author', 'patch',
+            lambda ctx, i, p: reverse('comment_change_author', args=[ctx.own_comment.id]),
+            data=lambda ctx, i, p: {'author': ctx.author.id},
+        ),
+        Scenario(
+            'project_add_contributor', 'post', lambda ctx, i, p: reverse('project_add_contributor'),
+            data=contributor_body, setup=without_outsider,
+        ),
+        Scenario(
+            'project_delete_contributor', 'delete', lambda ctx, i, p: reverse('project_delete_contributor'),
+            data=contributor_body, setup=with_outsider,
+        ),
+        Scenario(
+            'project_add_contributors', 'post', lambda ctx, i, p: reverse('project_add_contributors'),
+            data=contributors_body, setup=without_batch,
+        ),
+        Scenario(
+            'project_delete_contributors', 'delete', lambda ctx, i, p: reverse('project_delete_contributors'),
+            data=contributors_body, setup=with_batch,
+        ),
+        Scenario(
+            'issue_change_attribution', 'patch',
+            lambda ctx, i, p: reverse('issue_change_attribution', args=[ctx.own_issue.id]),
+            data=lambda ctx, i, p: {'attribution': ctx.author.id},
+        ),
+        Scenario('project_issues', 'get', lambda ctx, i, p: reverse('project_issues', args=[ctx.project.id])),
+        Scenario(
+            'project_issues-triage', 'get',
+            lambda ctx, i, p: reverse('project_issues', args=[ctx.project.id]) + "?progression=To Do&priority=High",
+        ),
+        Scenario('issue_comments', 'get', lambda ctx, i, p: reverse('issue_comments', args=[ctx.issue.id])),
+        Scenario('search', 'get', lambda ctx, i, p: reverse('search') + "?q=erreur"),
+        Scenario('sync', 'get', lambda ctx, i, p: reverse('sync')),
+        Scenario('sync-delta', 'get', lambda ctx, i, p: reverse('sync') + f"?since={ctx.sync_token}"),
+    ]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+@contextmanager
+def disposable_database():
+    """
+    Base de test en mémoire pour la durée d'un benchmark. La base de
+    développement n'est pas ouverte en WAL si elle l'est par erreur :
+    config.sqlite réécrirait l'en-tête de db.sqlite3.
+    """
+    options = connection.settings_dict['OPTIONS']
+    options['pragmas'] = {**options.get('pragmas', {}), 'journal_mode': None}
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def capture_queries():
+    """
+    Requêtes SQL de toutes les bases, réplicas et bases des clients comprises
+    (comme config.instrumentation), retournées dans la liste produite.
+    """
+    with ExitStack() as stack:
+        captures = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+        queries = []
+        yield queries
+    for captured in captures:
+        queries.extend(captured.captured_queries)
+
+
+def run_scenario(scenario, context, iterations):
+    client = APIClient()
+    if scenario.user is not None:
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {context.tokens[scenario.user]['access']}")
+
+    def call(i):
+        prepared = scenario.setup(context, i) if scenario.setup else None
+        url = scenario.url(context, i, prepared)
+        data = scenario.data(context, i, prepared) if scenario.data else None
+        def request():
+            response = getattr(client, scenario.method)(url, data, format='json')
+            if response.streaming:
+                # le corps d'une réponse en flux est produit pendant la lecture
+                b"".join(response.streaming_content)
+            return response
+        return request
+
+    durations = []
+    queries = []
+    statuses = set()
+    for i in range(iterations):
+        request = call(i)
+        with capture_queries() as captured:
+            started = time.perf_counter()
+            response = request()
+            durations.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+
+    # tracemalloc ralentit fortement l'exécution : pic mémoire mesuré sur un appel à part
+    request = call(iterations)
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(statistics.median(durations), 2),
+        'p95_ms': round(percentile(durations, 0.95), 2),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024, 1),
+        'statuses': sorted(statuses),
+        'expected_status': scenario.expected_status,
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    Retourne la liste des dépassements : le nombre de requêtes ne doit jamais
+    augmenter, latence et mémoire peuvent varier jusqu'au facteur tolerance.
+    """
+    failures = []
+    for name, result in report['endpoints'].items():
+        if result['statuses'] != [result['expected_status']]:
+            failures.append(f"{name} : statut {result['statuses']} au lieu de {result['expected_status']}")
+        budget = baseline.get('endpoints', {}).get(name)
+        if budget is None:
+            continue
+        if result['queries'] > budget['queries']:
+            failures.append(f"{name} : {result['queries']} requêtes SQL (budget {budget['queries']})")
+        if result['p95_ms'] > budget['p95_ms'] * tolerance:
+            failures.append(f"{name} : p95 {result['p95_ms']} ms (budget {budget['p95_ms']} ms x {tolerance})")
+        if result['peak_kb'] > budget['peak_kb'] * tolerance:
+            failures.append(f"{name} : pic mémoire {result['peak_kb']} Ko (budget {budget['peak_kb']} Ko x {tolerance})")
+    return failures
@@ -0,0 +1,173 @@
+"""
+Créations en lot : chaque élément est validé sans requête, les références
+(projets, utilisateurs, doublons) sont vérifiées pour tout le lot en une
+requête par table, puis les éléments valides sont insérés avec bulk_create
+dans une seule transaction. Les éléments invalides sont retournés avec leurs
+erreurs sans bloquer les autres.
+"""
+
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from support.access import get_project_access
+from support.counters import update_comments_count, update_issues_count
+from support.models import Comment, Issue
+from support.versions import touch
+from support.serializers import CommentBulkItemSerializer, IssueBulkItemSerializer
+
+UserModel = get_user_model()
+
+UNKNOWN_REFERENCE = "Référence inconnue"
+
+
+def validate_items(serializer_class, items):
+    """Retourne (éléments valides [(index, validated_data)], erreurs {index: erreurs})."""
+    valid = []
+    errors = {}
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors[index] = serializer.errors
+    return valid, errors
+
+
+def bulk_response(created, errors):
+    """201 si tout est créé, 207 si une partie seulement, 400 si rien ne l'est."""
+    if not errors:
+        response_status = status.HTTP_201_CREATED
+    elif created:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_400_BAD_REQUEST
+    return Response({
+        'created': created,
+        'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+    }, status=response_status)
+
+
+class BulkCreateMixin:
+    """
+    Pour un ModelViewSet : create accepte aussi une liste, confiée à
+    bulk_create_function(request, items), déclarée avec staticmethod, qui
+    retourne (objets créés, erreurs).
+    """
+
+    bulk_create_function = None
+    max_bulk_size = 1000
+
+    def is_bulk_request(self, request):
+        return isinstance(request.data, list)
+
+    def create(self, request, *args, **kwargs):
+        if not self.is_bulk_request(request):
+            return super().create(request, *args, **kwargs)
+
+        if len(request.data) > self.max_bulk_size:
+            raise ValidationError({"detail": f"Un lot est limité à {self.max_bulk_size} éléments."})
+        try:
+            created, errors = self.bulk_create_function(request, request.data)
+        except IntegrityError:
+            # un doublon a été créé entre la vérification et l'insertion
+            return Response(
+                {"detail": "Conflit avec une écriture concurrente, le lot n'a pas été créé."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return bulk_response(self.get_serializer(created, many=True).data, errors)
+
+
+def bulk_create_issues(request, items):
+    user = request.user
+    valid, errors = validate_items(IssueBulkItemSerializer, items)
+
+    access = get_project_access(request)
+    known_users = set(UserModel.objects.filter(
+        id__in={data['attribution'] for _, data in valid},
+        client_id=user.client_id,
+    ).values_list('id', flat=True)) if valid else set()
+    existing_names = set(Issue.objects.filter(
+        project_id__in={data['project'] for _, data in valid},
+        name__in={data['name'] for _, data in valid},
+    ).values_list('project_id', 'name')) if valid else set()
+
+    issues = []
+    seen_names = set()
+    for index, data in valid:
+        item_errors = {}
+        if not access.is_contributor(data['project']):
+            item_errors['project'] = [UNKNOWN_REFERENCE]
+        if data['attribution'] not in known_users:
+            item_errors['attribution'] = [UNKNOWN_REFERENCE]
+        key = (data['project'], data['name'])
+        if key in existing_names or key in seen_names:
+            item_errors['name'] = ["Un problème de ce nom existe déjà dans le projet."]
+        if item_errors:
+            errors[index] = item_errors
+            continue
+        seen_names.add(key)
+        project_id = data.pop('project')
+        attribution_id = data.pop('attribution')
+        issues.append(Issue(
+            author_id=user.id,
+            project_id=project_id,
+            attribution_id=attribution_id,
+            **data,
+        ))
+
+    with transaction.atomic():
+        created = Issue.objects.bulk_create(issues)
+        per_project = Counter(issue.project_id for issue in created)
+        for project_id, count in per_project.items():
+            update_issues_count(project_id, count)
+        touch(project_ids=per_project)
+
+    return created, errors
+
+
+def bulk_create_comments(request, items):
+    user = request.user
+    valid, errors = validate_items(CommentBulkItemSerializer, items)
+
+    # projet de chaque problème référencé, l'accès est ensuite lu dans l'index
+    issue_projects = dict(Issue.objects.filter(
+        id__in={data['issue'] for _, data in valid},
+        project__is_active=True,
+    ).values_list('id', 'project_id')) if valid else {}
+    access = get_project_access(request)
+    existing_descriptions = set(Comment.objects.filter(
+        issue_id__in=issue_projects.keys(),
+        description__in={data['description'] for _, data in valid},
+    ).values_list('issue_id', 'description')) if issue_projects else set()
+
+    comments = []
+    seen_descriptions = set()
+    for index, data in valid:
+        project_id = issue_projects.get(data['issue'])
+        if project_id is None or not access.is_contributor(project_id):
+            errors[index] = {'issue': [UNKNOWN_REFERENCE]}
+            continue
+        key = (data['issue'], data['description'])
+        if key in existing_descriptions or key in seen_descriptions:
+            errors[index] = {'description': ["Ce commentaire existe déjà pour ce problème."]}
+            continue
+        seen_descriptions.add(key)
+        comments.append(Comment(
+            author_id=user.id,
+            issue_id=data['issue'],
+            description=data['description'],
+        ))
+
+    with transaction.atomic():
+        created = Comment.objects.bulk_create(comments)
+        per_issue = Counter(comment.issue_id for comment in created)
+        for issue_id, count in per_issue.items():
+            update_comments_count(issue_id, count)
+        touch(project_ids={issue_projects[issue_id] for issue_id in per_issue}, issue_ids=per_issue)
+
+    return created, errors
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+from config.instrumentation import count_event
+
+HIT = 'hit'
+MISS = 'miss'
+STALE = 'stale'
+
+
+class ProjectDetailCache:
+    """
+    Cache des réponses de ProjectDetailView. Une entrée par projet porte
+    la version (compteur version et updated_at) avec laquelle elle a été
+    construite : toute écriture passant par support.versions.touch() la rend
+    obsolète sans suppression explicite.
+
+    Une entrée obsolète peut encore être servie pendant
+    SUPPORT_PROJECT_DETAIL_STALE_TIMEOUT secondes après l'écriture, le temps
+    qu'une seule requête reconstruise l'arbre (les autres ne font pas la queue
+    sur la base pendant ce temps).
+    """
+
+    # durée maximale de la reconstruction d'une entrée par une requête
+    refresh_lock_timeout = 10
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = Counter()
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'SUPPORT_PROJECT_DETAIL_CACHE', 'default')]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'SUPPORT_PROJECT_DETAIL_CACHE_TIMEOUT', 0)
+
+    @property
+    def stale_timeout(self):
+        return getattr(settings, 'SUPPORT_PROJECT_DETAIL_STALE_TIMEOUT', 0)
+
+    def _key(self, project_id):
+        return f'project_detail:{project_id}'
+
+    def record(self, event):
+        with self._lock:
+            self.metrics[event] += 1
+        count_event(f'project_detail_cache.{event}')
+
+    def get_or_build(self, project_id, version, updated_at, build):
+        """
+        Retourne (données, updated_at des données, évènement). build() n'est
+        appelé que si aucune entrée utilisable n'existe pour cette version.
+        """
+        if not self.timeout:
+            return build(), updated_at, MISS
+
+        key = self._key(project_id)
+        entry = self.cache.get(key)
+        if entry is not None and entry['version'] == (version, updated_at):
+            self.record(HIT)
+            return entry['data'], updated_at, HIT
+
+        if entry is not None and self.is_recent(updated_at):
+            # une autre requête reconstruit déjà l'entrée : l'ancienne version est servie
+            if not self.cache.add(f'{key}:refresh', 1, self.refresh_lock_timeout):
+                self.record(STALE)
+                return entry['data'], entry['version'][1], STALE
+
+        self.record(MISS)
+        data = build()
+        self.cache.set(key, {'version': (version, updated_at), 'data': data}, self.timeout)
+        self.cache.delete(f'{key}:refresh')
+        return data, updated_at, MISS
+
+    async def aget_or_build(self, project_id, version, updated_at, abuild):
+        """get_or_build pour les vues asynchrones, abuild est une coroutine."""
+        if not self.timeout:
+            return await abuild(), updated_at, MISS
+
+        key = self._key(project_id)
+        entry = await self.cache.aget(key)
+        if entry is not None and entry['version'] == (version, updated_at):
+            self.record(HIT)
+            return entry['data'], updated_at, HIT
+
+        if entry is not None and self.is_recent(updated_at):
+            if not await self.cache.aadd(f'{key}:refresh', 1, self.refresh_lock_timeout):
+                self.record(STALE)
+                return entry['data'], entry['version'][1], STALE
+
+        self.record(MISS)
+        data = await abuild()
+        await self.cache.aset(key, {'version': (version, updated_at), 'data': data}, self.timeout)
+        await self.cache.adelete(f'{key}:refresh')
+        return data, updated_at, MISS
+
+    def is_recent(self, updated_at):
+        return time.time() - updated_at.timestamp() < self.stale_timeout
+
+
+project_detail_cache = ProjectDetailCache()
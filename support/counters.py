@@ -0,0 +1,50 @@
+from django.db.models import Count, F
+
+from support.models import Project, Issue, Comment
+
+
+# Les compteurs sont modifiés par une expression F() : l'incrément est fait
+# par la base dans l'UPDATE, deux écritures concurrentes ne s'écrasent pas.
+
+def update_issues_count(project_id, delta):
+    Project.all_objects.filter(id=project_id).update(issues_count=F('issues_count') + delta)
+
+
+def update_comments_count(issue_id, delta):
+    Issue.objects.filter(id=issue_id).update(comments_count=F('comments_count') + delta)
+
+
+def reconcile_issues_count(project_ids):
+    """Recalcule issues_count pour les projets donnés, retourne le nombre de projets corrigés."""
+    actual = dict(
+        Issue.objects.filter(project_id__in=project_ids)
+        .values_list('project_id')
+        .annotate(total=Count('id'))
+    )
+    drifted = [
+        project
+        for project in Project.all_objects.filter(id__in=project_ids).only('id', 'issues_count')
+        if project.issues_count != actual.get(project.id, 0)
+    ]
+    for project in drifted:
+        project.issues_count = actual.get(project.id, 0)
+    Project.all_objects.bulk_update(drifted, ['issues_count'])
+    return len(drifted)
+
+
+def reconcile_comments_count(issue_ids):
+    """Recalcule comments_count pour les problèmes donnés, retourne le nombre de problèmes corrigés."""
+    actual = dict(
+        Comment.objects.filter(issue_id__in=issue_ids)
+        .values_list('issue_id')
+        .annotate(total=Count('id'))
+    )
+    drifted = [
+        issue
+        for issue in Issue.objects.filter(id__in=issue_ids).only('id', 'comments_count')
+        if issue.comments_count != actual.get(issue.id, 0)
+    ]
+    for issue in drifted:
+        issue.comments_count = actual.get(issue.id, 0)
+    Issue.objects.bulk_update(drifted, ['comments_count'])
+    return len(drifted)
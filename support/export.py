@@ -0,0 +1,138 @@
+"""
+Export d'un projet en flux : une ligne par projet, contributeur, problème et
+commentaire. Les lignes sont lues avec values().iterator() et écrites au fur
+et à mesure, la mémoire utilisée ne dépend pas de la taille du projet.
+
+Les utilisateurs sont exportés par leur username, le fichier NDJSON peut
+donc être réimporté chez un autre client (commande import_ndjson).
+
+Sous ASGI Django lit un itérateur synchrone en entier avant d'envoyer la
+réponse : la vue y passe les blocs par aiterate, un bloc à la fois.
+"""
+
+import csv
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from support.models import ProjectContributors, Issue, Comment
+
+CHUNK_SIZE = 2000
+# taille des blocs envoyés au client
+BUFFER_SIZE = 64 * 1024
+
+CSV_COLUMNS = [
+    "type", "id", "parent", "name", "description", "project_type", "priority",
+    "balise", "progression", "author", "attribution", "time_created",
+]
+
+
+def export_records(project):
+    """
+    Enregistrements du projet, les parents toujours avant leurs enfants. Les
+    dates sont écrites en isoformat complet (DjangoJSONEncoder tronque à la ms).
+    """
+    yield {
+        "type": "project",
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "project_type": project.type,
+        "author": project.author.username,
+        "time_created": project.time_created.isoformat(),
+    }
+
+    # le flux est lu après la vue : même base que le projet, réplica compris
+    database = project._state.db
+    contributors = ProjectContributors.objects.using(database).filter(
+        project_id=project.id,
+    ).order_by('id').values_list('contributor__username', flat=True)
+    for username in contributors.iterator(chunk_size=CHUNK_SIZE):
+        yield {"type": "contributor", "parent": project.id, "author": username}
+
+    issues = Issue.objects.using(database).filter(project_id=project.id).order_by('id').values(
+        'id', 'name', 'description', 'priority', 'balise', 'progression',
+        'time_created', 'author__username', 'attribution__username',
+    )
+    for row in issues.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "type": "issue",
+            "id": row['id'],
+            "parent": project.id,
+            "name": row['name'],
+            "description": row['description'],
+            "priority": row['priority'],
+            "balise": row['balise'],
+            "progression": row['progression'],
+            "author": row['author__username'],
+            "attribution": row['attribution__username'],
+            "time_created": row['time_created'].isoformat(),
+        }
+
+    # parcours de comment_issue_recent_idx : les commentaires d'un problème sont contigus
+    comments = Comment.objects.using(database).filter(issue__project_id=project.id).order_by(
+        'issue_id', 'time_created', 'id',
+    ).values('id', 'issue_id', 'description', 'time_created', 'author__username')
+    for row in comments.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "type": "comment",
+            "id": row['id'],
+            "parent": row['issue_id'],
+            "description": row['description'],
+            "author": row['author__username'],
+            "time_created": row['time_created'].isoformat(),
+        }
+
+
+def ndjson_lines(records):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for record in records:
+        yield encoder.encode(record) + "\n"
+
+
+class _Echo:
+    # csv.writer écrit dans un fichier : on récupère directement la ligne produite
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_COLUMNS, restval="")
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+def buffered(lines):
+    """Regroupe les lignes en blocs d'environ BUFFER_SIZE octets."""
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 : en-tête et pied gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def aiterate(chunks):
+    """Itérateur asynchrone sur les blocs, lus un par un dans le thread de l'ORM."""
+    iterator = iter(chunks)
+    # thread_sensitive : le curseur d'iterator() reste dans le même thread
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(iterator, None)) is not None:
+        yield chunk
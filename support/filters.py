@@ -0,0 +1,131 @@
+from datetime import datetime, time
+
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from support.models import Issue
+
+
+def ranked(field, values):
+    """Rang d'un champ à choix dans l'ordre métier (Low < Medium < High...)."""
+    return Case(
+        *[When(**{field: value}, then=Value(rank)) for rank, value in enumerate(values)],
+        default=Value(len(values)),
+        output_field=IntegerField(),
+    )
+
+
+class IssueFilter:
+    """
+    Filtres et tri des listes de problèmes, lus dans les paramètres d'URL :
+      - priority, progression, balise : une ou plusieurs valeurs séparées par des virgules
+      - attribution : ids d'utilisateurs séparés par des virgules, ou "me"
+      - created_after, created_before : date ou date-heure ISO 8601
+      - ordering : une des clés de ORDERINGS, -time_created par défaut
+
+    Les égalités sur progression et priority suivies du tri par date passent
+    par issue_project_triage_idx, attribution par issue_project_attribution_idx.
+    """
+
+    CHOICES = {
+        'priority': Issue.Priority.values,
+        'progression': Issue.Progression.values,
+        'balise': Issue.Balise.values,
+    }
+    # ordre de pagination keyset : le dernier champ départage toujours les égalités
+    ORDERINGS = {
+        '-time_created': ('-time_created', '-id'),
+        'time_created': ('time_created', 'id'),
+        '-priority': ('-priority_rank', '-time_created', '-id'),
+        'priority': ('priority_rank', '-time_created', '-id'),
+        '-progression': ('-progression_rank', '-time_created', '-id'),
+        'progression': ('progression_rank', '-time_created', '-id'),
+    }
+    RANKS = {
+        'priority_rank': ranked('priority', Issue.Priority.values),
+        'progression_rank': ranked('progression', Issue.Progression.values),
+    }
+
+    def __init__(self, request):
+        self.request = request
+        self.params = request.query_params
+        self.errors = {}
+        self.conditions = self.parse_conditions()
+        self.ordering = self.parse_ordering()
+        if self.errors:
+            raise ValidationError(self.errors)
+
+    def values(self, name):
+        raw = self.params.get(name)
+        if raw is None:
+            return None
+        return [value.strip() for value in raw.split(',') if value.strip()]
+
+    def parse_conditions(self):
+        conditions = Q()
+        for name, choices in self.CHOICES.items():
+            values = self.values(name)
+            if values is None:
+                continue
+            invalid = [value for value in values if value not in choices]
+            if invalid or not values:
+                self.errors[name] = f"Valeurs possibles : {', '.join(choices)}."
+                continue
+            conditions &= Q(**{name: values[0]}) if len(values) == 1 else Q(**{f'{name}__in': values})
+
+        attribution = self.values('attribution')
+        if attribution is not None:
+            ids = [self.request.user.id if value == 'me' else value for value in attribution]
+            try:
+                ids = [int(value) for value in ids]
+            except ValueError:
+                ids = []
+            if not ids:
+                self.errors['attribution'] = "Ids d'utilisateurs séparés par des virgules, ou me."
+            else:
+                conditions &= Q(attribution_id=ids[0]) if len(ids) == 1 else Q(attribution_id__in=ids)
+
+        for name, lookup in (('created_after', 'time_created__gte'), ('created_before', 'time_created__lt')):
+            raw = self.params.get(name)
+            if raw is None:
+                continue
+            moment = self.parse_moment(raw)
+            if moment is None:
+                self.errors[name] = "Date ou date-heure ISO 8601 attendue."
+            else:
+                conditions &= Q(**{lookup: moment})
+        return conditions
+
+    def parse_moment(self, raw):
+        try:
+            moment = parse_datetime(raw)
+            if moment is None:
+                day = parse_date(raw)
+                if day is None:
+                    return None
+                moment = datetime.combine(day, time.min)
+        except ValueError:
+            return None
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def parse_ordering(self):
+        ordering = self.params.get('ordering', '-time_created')
+        if ordering not in self.ORDERINGS:
+            self.errors['ordering'] = f"Valeurs possibles : {', '.join(self.ORDERINGS)}."
+            return None
+        return self.ORDERINGS[ordering]
+
+    def filter_queryset(self, queryset):
+        queryset = queryset.filter(self.conditions)
+        ranks = {
+            field.lstrip('-'): self.RANKS[field.lstrip('-')]
+            for field in self.ordering
+            if field.lstrip('-') in self.RANKS
+        }
+        if ranks:
+            queryset = queryset.annotate(**ranks)
+        return queryset
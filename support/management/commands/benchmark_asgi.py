@@ -0,0 +1,214 @@
+import asyncio
+import io
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.urls import reverse
+
+from support.benchmark import BenchmarkContext, disposable_database, percentile
+from support.models import Project
+from support.management.commands.generate_dataset import PASSWORD
+
+HOST = 'testserver'
+
+
+class Command(BaseCommand):
+
+    help = 'Compare le débit des lectures sous WSGI (pool de threads) et ASGI avec des clients lents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark_asgi.json')
+        parser.add_argument('--concurrency', type=int, default=64, help="clients simultanés")
+        parser.add_argument('--requests', type=int, default=2, help="requêtes successives par client")
+        parser.add_argument('--threads', type=int, default=8, help="threads du serveur WSGI (gunicorn gthread)")
+        parser.add_argument('--client-delay-ms', type=float, default=500, help="temps de réception de la réponse (mobile)")
+        parser.add_argument('--clients', type=int, default=2)
+        parser.add_argument('--users', type=int, default=30)
+        parser.add_argument('--projects', type=int, default=50)
+        parser.add_argument('--issues', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=2026)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        dataset = {key: options[key] for key in ('clients', 'users', 'projects', 'issues', 'comments', 'seed')}
+
+        # base de test jetable : la base de développement n'est jamais modifiée
+        with disposable_database():
+            call_command('generate_dataset', stdout=self.stdout, **dataset)
+            report = self.run(dataset, options)
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(f"Rapport écrit dans {options['output']}")
+        self.stdout.write(self.style.SUCCESS("All Done !"))
+
+    def run(self, dataset, options):
+        context = BenchmarkContext(PASSWORD)
+        token = context.tokens['author']['access']
+        # projet de taille médiane : le rendu de l'arbre du plus gros projet masquerait le reste
+        projects = Project.objects.filter(author=context.author).order_by('issues_count')
+        project = projects[projects.count() // 2]
+        endpoints = {
+            'project-list': reverse('project-list'),
+            'project-detail': reverse('project-detail', args=[project.id]),
+            'project_issues': reverse('project_issues', args=[context.project.id]),
+            'issue_comments': reverse('issue_comments', args=[context.issue.id]),
+        }
+        delay = options['client_delay_ms'] / 1000
+
+        self.stdout.write(
+            f"{options['concurrency']} clients x {options['requests']} requêtes, "
+            f"réception {options['client_delay_ms']} ms, WSGI {options['threads']} threads"
+        )
+        self.stdout.write(f"{'endpoint':18} {'serveur':8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'threads':>8}")
+        results = {}
+        for name, url in endpoints.items():
+            results[name] = {}
+            for server, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+                result = run(url, token, options['concurrency'], options['requests'], options['threads'], delay)
+                results[name][server] = result
+                self.stdout.write(
+                    f"{name:18} {server:8} {result['throughput']:>9} {result['p50_ms']:>9} "
+                    f"{result['p95_ms']:>9} {result['threads']:>8}"
+                )
+
+        return {
+            'dataset': dataset,
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'wsgi_threads': options['threads'],
+            'client_delay_ms': options['client_delay_ms'],
+            'endpoints': results,
+        }
+
+    def run_wsgi(self, url, token, concurrency, requests, threads, delay):
+        """
+        Un pool de threads sert les requêtes dans l'ordre d'arrivée ; un thread
+        reste occupé pendant que le client reçoit la réponse.
+        """
+        handler = WSGIHandler()
+        path, query = split(url)
+
+        def serve(queued):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': query,
+                'SERVER_NAME': HOST,
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': HOST,
+                'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'wsgi.input': io.BytesIO(),
+                'wsgi.url_scheme': 'http',
+                'wsgi.errors': io.StringIO(),
+            }
+            statuses = []
+            body = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            for _ in body:
+                pass
+            time.sleep(delay)
+            body.close()
+            check_status(statuses[0])
+            return time.perf_counter() - queued
+
+        def close_connections():
+            connections.close_all()
+
+        peak = threading.active_count()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = [pool.submit(serve, time.perf_counter()) for _ in range(concurrency * requests)]
+            durations = [future.result() for future in futures]
+            peak = max(peak, threading.active_count())
+            for _ in range(threads):
+                pool.submit(close_connections)
+        return summary(durations, time.perf_counter() - started, peak)
+
+    def run_asgi(self, url, token, concurrency, requests, threads, delay):
+        """
+        Une boucle d'évènements sert tous les clients ; pendant la réception
+        d'une réponse elle traite les autres requêtes.
+        """
+        handler = ASGIHandler()
+        path, query = split(url)
+        durations = []
+        peak = [threading.active_count()]
+
+        async def serve():
+            queued = time.perf_counter()
+            done = asyncio.Event()
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': query.encode(),
+                'root_path': '',
+                'headers': [(b'host', HOST.encode()), (b'authorization', f'Bearer {token}'.encode())],
+                'client': ('127.0.0.1', 0),
+                'server': (HOST, 80),
+            }
+            received = []
+
+            async def receive():
+                if not received:
+                    received.append(True)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    check_status(message['status'])
+                elif not message.get('more_body', False):
+                    await asyncio.sleep(delay)
+                    done.set()
+
+            await handler(scope, receive, send)
+            durations.append(time.perf_counter() - queued)
+            peak[0] = max(peak[0], threading.active_count())
+
+        async def client():
+            for _ in range(requests):
+                await serve()
+
+        async def main():
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return summary(durations, time.perf_counter() - started, peak[0])
+
+
+def split(url):
+    parts = urlsplit(url)
+    return parts.path, parts.query
+
+
+def check_status(status):
+    code = int(str(status).split()[0])
+    if code != 200:
+        raise RuntimeError(f"Statut HTTP inattendu : {status}")
+
+
+def summary(durations, elapsed, threads):
+    return {
+        'throughput': round(len(durations) / elapsed, 1),
+        'p50_ms': round(statistics.median(durations) * 1000, 2),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 2),
+        'threads': threads,
+    }
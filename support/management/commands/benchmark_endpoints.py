@@ -0,0 +1,86 @@
+import json
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from support.benchmark import (
+    BenchmarkContext,
+    build_scenarios,
+    compare_with_baseline,
+    disposable_database,
+    run_scenario,
+)
+from support.management.commands.generate_dataset import PASSWORD
+
+
+class Command(BaseCommand):
+
+    help = "Mesure chaque endpoint de l'API sur un jeu de données généré"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', default='benchmark_report.json')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmark_baseline.json'))
+        parser.add_argument('--update-baseline', action='store_true', help="remplace la référence par ce rapport")
+        parser.add_argument('--tolerance', type=float, default=1.5, help="facteur accepté sur latence et mémoire")
+        parser.add_argument('--only', nargs='*', help="noms des endpoints à mesurer")
+        parser.add_argument('--clients', type=int, default=2)
+        parser.add_argument('--users', type=int, default=30)
+        parser.add_argument('--projects', type=int, default=50)
+        parser.add_argument('--issues', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=2026)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        dataset = {key: options[key] for key in ('clients', 'users', 'projects', 'issues', 'comments', 'seed')}
+
+        # base de test jetable : la base de développement n'est jamais modifiée
+        with disposable_database():
+            call_command('generate_dataset', stdout=self.stdout, **dataset)
+            report = self.run(dataset, options)
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(f"Rapport écrit dans {options['output']}")
+
+        if options['update_baseline']:
+            with open(options['baseline'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Référence mise à jour : {options['baseline']}"))
+            return
+
+        try:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING("Pas de référence, seuls les statuts HTTP sont vérifiés."))
+            baseline = {}
+
+        failures = compare_with_baseline(report, baseline, options['tolerance'])
+        if failures:
+            raise CommandError("Budgets dépassés :\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("All Done !"))
+
+    def run(self, dataset, options):
+        context = BenchmarkContext(PASSWORD)
+        scenarios = build_scenarios()
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['only']]
+
+        self.stdout.write(f"{'endpoint':32} {'p50 ms':>9} {'p95 ms':>9} {'requêtes':>9} {'pic Ko':>9}")
+        endpoints = {}
+        for scenario in scenarios:
+            result = run_scenario(scenario, context, options['iterations'])
+            endpoints[scenario.name] = result
+            self.stdout.write(
+                f"{scenario.name:32} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+                f"{result['queries']:>9} {result['peak_kb']:>9}"
+            )
+
+        return {
+            'dataset': dataset,
+            'iterations': options['iterations'],
+            'endpoints': endpoints,
+        }
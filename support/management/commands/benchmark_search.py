@@ -0,0 +1,82 @@
+import json
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from support.access import ProjectAccess
+from support.benchmark import disposable_database, percentile
+from support.models import Project
+from support.search import TYPES, parse_terms, search_fts, search_icontains, uses_fts
+
+# un terme fréquent, un terme rare, deux termes, un préfixe en cours de saisie
+DEFAULT_QUERIES = ["erreur", "recette", "connexion serveur", "authentif"]
+
+
+class Command(BaseCommand):
+
+    help = 'Compare la recherche FTS5 et icontains sur un jeu de données généré'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', default='benchmark_search.json')
+        parser.add_argument('--queries', nargs='*', default=DEFAULT_QUERIES)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--clients', type=int, default=3)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--issues', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=2026)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        if not uses_fts():
+            raise CommandError("La recherche plein texte n'est disponible que sous SQLite.")
+        dataset = {key: options[key] for key in ('clients', 'users', 'projects', 'issues', 'comments', 'seed')}
+
+        # base de test jetable : la base de développement n'est jamais modifiée
+        with disposable_database():
+            call_command('generate_dataset', stdout=self.stdout, **dataset)
+            report = self.run(dataset, options)
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(f"Rapport écrit dans {options['output']}")
+        self.stdout.write(self.style.SUCCESS("All Done !"))
+
+    def run(self, dataset, options):
+        # l'auteur du plus gros projet : périmètre de recherche le plus large
+        author = Project.objects.order_by('-issues_count').first().author
+        access = ProjectAccess.load(author)
+        project_ids = access.contributed_ids | access.authored_ids
+
+        self.stdout.write(f"{len(project_ids)} projets dans le périmètre de {author.username}")
+        self.stdout.write(f"{'requête':24} {'moteur':10} {'p50 ms':>9} {'p95 ms':>9} {'résultats':>10}")
+        queries = {}
+        for query in options['queries']:
+            terms = parse_terms(query)
+            queries[query] = {}
+            for engine, function in (('fts5', search_fts), ('icontains', search_icontains)):
+                durations = []
+                for _ in range(options['iterations']):
+                    started = time.perf_counter()
+                    results = function(terms, project_ids, TYPES, options['page_size'], 0)
+                    durations.append((time.perf_counter() - started) * 1000)
+                result = {
+                    'p50_ms': round(statistics.median(durations), 2),
+                    'p95_ms': round(percentile(durations, 0.95), 2),
+                    'results': len(results),
+                }
+                queries[query][engine] = result
+                self.stdout.write(
+                    f"{query:24} {engine:10} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['results']:>10}"
+                )
+
+        return {
+            'dataset': dataset,
+            'iterations': options['iterations'],
+            'projects': len(project_ids),
+            'queries': queries,
+        }
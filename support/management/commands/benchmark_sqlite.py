@@ -0,0 +1,199 @@
+import json
+import logging
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from support.benchmark import BenchmarkContext, percentile
+from support.management.commands.generate_dataset import PASSWORD
+
+# réglages d'origine (SQLite par défaut, une connexion par requête) et config.sqlite
+VARIANTS = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}, 'CONN_MAX_AGE': 0},
+    'tuned': {'ENGINE': 'config.sqlite', 'OPTIONS': {}, 'CONN_MAX_AGE': 600},
+}
+
+
+class Command(BaseCommand):
+
+    help = "Compare SQLite par défaut et config.sqlite sous des lectures et écritures concurrentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark_sqlite.json')
+        parser.add_argument('--readers', type=int, default=4, help="threads de lecture")
+        parser.add_argument('--writers', type=int, default=4, help="threads d'écriture")
+        parser.add_argument('--duration', type=float, default=10, help="secondes par variante")
+        parser.add_argument('--clients', type=int, default=2)
+        parser.add_argument('--users', type=int, default=30)
+        parser.add_argument('--projects', type=int, default=50)
+        parser.add_argument('--issues', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=2026)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        dataset = {key: options[key] for key in ('clients', 'users', 'projects', 'issues', 'comments', 'seed')}
+
+        # base de test jetable sur disque : WAL et verrous n'existent pas en mémoire
+        directory = Path(tempfile.mkdtemp(prefix='softdesk_sqlite_'))
+        settings_dict = connection.settings_dict
+        settings_dict['TEST']['NAME'] = str(directory / 'dataset.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            call_command('generate_dataset', stdout=self.stdout, **dataset)
+            context = BenchmarkContext(PASSWORD)
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            connection.close()
+            report = self.run(context, directory, dict(settings_dict), dataset, options)
+        finally:
+            connections.close_all()
+            connections.settings['default'] = settings_dict
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(f"Rapport écrit dans {options['output']}")
+        self.stdout.write(self.style.SUCCESS("All Done !"))
+
+    def run(self, context, directory, settings_dict, dataset, options):
+        self.stdout.write(
+            f"{options['readers']} lecteurs, {options['writers']} écrivains, {options['duration']} s par variante"
+        )
+        self.stdout.write(
+            f"{'variante':9} {'lect/s':>8} {'p95 ms':>8} {'écr/s':>8} {'p95 ms':>8} {'verrous':>8} {'erreurs':>8}"
+        )
+        results = {}
+        for name, variant in VARIANTS.items():
+            # chaque variante part d'une copie du même jeu de données
+            path = directory / f'{name}.sqlite3'
+            shutil.copyfile(settings_dict['NAME'], path)
+            connections.close_all()
+            connections.settings['default'] = {**settings_dict, **variant, 'NAME': str(path)}
+            del connections['default']
+            if name == 'stock':
+                with connection.cursor() as cursor:
+                    # le journal WAL est mémorisé dans le fichier copié
+                    cursor.execute('PRAGMA journal_mode = DELETE')
+                connection.close()
+
+            # les erreurs de verrou sont comptées, pas journalisées
+            logger = logging.getLogger('django.request')
+            level = logger.level
+            logger.setLevel(logging.CRITICAL)
+            try:
+                result = self.measure(context, options)
+            finally:
+                logger.setLevel(level)
+            results[name] = result
+            self.stdout.write(
+                f"{name:9} {result['reads_per_s']:>8} {result['read_p95_ms']:>8} "
+                f"{result['writes_per_s']:>8} {result['write_p95_ms']:>8} "
+                f"{result['locked']:>8} {result['errors']:>8}"
+            )
+
+        return {
+            'dataset': dataset,
+            'readers': options['readers'],
+            'writers': options['writers'],
+            'duration': options['duration'],
+            'variants': results,
+        }
+
+    def measure(self, context, options):
+        reads = [
+            reverse('issue_comments', args=[context.issue.id]),
+            reverse('project_issues', args=[context.project.id]),
+            reverse('admin_comment-list') + f"?issue={context.issue.id}",
+        ]
+        access = context.tokens['author']['access']
+        durations = {'read': [], 'write': []}
+        failures = {'locked': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def write(client, i):
+            # rafale de commentaires et modification du problème
+            if i % 2:
+                return client.post(
+                    reverse('admin_comment-list'),
+                    {'description': f"Concurrence {i}", 'issue': context.issue.id}, format='json',
+                )
+            return client.patch(
+                reverse('admin_issue-detail', args=[context.own_issue.id]),
+                {'description': f"Concurrence {i}"}, format='json',
+            )
+
+        def worker(kind, offset):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+            measured = []
+            locked = errors = 0
+            i = offset
+            try:
+                while time.perf_counter() < deadline:
+                    i += 1
+                    started = time.perf_counter()
+                    try:
+                        if kind == 'read':
+                            response = client.get(reads[i % len(reads)])
+                        else:
+                            response = write(client, i)
+                    except OperationalError as exc:
+                        if 'locked' in str(exc):
+                            locked += 1
+                        else:
+                            errors += 1
+                        continue
+                    except Exception:
+                        errors += 1
+                        continue
+                    if response.status_code >= 400:
+                        errors += 1
+                        continue
+                    measured.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            with lock:
+                durations[kind].extend(measured)
+                failures['locked'] += locked
+                failures['errors'] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=(kind, n * 1000))
+            for kind, count in (('read', options['readers']), ('write', options['writers']))
+            for n in range(count)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'reads_per_s': round(len(durations['read']) / elapsed, 1),
+            'read_p50_ms': milliseconds(durations['read'], statistics.median),
+            'read_p95_ms': milliseconds(durations['read'], lambda values: percentile(values, 0.95)),
+            'writes_per_s': round(len(durations['write']) / elapsed, 1),
+            'write_p50_ms': milliseconds(durations['write'], statistics.median),
+            'write_p95_ms': milliseconds(durations['write'], lambda values: percentile(values, 0.95)),
+            **failures,
+        }
+
+
+def milliseconds(durations, statistic):
+    return round(statistic(durations) * 1000, 2) if durations else None
@@ -0,0 +1,233 @@
+import random
+import time
+from collections import Counter
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+
+from client.models import Client
+from client.resolver import domain_resolver
+from support.models import Project, ProjectContributors, Issue, Comment
+
+UserModel = get_user_model()
+
+# les clients générés sont reconnaissables à leur domaine, --flush les supprime
+DOMAIN_SUFFIX = "bench.example"
+PASSWORD = "pwd_2026"
+
+# vocabulaire des textes générés : la recherche plein texte a des termes
+# fréquents et rares à mesurer (tirage selon une loi de Zipf)
+WORDS = (
+    "erreur connexion page affichage lenteur bouton formulaire serveur mobile "
+    "paiement export import utilisateur compte notification courriel session "
+    "jeton cache requête base données index recherche filtre tri pagination "
+    "image téléchargement fichier rapport tableau graphique calendrier tâche "
+    "équipe client facture commande panier produit stock livraison adresse "
+    "traduction langue accessibilité contraste thème clavier souris écran "
+    "android ios navigateur chrome firefox safari version mise jour migration "
+    "sauvegarde restauration sécurité mot passe authentification droit rôle "
+    "administration journal alerte supervision mémoire processeur disque réseau "
+    "timeout plantage exception trace régression correctif déploiement recette"
+).split()
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+
+    help = 'Génère un gros jeu de données synthétique pour les benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=3, help="clients générés")
+        parser.add_argument('--users', type=int, default=50, help="utilisateurs par client")
+        parser.add_argument('--projects', type=int, default=200, help="projets par client")
+        parser.add_argument('--issues', type=int, default=20000, help="nombre total de problèmes")
+        parser.add_argument('--comments', type=int, default=200000, help="nombre total de commentaires")
+        parser.add_argument('--skew', type=float, default=1.1, help="exposant de la loi de Zipf des tailles de projets")
+        parser.add_argument('--seed', type=int, default=2026, help="graine du tirage : même graine, même jeu de données")
+        parser.add_argument('--batch-size', type=int, default=5000, help="lignes par INSERT")
+        parser.add_argument('--flush', action='store_true', help="supprime d'abord les données déjà générées")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        self.rng = random.Random(options['seed'])
+        # générateur séparé : les textes ne modifient pas le tirage de la structure
+        self.text_rng = random.Random(options['seed'] + 1)
+        self.word_weights = list(accumulate(self.zipf_weights(len(WORDS), 1.0, shuffle=False)))
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+
+        generated = Client.objects.filter(domain__endswith=DOMAIN_SUFFIX)
+        if options['flush']:
+            deleted, _ = generated.delete()
+            self.stdout.write(f"{deleted} lignes supprimées")
+        elif generated.exists():
+            # les noms d'utilisateurs et les domaines générés sont uniques
+            raise CommandError("Un jeu de données généré existe déjà : relancer avec --flush pour le remplacer.")
+
+        clients = self.create_clients(options['clients'])
+        users_by_client = self.create_users(clients, options['users'])
+        projects = self.create_projects(users_by_client, options['projects'])
+
+        issues_per_project = self.allocate(
+            options['issues'], self.zipf_weights(len(projects), options['skew'])
+        )
+        contributors = self.create_contributors(projects, users_by_client, issues_per_project)
+        issues = self.create_issues(projects, contributors, issues_per_project, options['comments'])
+        self.create_comments(issues, contributors)
+
+        # bulk_create ne déclenche pas les signaux : le résolveur doit voir les nouveaux domaines
+        domain_resolver.invalidate()
+        self.stdout.write(self.style.SUCCESS(f"All Done ! ({time.monotonic() - started:.1f}s)"))
+
+    def zipf_weights(self, size, skew, shuffle=True):
+        # rang tiré au hasard : les gros projets sont répartis entre les clients
+        ranks = list(range(1, size + 1))
+        if shuffle:
+            self.rng.shuffle(ranks)
+        return [1 / rank ** skew for rank in ranks]
+
+    def sentence(self, length):
+        return " ".join(self.text_rng.choices(WORDS, cum_weights=self.word_weights, k=length))
+
+    def allocate(self, total, weights):
+        """Répartit total éléments selon les poids, retourne le nombre par position."""
+        if not weights:
+            return []
+        counts = Counter(self.rng.choices(range(len(weights)), cum_weights=list(accumulate(weights)), k=total))
+        return [counts[i] for i in range(len(weights))]
+
+    def bulk_create(self, model, objects):
+        created = []
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                created.extend(model.objects.bulk_create(batch))
+            # avec DEBUG=True chaque INSERT serait gardé en mémoire dans connection.queries
+            reset_queries()
+        return created
+
+    def create_clients(self, count):
+        clients = self.bulk_create(Client, (
+            Client(name=f"Bench {i}", domain=f"client{i}.{DOMAIN_SUFFIX}")
+            for i in range(count)
+        ))
+        self.stdout.write(f"{len(clients)} clients")
+        return clients
+
+    def create_users(self, clients, per_client):
+        # un seul hachage partagé : PBKDF2 par utilisateur prendrait des minutes
+        password = make_password(PASSWORD)
+        users_by_client = {}
+        for position, client in enumerate(clients):
+            users_by_client[client.id] = [user.id for user in self.bulk_create(UserModel, (
+                UserModel(
+                    username=f"bench{position}_{i}",
+                    email=f"bench{i}@{client.domain}",
+                    password=password,
+                    date_birth="1980-01-01",
+                    client=client,
+                )
+                for i in range(per_client)
+            ))]
+        self.stdout.write(f"{len(clients) * per_client} utilisateurs (mot de passe : {PASSWORD})")
+        return users_by_client
+
+    def create_projects(self, users_by_client, per_client):
+        types = Project.Type.values
+        projects = self.bulk_create(Project, (
+            Project(
+                name=f"Projet {position}-{i}",
+                type=self.rng.choice(types),
+                author_id=self.rng.choice(user_ids),
+            )
+            # les noms ne dépendent que de la graine, pas des ids attribués par la base
+            for position, user_ids in enumerate(users_by_client.values())
+            for i in range(per_client)
+        ))
+        self.stdout.write(f"{len(projects)} projets")
+        return projects
+
+    def create_contributors(self, projects, users_by_client, issues_per_project):
+        user_client = {
+            user_id: client_id
+            for client_id, user_ids in users_by_client.items()
+            for user_id in user_ids
+        }
+        contributors = []
+        for project, issue_count in zip(projects, issues_per_project):
+            candidates = users_by_client[user_client[project.author_id]]
+            # plus le projet est gros, plus il a de contributeurs
+            size = min(len(candidates), 1 + int(issue_count ** 0.5))
+            members = {project.author_id, *self.rng.sample(candidates, size)}
+            contributors.append(sorted(members))
+
+        links = self.bulk_create(ProjectContributors, (
+            ProjectContributors(project_id=project.id, contributor_id=user_id)
+            for project, members in zip(projects, contributors)
+            for user_id in members
+        ))
+        self.stdout.write(f"{len(links)} liens contributeurs")
+        return contributors
+
+    def create_issues(self, projects, contributors, issues_per_project, total_comments):
+        """Crée les problèmes et retourne (id, position du projet, nombre de commentaires)."""
+        project_of_issue = [
+            position
+            for position, issue_count in enumerate(issues_per_project)
+            for _ in range(issue_count)
+        ]
+        comment_weights = [self.rng.paretovariate(1.2) for _ in project_of_issue]
+        comments_per_issue = self.allocate(total_comments, comment_weights)
+
+        issues = self.bulk_create(Issue, (
+            Issue(
+                name=f"Problème {n}",
+                description=self.sentence(self.text_rng.randint(8, 30)),
+                priority=self.rng.choice(Issue.Priority.values),
+                balise=self.rng.choice(Issue.Balise.values),
+                progression=self.rng.choice(Issue.Progression.values),
+                author_id=self.rng.choice(contributors[position]),
+                attribution_id=self.rng.choice(contributors[position]),
+                project_id=projects[position].id,
+                comments_count=comments_per_issue[n],
+            )
+            for n, position in enumerate(project_of_issue)
+        ))
+        issue_ids = [issue.id for issue in issues]
+
+        # les compteurs dénormalisés sont écrits directement, pas besoin de reconcile_counters
+        for project, count in zip(projects, issues_per_project):
+            project.issues_count = count
+        for batch in batched(projects, self.batch_size):
+            Project.all_objects.bulk_update(batch, ['issues_count'])
+
+        self.stdout.write(f"{len(issue_ids)} problèmes")
+        return list(zip(issue_ids, project_of_issue, comments_per_issue))
+
+    def create_comments(self, issues, contributors):
+        created = 0
+        comments = (
+            Comment(
+                # le numéro garde la description unique dans le problème
+                description=f"Commentaire {n} : {self.sentence(self.text_rng.randint(4, 20))}",
+                issue_id=issue_id,
+                author_id=self.rng.choice(contributors[position]),
+            )
+            for issue_id, position, comment_count in issues
+            for n in range(comment_count)
+        )
+        for batch in batched(comments, self.batch_size):
+            with transaction.atomic():
+                Comment.objects.bulk_create(batch)
+            reset_queries()
+            created += len(batch)
+            if created % (self.batch_size * 20) == 0:
+                self.stdout.write(f"  {created} commentaires...")
+        self.stdout.write(f"{created} commentaires")
@@ -0,0 +1,353 @@
+import gzip
+import json
+import os
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from client.models import Client
+from support.access import invalidate_project_access
+from support.counters import update_issues_count, update_comments_count
+from support.versions import touch
+from support.models import (
+    Project,
+    ProjectContributors,
+    Issue,
+    Comment,
+    ImportCheckpoint,
+    ImportedRecord,
+)
+
+UserModel = get_user_model()
+
+# ordre d'insertion dans un lot : un enregistrement ne référence que des types précédents
+RECORD_TYPES = ('project', 'contributor', 'issue', 'comment')
+
+
+# champs obligatoires par type d'enregistrement
+REQUIRED_FIELDS = {
+    'project': ('id', 'name', 'project_type', 'author'),
+    'contributor': ('parent', 'author'),
+    'issue': ('id', 'parent', 'name', 'priority', 'balise', 'progression', 'author', 'attribution'),
+    'comment': ('parent', 'author'),
+}
+CHOICES = {
+    'project_type': Project.Type.values,
+    'priority': Issue.Priority.values,
+    'balise': Issue.Balise.values,
+    # la valeur par défaut du modèle ('TODO') figure dans les données existantes
+    'progression': [*Issue.Progression.values, Issue._meta.get_field('progression').default],
+}
+MAX_LENGTHS = {
+    'name': Issue._meta.get_field('name').max_length,
+    'description': Comment._meta.get_field('description').max_length,
+}
+
+
+def invalid_reason(record):
+    """Motif de rejet d'un enregistrement de type connu, None s'il est valide."""
+    required = REQUIRED_FIELDS[record['type']]
+    missing = [key for key in required if record.get(key) in (None, '')]
+    if missing:
+        return f"champs manquants : {', '.join(missing)}"
+    for key in ('id', 'parent'):
+        if key in record and (isinstance(record[key], bool) or not isinstance(record[key], (str, int))):
+            return f"{key} invalide"
+    for key in ('author', 'attribution'):
+        if key in required and not isinstance(record[key], str):
+            return f"{key} invalide"
+    for key, allowed in CHOICES.items():
+        if key in required and record[key] not in allowed:
+            return f"{key} invalide : {record[key]!r}"
+    for key, max_length in MAX_LENGTHS.items():
+        value = record.get(key, '')
+        if not isinstance(value, str) or len(value) > max_length:
+            return f"{key} invalide"
+    value = record.get('time_created')
+    if value:
+        try:
+            if not isinstance(value, str) or parse_datetime(value) is None:
+                return "time_created invalide"
+        except ValueError:
+            return "time_created invalide"
+    return None
+
+
+class Command(BaseCommand):
+
+    help = 'Importe un fichier NDJSON (format de /api/project/<id>/export/) pour un client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="fichier .ndjson ou .ndjson.gz")
+        parser.add_argument('--client', required=True, help="id ou domaine du client")
+        parser.add_argument('--batch-size', type=int, default=2000, help="lignes par transaction")
+        parser.add_argument('--restart', action='store_true', help="ignore l'avancement d'un import précédent")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"Fichier introuvable : {path}")
+        client = self.get_client(options['client'])
+
+        source = os.path.abspath(path)
+        if options['restart']:
+            ImportCheckpoint.objects.filter(source=source, client=client).delete()
+        self.checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=source, client=client)
+        if self.checkpoint.finished:
+            self.stdout.write(f"{path} est déjà importé (--restart pour recommencer).")
+            return
+        if self.checkpoint.offset:
+            self.stdout.write(f"Reprise ligne {self.checkpoint.lines + 1} (octet {self.checkpoint.offset})")
+
+        self.users = dict(UserModel.objects.filter(client=client).values_list('username', 'id'))
+        self.ids = {ImportedRecord.Kind.PROJECT: {}, ImportedRecord.Kind.ISSUE: {}}
+        self.skipped = Counter()
+        self.size = os.path.getsize(path)
+        started = time.monotonic()
+
+        for batch, offset, lines in self.read_batches(path, options['batch_size']):
+            with transaction.atomic():
+                self.import_batch(batch)
+                self.checkpoint.offset = offset
+                self.checkpoint.lines = lines
+                self.checkpoint.save(update_fields=['offset', 'lines', 'time_updated'])
+            self.report_progress(offset, lines, started)
+
+        self.checkpoint.finished = True
+        self.checkpoint.save(update_fields=['finished', 'time_updated'])
+        for reason, count in sorted(self.skipped.items()):
+            self.stdout.write(self.style.WARNING(f"{count} lignes ignorées : {reason}"))
+        self.stdout.write(self.style.SUCCESS(f"All Done ! ({time.monotonic() - started:.1f}s)"))
+
+    def get_client(self, reference):
+        lookup = Q(domain=reference)
+        if reference.isdigit():
+            lookup |= Q(id=int(reference))
+        client = Client.objects.filter(lookup).first()
+        if client is None:
+            raise CommandError(f"Client inconnu : {reference}")
+        return client
+
+    def read_batches(self, path, batch_size):
+        """
+        Lit le fichier ligne à ligne à partir du dernier offset enregistré,
+        par lots de (numéro de ligne, enregistrement).
+        """
+        opener = gzip.open if path.endswith('.gz') else open
+        offset = self.checkpoint.offset
+        lines = self.checkpoint.lines
+        batch = []
+        with opener(path, 'rb') as source:
+            # offset compte les octets décompressés : gzip sait s'y replacer
+            source.seek(offset)
+            for line in source:
+                offset += len(line)
+                lines += 1
+                if not line.strip():
+                    continue
+                try:
+                    batch.append((lines, json.loads(line)))
+                except json.JSONDecodeError as error:
+                    self.reject(lines, f"JSON invalide ({error})")
+                if len(batch) >= batch_size:
+                    yield batch, offset, lines
+                    batch = []
+        # la dernière position est enregistrée même si les dernières lignes sont vides
+        yield batch, offset, lines
+
+    def report_progress(self, offset, lines, started):
+        # offset d'un .gz est en octets décompressés, size en octets compressés
+        percent = f" ({min(100, offset * 100 // self.size)}%)" if self.size else ""
+        self.stdout.write(f"  {lines} lignes{percent}, {time.monotonic() - started:.1f}s")
+
+    def import_batch(self, batch):
+        by_type = {record_type: [] for record_type in RECORD_TYPES}
+        for line, record in batch:
+            if not isinstance(record, dict):
+                self.reject(line, "objet JSON attendu")
+            elif record.get('type') not in by_type:
+                self.skipped['type inconnu'] += 1
+            elif (reason := invalid_reason(record)) is not None:
+                self.reject(line, reason)
+            else:
+                by_type[record['type']].append(record)
+
+        self.import_projects(by_type['project'])
+        self.import_contributors(by_type['contributor'])
+        self.import_issues(by_type['issue'])
+        self.import_comments(by_type['comment'])
+
+    def reject(self, line, reason):
+        # la ligne est ignorée, l'import continue
+        self.skipped['ligne invalide'] += 1
+        self.stderr.write(f"Ligne {line} ignorée : {reason}")
+
+    def restore_time_created(self, model, objects, values):
+        # bulk_create applique auto_now_add : les dates d'origine sont réécrites ensuite
+        for obj, value in zip(objects, values):
+            obj.time_created = value
+        model._base_manager.bulk_update(objects, ['time_created'])
+
+    def user_id(self, username):
+        return self.users.get(username)
+
+    def time_created(self, record):
+        value = record.get('time_created')
+        return (parse_datetime(value) if value else None) or timezone.now()
+
+    def resolve(self, kind, source_ids):
+        """Complète la correspondance avec les ids créés lors d'une exécution précédente."""
+        known = self.ids[kind]
+        missing = {str(source_id) for source_id in source_ids} - known.keys()
+        if missing:
+            known.update(ImportedRecord.objects.filter(
+                checkpoint=self.checkpoint, kind=kind, source_id__in=missing,
+            ).values_list('source_id', 'target_id'))
+        return known
+
+    def remember(self, kind, pairs):
+        ImportedRecord.objects.bulk_create([
+            ImportedRecord(checkpoint=self.checkpoint, kind=kind, source_id=source_id, target_id=target_id)
+            for source_id, target_id in pairs
+        ])
+        self.ids[kind].update(pairs)
+
+    def import_projects(self, records):
+        projects = []
+        sources = []
+        times = []
+        for record in records:
+            author_id = self.user_id(record.get('author'))
+            if author_id is None:
+                self.skipped['auteur de projet inconnu'] += 1
+                continue
+            projects.append(Project(
+                name=record['name'],
+                description=record.get('description', ''),
+                type=record['project_type'],
+                author_id=author_id,
+            ))
+            sources.append(str(record['id']))
+            times.append(self.time_created(record))
+        if not projects:
+            return
+
+        created = Project.objects.bulk_create(projects)
+        self.restore_time_created(Project, created, times)
+        # l'auteur est contributeur de son projet, comme à la création par l'API
+        ProjectContributors.objects.bulk_create([
+            ProjectContributors(project_id=project.id, contributor_id=project.author_id)
+            for project in created
+        ], ignore_conflicts=True)
+        invalidate_project_access(project.author_id for project in created)
+        self.remember(ImportedRecord.Kind.PROJECT, [
+            (source_id, project.id) for source_id, project in zip(sources, created)
+        ])
+
+    def import_contributors(self, records):
+        projects = self.resolve(ImportedRecord.Kind.PROJECT, {record['parent'] for record in records})
+        links = []
+        for record in records:
+            project_id = projects.get(str(record['parent']))
+            contributor_id = self.user_id(record.get('author'))
+            if project_id is None or contributor_id is None:
+                self.skipped['contributeur ou projet inconnu'] += 1
+                continue
+            links.append(ProjectContributors(project_id=project_id, contributor_id=contributor_id))
+        # l'auteur, déjà ajouté avec le projet, figure aussi dans les contributeurs exportés
+        ProjectContributors.objects.bulk_create(links, ignore_conflicts=True)
+        invalidate_project_access(link.contributor_id for link in links)
+        touch(project_ids={link.project_id for link in links})
+
+    def import_issues(self, records):
+        projects = self.resolve(ImportedRecord.Kind.PROJECT, {record['parent'] for record in records})
+        existing_names = set(Issue.objects.filter(
+            project_id__in={projects[str(record['parent'])] for record in records if str(record['parent']) in projects},
+            name__in={record['name'] for record in records},
+        ).values_list('project_id', 'name')) if records else set()
+
+        issues = []
+        sources = []
+        times = []
+        for record in records:
+            project_id = projects.get(str(record['parent']))
+            author_id = self.user_id(record.get('author'))
+            attribution_id = self.user_id(record.get('attribution'))
+            if project_id is None or author_id is None or attribution_id is None:
+                self.skipped['problème : projet ou utilisateur inconnu'] += 1
+                continue
+            key = (project_id, record['name'])
+            if key in existing_names:
+                self.skipped['problème : nom déjà utilisé dans le projet'] += 1
+                continue
+            existing_names.add(key)
+            issues.append(Issue(
+                name=record['name'],
+                description=record.get('description', ''),
+                priority=record['priority'],
+                balise=record['balise'],
+                progression=record['progression'],
+                project_id=project_id,
+                author_id=author_id,
+                attribution_id=attribution_id,
+            ))
+            sources.append(str(record['id']))
+            times.append(self.time_created(record))
+        if not issues:
+            return
+
+        created = Issue.objects.bulk_create(issues)
+        self.restore_time_created(Issue, created, times)
+        per_project = Counter(issue.project_id for issue in created)
+        for project_id, count in per_project.items():
+            update_issues_count(project_id, count)
+        # les projets peuvent venir d'un lot précédent
+        touch(project_ids=per_project)
+        self.remember(ImportedRecord.Kind.ISSUE, [
+            (source_id, issue.id) for source_id, issue in zip(sources, created)
+        ])
+
+    def import_comments(self, records):
+        issues = self.resolve(ImportedRecord.Kind.ISSUE, {record['parent'] for record in records})
+        existing_descriptions = set(Comment.objects.filter(
+            issue_id__in={issues[str(record['parent'])] for record in records if str(record['parent']) in issues},
+            description__in={record.get('description', '') for record in records},
+        ).values_list('issue_id', 'description')) if records else set()
+
+        comments = []
+        times = []
+        for record in records:
+            issue_id = issues.get(str(record['parent']))
+            author_id = self.user_id(record.get('author'))
+            if issue_id is None or author_id is None:
+                self.skipped['commentaire : problème ou auteur inconnu'] += 1
+                continue
+            key = (issue_id, record.get('description', ''))
+            if key in existing_descriptions:
+                self.skipped['commentaire : doublon dans le problème'] += 1
+                continue
+            existing_descriptions.add(key)
+            comments.append(Comment(
+                description=key[1],
+                issue_id=issue_id,
+                author_id=author_id,
+            ))
+            times.append(self.time_created(record))
+
+        created = Comment.objects.bulk_create(comments)
+        self.restore_time_created(Comment, created, times)
+        per_issue = Counter(comment.issue_id for comment in created)
+        for issue_id, count in per_issue.items():
+            update_comments_count(issue_id, count)
+        # les problèmes peuvent venir d'un lot précédent
+        touch(
+            project_ids=Issue.objects.filter(id__in=per_issue).values_list('project_id', flat=True),
+            issue_ids=per_issue,
+        )
@@ -0,0 +1,36 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from client.models import Client
+from config.shards import copy_client, seed_ids, shard_aliases
+
+
+class Command(BaseCommand):
+
+    help = "Applique les migrations à chaque base de DATABASE_SHARDS et y recopie ses clients"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shard', action='append', dest='shards',
+            help="alias à migrer (plusieurs possibles), toutes les bases de DATABASE_SHARDS par défaut",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        aliases = options['shards'] or shard_aliases()
+        unknown = [alias for alias in aliases if alias not in shard_aliases()]
+        if unknown:
+            raise CommandError(f"Alias absents de DATABASE_SHARDS : {', '.join(unknown)}.")
+
+        for alias in aliases:
+            self.stdout.write(self.style.MIGRATE_LABEL(alias))
+            call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'], stdout=self.stdout)
+            # avant toute ligne : les identifiants de la base partent de son offset
+            seed_ids(alias)
+            if alias != DEFAULT_DB_ALIAS:
+                clients = Client.objects.using(DEFAULT_DB_ALIAS).filter(shard=alias)
+                for client in clients:
+                    copy_client(client, alias)
+                self.stdout.write(f"{alias} : {len(clients)} clients recopiés")
+        self.stdout.write(self.style.SUCCESS("All Done !"))
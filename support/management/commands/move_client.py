@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from client.models import Client
+from config.shard_moves import ClientMove, MoveError
+
+
+class Command(BaseCommand):
+
+    help = "Déplace les données d'un client vers une autre base de DATABASE_SHARDS sans arrêter le service"
+
+    def add_arguments(self, parser):
+        parser.add_argument('client', type=int, help="id du client")
+        parser.add_argument('shard', help="alias de la base cible")
+        parser.add_argument(
+            '--wait', type=float,
+            help="secondes d'attente entre les étapes, DATABASE_SHARD_MAP_TTL + 1 par défaut",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--keep-source', action='store_true',
+            help="garde les lignes du client dans l'ancienne base",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        try:
+            client = Client.objects.using(DEFAULT_DB_ALIAS).get(id=options['client'])
+        except Client.DoesNotExist:
+            raise CommandError(f"Client {options['client']} introuvable.")
+        if client.moving:
+            raise CommandError("Un déplacement de ce client est déjà en cours (Client.moving).")
+
+        move = ClientMove(
+            client, options['shard'],
+            wait=options['wait'], batch_size=options['batch_size'], log=self.stdout.write,
+        )
+        try:
+            move.run(keep_source=options['keep_source'])
+        except MoveError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS("All Done !"))
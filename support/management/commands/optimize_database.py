@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+
+    help = "Met à jour les statistiques du planificateur SQLite (à planifier, par exemple chaque nuit)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--full', action='store_true',
+            help="statistiques exactes (après un import volumineux) au lieu d'un échantillon par index",
+        )
+        parser.add_argument(
+            '--checkpoint', action='store_true',
+            help="recopie le journal WAL dans la base et le tronque",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        connection = connections[options['database']]
+        with connection.cursor() as cursor:
+            # PRAGMA optimize ne revoit que les tables lues par la connexion
+            # (avant SQLite 3.46) : ici toutes les tables, échantillonnées
+            # selon le PRAGMA analysis_limit de config.sqlite
+            if options['full']:
+                cursor.execute('PRAGMA analysis_limit = 0')
+            cursor.execute('ANALYZE')
+            if options['checkpoint']:
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                busy, pages, copied = cursor.fetchone()
+                self.stdout.write(f"Journal WAL : {copied}/{pages} pages recopiées")
+        self.stdout.write(self.style.SUCCESS("All Done !"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from support.models import Tombstone
+from support.sync import oldest_token_date
+
+
+class Command(BaseCommand):
+
+    help = 'Supprime les traces de suppression plus anciennes que SUPPORT_SYNC_TOMBSTONE_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        # les jetons plus anciens sont refusés (410) par SyncView
+        oldest = oldest_token_date()
+        purged = 0
+        while True:
+            # lots courts : les écritures concurrentes ne restent pas bloquées
+            ids = list(
+                Tombstone.objects.filter(time_deleted__lt=oldest).order_by('time_deleted', 'id')
+                .values_list('id', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+            purged += Tombstone.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(f"Traces supprimées : {purged}")
+        self.stdout.write(self.style.SUCCESS("All Done !"))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from support.search import create_search_index, optimize_search_index, uses_fts
+
+
+class Command(BaseCommand):
+
+    help = "Recrée les triggers manquants et réindexe problèmes et commentaires pour la recherche"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--optimize', action='store_true', help="fusionne ensuite les segments de l'index")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        if not uses_fts():
+            raise CommandError("La recherche plein texte n'est disponible que sous SQLite.")
+
+        started = time.monotonic()
+        # les écritures concurrentes attendent la fin de la réindexation
+        with transaction.atomic():
+            create_search_index()
+        self.stdout.write(f"Index reconstruit ({time.monotonic() - started:.1f}s)")
+
+        if options['optimize']:
+            optimize_search_index()
+            self.stdout.write(f"Index optimisé ({time.monotonic() - started:.1f}s)")
+
+        self.stdout.write(self.style.SUCCESS("All Done !"))
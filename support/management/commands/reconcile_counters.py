@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from support.models import Project, Issue
+from support.counters import reconcile_issues_count, reconcile_comments_count
+
+
+class Command(BaseCommand):
+
+    help = 'Recalcule les compteurs issues_count et comments_count par lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        chunk_size = options['chunk_size']
+
+        fixed_projects = self.reconcile(Project.all_objects, reconcile_issues_count, chunk_size)
+        self.stdout.write(f"Projets corrigés : {fixed_projects}")
+
+        fixed_issues = self.reconcile(Issue.objects, reconcile_comments_count, chunk_size)
+        self.stdout.write(f"Problèmes corrigés : {fixed_issues}")
+
+        self.stdout.write(self.style.SUCCESS("All Done !"))
+
+    def reconcile(self, manager, reconcile_chunk, chunk_size):
+        # parcours par clé (id > dernier id) : chaque lot est une transaction courte
+        fixed = 0
+        last_id = 0
+        while True:
+            ids = list(
+                manager.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return fixed
+            with transaction.atomic():
+                fixed += reconcile_chunk(ids)
+            last_id = ids[-1]
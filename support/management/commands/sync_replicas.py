@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from config.replicas import read_replicas, sync_replica
+
+
+class Command(BaseCommand):
+
+    help = "Recopie la base default dans les réplicas en lecture avec l'API de sauvegarde SQLite"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--replica', action='append', dest='replicas',
+            help="alias à recopier (plusieurs possibles), DATABASE_READ_REPLICAS par défaut",
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="recopie toutes les N secondes jusqu'à interruption, une seule fois si 0",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING(self.help))
+        aliases = options['replicas'] or read_replicas()
+        if not aliases:
+            raise CommandError("Aucun réplica : renseigner DATABASE_READ_REPLICAS ou --replica.")
+        unknown = [alias for alias in aliases if alias not in connections.settings or alias == DEFAULT_DB_ALIAS]
+        if unknown:
+            raise CommandError(f"Alias inconnus dans DATABASES : {', '.join(unknown)}.")
+
+        try:
+            while True:
+                for alias in aliases:
+                    started = time.perf_counter()
+                    sync_replica(connections[DEFAULT_DB_ALIAS], connections[alias])
+                    self.stdout.write(f"{alias} : recopié en {(time.perf_counter() - started) * 1000:.0f} ms")
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("All Done !"))
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model("support", "Project")
+    Issue = apps.get_model("support", "Issue")
+    Comment = apps.get_model("support", "Comment")
+
+    issues = Issue.objects.filter(project=OuterRef("pk")).values("project").annotate(total=Count("id")).values("total")
+    Project.objects.update(issues_count=Coalesce(Subquery(issues), 0))
+
+    comments = Comment.objects.filter(issue=OuterRef("pk")).values("issue").annotate(total=Count("id")).values("total")
+    Issue.objects.update(comments_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("support", "0008_comment_unique_comment_name_per_issue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="issues_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="issue",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
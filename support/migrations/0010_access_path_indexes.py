@@ -0,0 +1,66 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_contributors(apps, schema_editor):
+    # la contrainte unique ne peut être posée que si aucun doublon n'existe
+    ProjectContributors = apps.get_model("support", "ProjectContributors")
+    keep_ids = (
+        ProjectContributors.objects.values("contributor", "project")
+        .annotate(first_id=Min("id"))
+        .values("first_id")
+    )
+    ProjectContributors.objects.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("support", "0009_project_issues_count_issue_comments_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["author", "issue"], name="comment_author_issue_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["issue", "time_created", "id"], name="comment_issue_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(fields=["author", "project"], name="issue_author_project_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(fields=["project", "time_created", "id"], name="issue_project_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["author", "-time_created"],
+                name="project_active_author_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["-time_created", "-id"],
+                name="project_active_recent_idx",
+            ),
+        ),
+        migrations.RunPython(remove_duplicate_contributors, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="projectcontributors",
+            constraint=models.UniqueConstraint(
+                fields=("contributor", "project"), name="unique_contributor_per_project"
+            ),
+        ),
+    ]
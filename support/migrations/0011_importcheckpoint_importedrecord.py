@@ -0,0 +1,88 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("client", "0004_clientdomain"),
+        ("support", "0010_access_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=1024)),
+                ("offset", models.PositiveBigIntegerField(default=0)),
+                ("lines", models.PositiveIntegerField(default=0)),
+                ("finished", models.BooleanField(default=False)),
+                ("time_updated", models.DateTimeField(auto_now=True)),
+                (
+                    "client",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="imports",
+                        to="client.client",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("source", "client"), name="unique_import_per_client"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ImportedRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("project", "Project"), ("issue", "Issue")],
+                        max_length=16,
+                    ),
+                ),
+                ("source_id", models.CharField(max_length=64)),
+                ("target_id", models.PositiveBigIntegerField()),
+                (
+                    "checkpoint",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="records",
+                        to="support.importcheckpoint",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("checkpoint", "kind", "source_id"),
+                        name="unique_imported_record",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("support", "0012_project_updated_at_issue_updated_at_comment_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
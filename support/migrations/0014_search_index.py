@@ -0,0 +1,100 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:10
+
+from django.db import migrations
+
+# copie figée du SQL de support.search : cette migration ne doit pas suivre
+# les modifications ultérieures du module
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS support_issue_fts USING fts5(
+        name, description,
+        content='support_issue', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_insert AFTER INSERT ON support_issue BEGIN
+        INSERT INTO support_issue_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_delete AFTER DELETE ON support_issue BEGIN
+        INSERT INTO support_issue_fts(support_issue_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    # les UPDATE des compteurs et de updated_at ne réécrivent pas l'index
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_update AFTER UPDATE OF name, description ON support_issue BEGIN
+        INSERT INTO support_issue_fts(support_issue_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO support_issue_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS support_comment_fts USING fts5(
+        description,
+        content='support_comment', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_insert AFTER INSERT ON support_comment BEGIN
+        INSERT INTO support_comment_fts(rowid, description)
+        VALUES (new.rowid, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_delete AFTER DELETE ON support_comment BEGIN
+        INSERT INTO support_comment_fts(support_comment_fts, rowid, description)
+        VALUES ('delete', old.rowid, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_update AFTER UPDATE OF description ON support_comment BEGIN
+        INSERT INTO support_comment_fts(support_comment_fts, rowid, description)
+        VALUES ('delete', old.rowid, old.description);
+        INSERT INTO support_comment_fts(rowid, description)
+        VALUES (new.rowid, new.description);
+    END
+    """,
+    # indexe les lignes existantes
+    "INSERT INTO support_issue_fts(support_issue_fts) VALUES ('rebuild')",
+    "INSERT INTO support_comment_fts(support_comment_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS support_comment_fts_update",
+    "DROP TRIGGER IF EXISTS support_comment_fts_delete",
+    "DROP TRIGGER IF EXISTS support_comment_fts_insert",
+    "DROP TABLE IF EXISTS support_comment_fts",
+    "DROP TRIGGER IF EXISTS support_issue_fts_update",
+    "DROP TRIGGER IF EXISTS support_issue_fts_delete",
+    "DROP TRIGGER IF EXISTS support_issue_fts_insert",
+    "DROP TABLE IF EXISTS support_issue_fts",
+]
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    # FTS5 n'existe que sous SQLite, ailleurs la recherche passe par icontains
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "sqlite":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "sqlite":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("support", "0013_project_version"),
+    ]
+
+    operations = [
+        SQLiteRunSQL(CREATE_SQL, DROP_SQL),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("support", "0014_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(
+                fields=["project", "progression", "priority", "time_created", "id"],
+                name="issue_project_triage_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(
+                fields=["project", "attribution", "time_created", "id"],
+                name="issue_project_attribution_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+def analyze(apps, schema_editor):
+    # sans statistiques SQLite préfère trier tout le périmètre plutôt que de
+    # parcourir comment_changes_idx pour une fenêtre de synchronisation
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("ANALYZE support_issue")
+        schema_editor.execute("ANALYZE support_comment")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("support", "0015_issue_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("project", "Project"),
+                            ("issue", "Issue"),
+                            ("comment", "Comment"),
+                            ("contributor", "Contributor"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("object_id", models.CharField(max_length=64)),
+                ("project_id", models.PositiveBigIntegerField()),
+                ("user_id", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("time_deleted", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["time_deleted", "id"], name="tombstone_recent_idx")
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(fields=["project", "updated_at", "id"], name="issue_project_changes_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["updated_at", "id"], name="comment_changes_idx"),
+        ),
+        migrations.RunPython(analyze, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,188 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+# copie figée des tables suivies par support.sync : cette migration ne doit
+# pas suivre les modifications ultérieures du module
+TABLES = [
+    "support_project",
+    "support_projectcontributors",
+    "support_issue",
+    "support_comment",
+    "support_tombstone",
+]
+
+# L'UPDATE de change_seq dans le trigger ne redéclenche pas ce trigger
+# (recursive_triggers désactivé, valeur par défaut de SQLite) ni ceux de
+# l'index de recherche, limités aux colonnes indexées. L'INSERT passe par un
+# UPDATE de la ligne : la séquence n'avance qu'une fois. La ligne du compteur
+# est recréée si elle manque (flush).
+TRIGGER_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_seq_update AFTER UPDATE ON {table} BEGIN
+        INSERT INTO support_changesequence (id, value) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET value = value + 1;
+        UPDATE {table} SET change_seq = (SELECT value FROM support_changesequence WHERE id = 1)
+        WHERE rowid = new.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_seq_insert AFTER INSERT ON {table} BEGIN
+        UPDATE {table} SET change_seq = change_seq WHERE rowid = new.rowid;
+    END
+    """,
+]
+
+# AddField recopie support_issue et support_comment sous SQLite et supprime
+# les triggers de l'index de recherche (0014) : recréés puis réindexés
+SEARCH_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_insert AFTER INSERT ON support_issue BEGIN
+        INSERT INTO support_issue_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_delete AFTER DELETE ON support_issue BEGIN
+        INSERT INTO support_issue_fts(support_issue_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_update AFTER UPDATE OF name, description ON support_issue BEGIN
+        INSERT INTO support_issue_fts(support_issue_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO support_issue_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_insert AFTER INSERT ON support_comment BEGIN
+        INSERT INTO support_comment_fts(rowid, description)
+        VALUES (new.rowid, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_delete AFTER DELETE ON support_comment BEGIN
+        INSERT INTO support_comment_fts(support_comment_fts, rowid, description)
+        VALUES ('delete', old.rowid, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_update AFTER UPDATE OF description ON support_comment BEGIN
+        INSERT INTO support_comment_fts(support_comment_fts, rowid, description)
+        VALUES ('delete', old.rowid, old.description);
+        INSERT INTO support_comment_fts(rowid, description)
+        VALUES (new.rowid, new.description);
+    END
+    """,
+    # la copie a pu renuméroter les rowid des commentaires
+    "INSERT INTO support_issue_fts(support_issue_fts) VALUES ('rebuild')",
+    "INSERT INTO support_comment_fts(support_comment_fts) VALUES ('rebuild')",
+]
+
+CREATE_SQL = [
+    "INSERT INTO support_changesequence (id, value) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+    *(sql.format(table=table) for table in TABLES for sql in TRIGGER_SQL),
+    # numérote les lignes existantes
+    *(f"UPDATE {table} SET change_seq = 0" for table in TABLES),
+]
+
+DROP_SQL = [
+    sql
+    for table in reversed(TABLES)
+    for sql in (f"DROP TRIGGER IF EXISTS {table}_seq_insert", f"DROP TRIGGER IF EXISTS {table}_seq_update")
+]
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    # les triggers sont écrits pour SQLite, comme ceux de l'index de recherche
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "sqlite":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "sqlite":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def analyze(apps, schema_editor):
+    # statistiques des nouveaux index, voir 0016
+    if schema_editor.connection.vendor == "sqlite":
+        for table in TABLES:
+            schema_editor.execute(f"ANALYZE {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("support", "0016_tombstone_sync_indexes"),
+    ]
+
+    operations = [
+        # au retour, RemoveField recopie les tables à son tour
+        SQLiteRunSQL(migrations.RunSQL.noop, SEARCH_SQL),
+        migrations.CreateModel(
+            name="ChangeSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="change_seq",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="projectcontributors",
+            name="change_seq",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="issue",
+            name="change_seq",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="change_seq",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tombstone",
+            name="change_seq",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RemoveIndex(
+            model_name="issue",
+            name="issue_project_changes_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="comment",
+            name="comment_changes_idx",
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(fields=["project", "change_seq"], name="issue_project_sequence_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["change_seq"], name="comment_sequence_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(fields=["change_seq"], name="tombstone_sequence_idx"),
+        ),
+        SQLiteRunSQL(SEARCH_SQL + CREATE_SQL, DROP_SQL),
+        migrations.RunPython(analyze, migrations.RunPython.noop),
+    ]
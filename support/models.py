@@ -15,6 +15,19 @@ class Project(models.Model):
 
     class Meta:
         ordering = ['id']
+        indexes = [
+            # index partiels : les requêtes passent toutes par le manager des projets actifs
+            models.Index(
+                fields=['author', '-time_created'],
+                condition=models.Q(is_active=True),
+                name='project_active_author_idx',
+            ),
+            models.Index(
+                fields=['-time_created', '-id'],
+                condition=models.Q(is_active=True),
+                name='project_active_recent_idx',
+            ),
+        ]
 
     class Type(models.TextChoices):
         BACKEND = "Back-end"
@@ -38,6 +51,16 @@ class Project(models.Model):
         related_name="contributions",
     )
     is_active = models.BooleanField(default=True)
+    # modifié aussi par support.versions à chaque écriture sur les contributeurs,
+    # problèmes et commentaires du projet : sert de version pour les GET conditionnels
+    updated_at = models.DateTimeField(auto_now=True)
+    # incrémenté par support.versions.touch(), clé du cache des détails de projet
+    version = models.PositiveIntegerField(default=0, editable=False)
+    # compteur dénormalisé, maintenu par support.counters à chaque création/suppression
+    issues_count = models.PositiveIntegerField(default=0, editable=False)
+    # position dans la séquence des changements (support.sync), attribuée par
+    # un trigger SQLite à chaque insertion ou modification de la ligne
+    change_seq = models.PositiveBigIntegerField(default=0, editable=False)
 
     # Le manager par défaut employé par le modèle
     objects = ActiveProjectManager()
@@ -96,6 +119,24 @@ class Issue(models.Model):
                 name='unique_issue_name_per_project'
             )
         ]
+        indexes = [
+            # AdminIssueViewset : issues de l'utilisateur pour un projet
+            models.Index(fields=['author', 'project'], name='issue_author_project_idx'),
+            # ProjectIssuesView : pagination par (time_created, id) dans un projet
+            models.Index(fields=['project', 'time_created', 'id'], name='issue_project_recent_idx'),
+            # filtres de support.filters.IssueFilter : les colonnes de tri suivent les
+            # égalités, une page filtrée se lit dans l'ordre de l'index sans tri
+            models.Index(
+                fields=['project', 'progression', 'priority', 'time_created', 'id'],
+                name='issue_project_triage_idx',
+            ),
+            models.Index(
+                fields=['project', 'attribution', 'time_created', 'id'],
+                name='issue_project_attribution_idx',
+            ),
+            # support.sync : modifications d'un projet dans l'ordre de la séquence
+            models.Index(fields=['project', 'change_seq'], name='issue_project_sequence_idx'),
+        ]
 
 
     name = models.CharField(max_length=128)
@@ -123,6 +164,12 @@ class Issue(models.Model):
         related_name="issues"
     )
     time_created = models.DateTimeField(auto_now_add=True)
+    # modifié aussi par support.versions à chaque écriture sur les commentaires
+    updated_at = models.DateTimeField(auto_now=True)
+    # compteur dénormalisé, maintenu par support.counters à chaque création/suppression
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # voir Project.change_seq
+    change_seq = models.PositiveBigIntegerField(default=0, editable=False)
 
 
 class Comment(models.Model):
@@ -135,6 +182,14 @@ class Comment(models.Model):
                 name='unique_comment_name_per_issue'
             )
         ]
+        indexes = [
+            # AdminCommentViewset : commentaires de l'utilisateur pour un problème
+            models.Index(fields=['author', 'issue'], name='comment_author_issue_idx'),
+            # IssueCommentsView : pagination par (time_created, id) dans un problème
+            models.Index(fields=['issue', 'time_created', 'id'], name='comment_issue_recent_idx'),
+            # support.sync : modifications dans l'ordre de la séquence
+            models.Index(fields=['change_seq'], name='comment_sequence_idx'),
+        ]
     
 
     id = models.UUIDField(
@@ -150,13 +205,27 @@ class Comment(models.Model):
     )
     # l'utilisateur doit aussi donner un lien vers une issue, ! à implémenter !
     time_created = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # voir Project.change_seq
+    change_seq = models.PositiveBigIntegerField(default=0, editable=False)
 
 
 class ProjectContributors(models.Model):
+
+
+    class Meta:
+        constraints = [
+            # sert aussi d'index pour toutes les vérifications d'appartenance
+            models.UniqueConstraint(
+                fields=['contributor', 'project'],
+                name='unique_contributor_per_project'
+            )
+        ]
+
     contributor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -168,3 +237,94 @@ class ProjectContributors(models.Model):
         related_name = "contributor_links",
     )
     time_created = models.DateTimeField(auto_now_add=True)
+    # voir Project.change_seq
+    change_seq = models.PositiveBigIntegerField(default=0, editable=False)
+
+
+class ImportCheckpoint(models.Model):
+    # Avancement de la commande import_ndjson pour un fichier et un client :
+    # offset est mis à jour dans la transaction de chaque lot, une reprise
+    # repart donc exactement après le dernier lot enregistré.
+
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'client'],
+                name='unique_import_per_client'
+            )
+        ]
+
+    source = models.CharField(max_length=1024)
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name="imports",
+    )
+    offset = models.PositiveBigIntegerField(default=0)
+    lines = models.PositiveIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    time_updated = models.DateTimeField(auto_now=True)
+
+
+class ImportedRecord(models.Model):
+    # Correspondance id du fichier -> id créé, pour les projets et problèmes
+    # référencés par les lignes suivantes (éventuellement après une reprise)
+
+
+    class Kind(models.TextChoices):
+        PROJECT = "project"
+        ISSUE = "issue"
+
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['checkpoint', 'kind', 'source_id'],
+                name='unique_imported_record'
+            )
+        ]
+
+    checkpoint = models.ForeignKey(
+        ImportCheckpoint,
+        on_delete=models.CASCADE,
+        related_name="records",
+    )
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    source_id = models.CharField(max_length=64)
+    target_id = models.PositiveBigIntegerField()
+
+
+class Tombstone(models.Model):
+    # Trace d'une suppression lue par la synchronisation différentielle
+    # (support.sync). project_id n'est pas une clé étrangère : la trace doit
+    # survivre à la ligne supprimée.
+
+
+    class Kind(models.TextChoices):
+        PROJECT = "project"
+        ISSUE = "issue"
+        COMMENT = "comment"
+        CONTRIBUTOR = "contributor"
+
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['time_deleted', 'id'], name='tombstone_recent_idx'),
+            models.Index(fields=['change_seq'], name='tombstone_sequence_idx'),
+        ]
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    object_id = models.CharField(max_length=64)
+    project_id = models.PositiveBigIntegerField()
+    # contributeur retiré du projet (kind = contributor)
+    user_id = models.PositiveBigIntegerField(null=True, blank=True)
+    time_deleted = models.DateTimeField(auto_now_add=True)
+    # voir Project.change_seq
+    change_seq = models.PositiveBigIntegerField(default=0, editable=False)
+
+
+class ChangeSequence(models.Model):
+    # Dernière position attribuée dans la séquence des changements : une seule
+    # ligne, incrémentée par les triggers dans la transaction qui écrit.
+    value = models.PositiveBigIntegerField(default=0)
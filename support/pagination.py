@@ -0,0 +1,267 @@
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PageSizePagination(BasePagination):
+    """Taille de page choisie par le client (page_size), bornée par max_page_size."""
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+                if page_size > 0:
+                    return min(page_size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+
+class KeysetPagination(PageSizePagination):
+    """
+    Pagination par clé (keyset) : chaque page filtre sur le dernier couple
+    (time_created, id) vu au lieu de faire un OFFSET, une page profonde coûte
+    donc autant que la première.
+
+    Le total n'est pas calculé par défaut. count_mode permet de le demander :
+      - "cached" : COUNT(*) mis en cache pendant count_cache_timeout secondes
+      - "exact" : COUNT(*) à chaque requête, comme LimitOffsetPagination
+    """
+
+    ordering = ('-time_created', '-id')
+    cursor_query_param = 'cursor'
+    count_mode = None
+    count_cache_timeout = 60
+    invalid_cursor_message = "Curseur invalide."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.setup(request, view)
+        self.count = self.get_count(queryset)
+        return self.finish(list(self.get_page_queryset(queryset)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset pour les vues asynchrones (AsyncAPIView)."""
+        self.setup(request, view)
+        self.count = await self.aget_count(queryset)
+        return self.finish([row async for row in self.get_page_queryset(queryset)])
+
+    def setup(self, request, view):
+        self.request = request
+        # un tri choisi par le client (IssueFilter) remplace celui de la classe
+        ordering = getattr(view, 'keyset_ordering', None)
+        if ordering:
+            self.ordering = ordering
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+    def get_page_queryset(self, queryset):
+        reverse = self.cursor is not None and self.cursor['reverse']
+        ordering = self.get_ordering(reverse)
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(ordering, self.cursor['position']))
+            except DjangoValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+        # on lit un élément de plus pour savoir s'il existe une page suivante
+        return queryset[:self.page_size + 1]
+
+    def finish(self, results):
+        reverse = self.cursor is not None and self.cursor['reverse']
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'results': schema,
+        }
+        if self.count_mode is not None:
+            properties['count'] = {'type': 'integer'}
+        return {'type': 'object', 'required': ['results'], 'properties': properties}
+
+    def get_count(self, queryset):
+        if self.count_mode == 'exact':
+            return queryset.count()
+        if self.count_mode == 'cached':
+            # la requête SQL identifie à la fois le filtre et le périmètre de l'utilisateur
+            digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+            key = f'keyset_count:{digest}'
+            count = cache.get(key)
+            if count is None:
+                count = queryset.count()
+                cache.set(key, count, self.count_cache_timeout)
+            return count
+        return None
+
+    async def aget_count(self, queryset):
+        if self.count_mode == 'exact':
+            return await queryset.acount()
+        if self.count_mode == 'cached':
+            key = f'keyset_count:{hashlib.md5(str(queryset.query).encode()).hexdigest()}'
+            count = await cache.aget(key)
+            if count is None:
+                count = await queryset.acount()
+                await cache.aset(key, count, self.count_cache_timeout)
+            return count
+        return None
+
+    def get_ordering(self, reverse=False):
+        if not reverse:
+            return list(self.ordering)
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        Construit (a > x) OR (a = x AND b > y) ... selon le sens de chaque champ.
+        """
+        keyset = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            keyset |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return keyset
+
+    def get_position(self, instance):
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def encode_cursor(self, position, reverse):
+        data = {
+            'p': [str(value) if not isinstance(value, (int, float)) else value for value in position],
+            'r': reverse,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            position = data['p']
+            reverse = bool(data['r'])
+            if len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return {'position': position, 'reverse': reverse}
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+
+class CachedCountKeysetPagination(KeysetPagination):
+    """Keyset avec un total approximatif (mis en cache) pour les clients qui l'affichent."""
+
+    count_mode = 'cached'
+
+
+class ChronologicalKeysetPagination(KeysetPagination):
+    """Keyset du plus ancien au plus récent, pour lire un fil de commentaires."""
+
+    ordering = ('time_created', 'id')
+
+
+class RankedPagination(PageSizePagination):
+    """
+    Pagination par numéro de page pour des résultats classés par pertinence :
+    le rang n'est pas une clé stable, le keyset ne s'applique pas. Les pages
+    profondes sont bornées par max_page, au-delà le client doit affiner sa recherche.
+    """
+
+    page_query_param = 'page'
+    max_page = 50
+    invalid_page_message = "Page invalide."
+
+    def paginate_results(self, fetch, request):
+        """fetch(limit, offset) retourne les résultats classés de la tranche demandée."""
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        try:
+            self.number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if not 1 <= self.number <= self.max_page:
+            raise NotFound(self.invalid_page_message)
+
+        # on lit un élément de plus pour savoir s'il existe une page suivante
+        results = fetch(self.page_size + 1, (self.number - 1) * self.page_size)
+        self.has_next = len(results) > self.page_size and self.number < self.max_page
+        return results[:self.page_size]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        if self.number == 1:
+            return None
+        if self.number == 2:
+            return remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(self.base_url, self.page_query_param, self.number - 1)
+
+
+class SyncPagination(PageSizePagination):
+    """Taille des pages de changements de SyncView, le curseur est géré par support.sync."""
+
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission
 
+from support.access import aget_project_access, get_project_access
+
 
 class IsAuthenticated(BasePermission):
 
@@ -31,8 +33,8 @@ class IsObjectAuthor(BasePermission):
 # qui concernent un seul objet (retrieve, update, partial_update, destroy).
 
     def has_object_permission(self, request, view, obj):
-        print("--------------------------")
-        return bool(obj.author == request.user
+        # comparaison sur author_id : évite de charger l'auteur
+        return bool(obj.author_id == request.user.id
                     or request.user.is_staff)
     
 
@@ -40,6 +42,9 @@ class IsProjectContributor(BasePermission):
 
 
     def has_object_permission(self, request, view, obj):
-        return obj.contributors.filter(id=request.user.id).exists()
-        # on aurait pu aussi passer par la table de liaison
-        # return obj.contributor_links.filter(contributor_id=request.user.id).exists():
\ No newline at end of file
+        # l'index des projets de l'utilisateur est chargé une fois par requête
+        return get_project_access(request).is_contributor(obj.id)
+
+    async def ahas_object_permission(self, request, view, obj):
+        # appelé par AsyncAPIView à la place de has_object_permission
+        return (await aget_project_access(request)).is_contributor(obj.id)
@@ -0,0 +1,382 @@
+"""
+Recherche plein texte dans les problèmes (nom, description) et les
+commentaires des projets de l'utilisateur.
+
+Sous SQLite les tables FTS5 support_issue_fts et support_comment_fts indexent
+le texte des tables support_issue et support_comment (contenu externe : le
+texte n'est pas dupliqué). Des triggers tiennent l'index à jour pour toutes
+les écritures, bulk_create et suppressions en cascade comprises. Les autres
+bases passent par des filtres icontains.
+
+Les commentaires sont indexés par le rowid implicite de support_comment (leur
+clé est un UUID). Un VACUUM ou une migration qui recrée l'une des deux tables
+(SQLite recopie la table pour la plupart des ALTER) renumérote les lignes ou
+supprime les triggers : la commande rebuild_search_index remet l'index en état.
+"""
+
+import html
+import re
+import unicodedata
+import uuid
+
+from django.db import connection, connections, router
+from django.db.models import Q
+
+from support.models import Issue, Comment
+
+ISSUE = 'issue'
+COMMENT = 'comment'
+TYPES = (ISSUE, COMMENT)
+
+# au-delà les termes supplémentaires sont ignorés
+MAX_TERMS = 8
+# nombre de correspondances les plus récentes classées par type (voir rank_fts)
+RANK_WINDOW = 5000
+SNIPPET_TOKENS = 16
+# le nom d'un problème pèse plus que sa description
+ISSUE_WEIGHTS = (10.0, 1.0)
+
+# lettres et chiffres, comme le tokenizer unicode61
+TOKEN_RE = re.compile(r'[^\W_]+')
+ELLIPSIS = '…'
+
+INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS support_issue_fts USING fts5(
+        name, description,
+        content='support_issue', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_insert AFTER INSERT ON support_issue BEGIN
+        INSERT INTO support_issue_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_delete AFTER DELETE ON support_issue BEGIN
+        INSERT INTO support_issue_fts(support_issue_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    # les UPDATE des compteurs et de updated_at ne réécrivent pas l'index
+    """
+    CREATE TRIGGER IF NOT EXISTS support_issue_fts_update AFTER UPDATE OF name, description ON support_issue BEGIN
+        INSERT INTO support_issue_fts(support_issue_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO support_issue_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS support_comment_fts USING fts5(
+        description,
+        content='support_comment', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_insert AFTER INSERT ON support_comment BEGIN
+        INSERT INTO support_comment_fts(rowid, description)
+        VALUES (new.rowid, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_delete AFTER DELETE ON support_comment BEGIN
+        INSERT INTO support_comment_fts(support_comment_fts, rowid, description)
+        VALUES ('delete', old.rowid, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS support_comment_fts_update AFTER UPDATE OF description ON support_comment BEGIN
+        INSERT INTO support_comment_fts(support_comment_fts, rowid, description)
+        VALUES ('delete', old.rowid, old.description);
+        INSERT INTO support_comment_fts(rowid, description)
+        VALUES (new.rowid, new.description);
+    END
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS support_comment_fts_update",
+    "DROP TRIGGER IF EXISTS support_comment_fts_delete",
+    "DROP TRIGGER IF EXISTS support_comment_fts_insert",
+    "DROP TABLE IF EXISTS support_comment_fts",
+    "DROP TRIGGER IF EXISTS support_issue_fts_update",
+    "DROP TRIGGER IF EXISTS support_issue_fts_delete",
+    "DROP TRIGGER IF EXISTS support_issue_fts_insert",
+    "DROP TABLE IF EXISTS support_issue_fts",
+]
+
+FTS_TABLES = ('support_issue_fts', 'support_comment_fts')
+
+
+def read_connection():
+    # base des lectures de la requête : réplica ou base du client (config.shards)
+    return connections[router.db_for_read(Issue)]
+
+
+def uses_fts(using=None):
+    return (using or connection).vendor == 'sqlite'
+
+
+def create_search_index(using=None):
+    """Crée les tables et triggers manquants puis réindexe toutes les lignes."""
+    using = using or connection
+    if not uses_fts(using):
+        return
+    with using.cursor() as cursor:
+        for statement in INDEX_SQL:
+            cursor.execute(statement)
+    rebuild_search_index(using)
+
+
+def drop_search_index(using=None):
+    using = using or connection
+    if not uses_fts(using):
+        return
+    with using.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(using=None):
+    using = using or connection
+    with using.cursor() as cursor:
+        for table in FTS_TABLES:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def optimize_search_index(using=None):
+    """Fusionne les segments de l'index (à lancer après de gros imports)."""
+    using = using or connection
+    with using.cursor() as cursor:
+        for table in FTS_TABLES:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+
+
+def parse_terms(text):
+    return TOKEN_RE.findall(text or '')[:MAX_TERMS]
+
+
+def match_expression(terms):
+    """
+    Requête FTS5 : chaque terme entre guillemets (la syntaxe FTS5 saisie par
+    l'utilisateur n'est jamais interprétée), tous obligatoires, le dernier en
+    préfixe pour la recherche pendant la saisie.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def fold(word):
+    """Minuscules sans accents, comme unicode61 remove_diacritics."""
+    decomposed = unicodedata.normalize('NFKD', word.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class Highlighter:
+    """
+    Surlignage des termes recherchés, fait en Python sur les seules lignes de
+    la page : highlight() et snippet() de FTS5 relisent les listes de positions
+    du terme dans tout l'index, ce qui coûte cher pour un terme fréquent.
+    Le texte est échappé, seules les balises <mark> sont du HTML.
+    """
+
+    def __init__(self, terms):
+        folded = [fold(term) for term in terms]
+        self.exact = set(folded[:-1])
+        self.prefix = folded[-1] if folded else None
+
+    def matches(self, token):
+        token = fold(token)
+        return token in self.exact or (self.prefix is not None and token.startswith(self.prefix))
+
+    def highlight(self, text, start=0, end=None):
+        text = text or ''
+        end = len(text) if end is None else end
+        parts = []
+        position = start
+        for token in TOKEN_RE.finditer(text, start, end):
+            if self.matches(token.group()):
+                parts.append(html.escape(text[position:token.start()]))
+                parts.append(f'<mark>{html.escape(token.group())}</mark>')
+                position = token.end()
+        parts.append(html.escape(text[position:end]))
+        return ''.join(parts)
+
+    def snippet(self, text, size=SNIPPET_TOKENS):
+        """Extrait de size mots autour de la première correspondance."""
+        text = text or ''
+        tokens = list(TOKEN_RE.finditer(text))
+        if len(tokens) <= size:
+            return self.highlight(text)
+        first = next((i for i, token in enumerate(tokens) if self.matches(token.group())), 0)
+        begin = max(0, min(first - size // 4, len(tokens) - size))
+        last = begin + size - 1
+        start = tokens[begin].start() if begin else 0
+        end = tokens[last].end() if last < len(tokens) - 1 else len(text)
+        prefix = ELLIPSIS if begin else ''
+        suffix = ELLIPSIS if last < len(tokens) - 1 else ''
+        return prefix + self.highlight(text, start, end) + suffix
+
+
+def search(terms, project_ids, types=TYPES, limit=20, offset=0):
+    """
+    Résultats classés pour les projets donnés :
+    [{type, id, project, issue, title, snippet, rank}, ...].
+    """
+    if not terms or not project_ids or not types:
+        return []
+    if uses_fts(read_connection()):
+        return search_fts(terms, project_ids, types, limit, offset)
+    return search_icontains(terms, project_ids, types, limit, offset)
+
+
+def search_fts(terms, project_ids, types, limit, offset):
+    """
+    Deux passes : classement bm25 des correspondances du périmètre, puis
+    lecture du texte des seules lignes de la page.
+    """
+    ranked = rank_fts(match_expression(terms), list(project_ids), types, limit, offset)
+    highlighter = Highlighter(terms)
+    details = {}
+    issue_ids = [rowid for row_type, rowid, rank in ranked if row_type == ISSUE]
+    if issue_ids:
+        details.update(issue_details(issue_ids, highlighter))
+    comment_rowids = [rowid for row_type, rowid, rank in ranked if row_type == COMMENT]
+    if comment_rowids:
+        details.update(comment_details(comment_rowids, highlighter))
+    return [
+        {**details[(row_type, rowid)], 'rank': round(rank, 4)}
+        for row_type, rowid, rank in ranked
+    ]
+
+
+def rank_fts(expression, project_ids, types, limit, offset):
+    """
+    [(type, rowid, rang bm25)] de la page. Le rang n'est calculé que sur les
+    RANK_WINDOW correspondances les plus récentes du périmètre (parcours de
+    l'index FTS5 par rowid décroissant) : un terme présent dans des centaines
+    de milliers de lignes ne fait pas calculer bm25 pour chacune.
+    """
+    in_projects = ', '.join(['%s'] * len(project_ids))
+    selects = []
+    params = []
+    if ISSUE in types:
+        selects.append(f"""
+            SELECT * FROM (
+                SELECT 'issue' AS type, f.rowid AS rowid,
+                       bm25(support_issue_fts, {ISSUE_WEIGHTS[0]}, {ISSUE_WEIGHTS[1]}) AS rank
+                FROM support_issue_fts f
+                JOIN support_issue i ON i.id = f.rowid
+                WHERE support_issue_fts MATCH %s AND i.project_id IN ({in_projects})
+                ORDER BY f.rowid DESC LIMIT {RANK_WINDOW}
+            )
+        """)
+        params += [expression, *project_ids]
+    if COMMENT in types:
+        selects.append(f"""
+            SELECT * FROM (
+                SELECT 'comment' AS type, f.rowid AS rowid, bm25(support_comment_fts) AS rank
+                FROM support_comment_fts f
+                JOIN support_comment c ON c.rowid = f.rowid
+                JOIN support_issue i ON i.id = c.issue_id
+                WHERE support_comment_fts MATCH %s AND i.project_id IN ({in_projects})
+                ORDER BY f.rowid DESC LIMIT {RANK_WINDOW}
+            )
+        """)
+        params += [expression, *project_ids]
+
+    # bm25 est négatif : les plus pertinents d'abord
+    sql = " UNION ALL ".join(selects) + " ORDER BY rank, type, rowid LIMIT %s OFFSET %s"
+    with read_connection().cursor() as cursor:
+        cursor.execute(sql, [*params, limit, offset])
+        return cursor.fetchall()
+
+
+def issue_details(issue_ids, highlighter):
+    rows = Issue.objects.filter(id__in=issue_ids).values_list('id', 'project_id', 'name', 'description')
+    return {
+        (ISSUE, issue_id): {
+            'type': ISSUE,
+            'id': issue_id,
+            'project': project_id,
+            'issue': issue_id,
+            'title': highlighter.highlight(name),
+            'snippet': highlighter.snippet(description),
+        }
+        for issue_id, project_id, name, description in rows
+    }
+
+
+def comment_details(rowids, highlighter):
+    # le rowid des commentaires n'est pas un champ du modèle
+    sql = f"""
+        SELECT c.rowid, c.id, i.project_id, i.id, i.name, c.description
+        FROM support_comment c
+        JOIN support_issue i ON i.id = c.issue_id
+        WHERE c.rowid IN ({', '.join(['%s'] * len(rowids))})
+    """
+    with read_connection().cursor() as cursor:
+        cursor.execute(sql, rowids)
+        rows = cursor.fetchall()
+    return {
+        (COMMENT, rowid): {
+            'type': COMMENT,
+            'id': uuid.UUID(comment_id),
+            'project': project_id,
+            'issue': issue_id,
+            'title': html.escape(name),
+            'snippet': highlighter.snippet(description),
+        }
+        for rowid, comment_id, project_id, issue_id, name, description in rows
+    }
+
+
+def search_icontains(terms, project_ids, types, limit, offset):
+    """
+    Recherche sans index : chaque terme doit apparaître (sans tenir compte de
+    la casse), les plus récents d'abord. Sert aussi de point de comparaison
+    au benchmark de la recherche.
+    """
+    highlighter = Highlighter(terms)
+    results = []
+    if ISSUE in types:
+        condition = Q()
+        for term in terms:
+            condition &= Q(name__icontains=term) | Q(description__icontains=term)
+        issues = Issue.objects.filter(condition, project_id__in=project_ids).order_by(
+            '-time_created', '-id',
+        ).values('id', 'project_id', 'name', 'description', 'time_created')[:offset + limit]
+        results += [
+            {
+                'type': ISSUE, 'id': row['id'], 'project': row['project_id'], 'issue': row['id'],
+                'title': highlighter.highlight(row['name']), 'snippet': highlighter.snippet(row['description']),
+                'rank': None, 'time_created': row['time_created'],
+            }
+            for row in issues
+        ]
+    if COMMENT in types:
+        condition = Q()
+        for term in terms:
+            condition &= Q(description__icontains=term)
+        comments = Comment.objects.filter(condition, issue__project_id__in=project_ids).order_by(
+            '-time_created', '-id',
+        ).values('id', 'issue_id', 'issue__project_id', 'issue__name', 'description', 'time_created')[:offset + limit]
+        results += [
+            {
+                'type': COMMENT, 'id': row['id'], 'project': row['issue__project_id'], 'issue': row['issue_id'],
+                'title': html.escape(row['issue__name']), 'snippet': highlighter.snippet(row['description']),
+                'rank': None, 'time_created': row['time_created'],
+            }
+            for row in comments
+        ]
+
+    results.sort(key=lambda result: result['time_created'], reverse=True)
+    results = results[offset:offset + limit]
+    for result in results:
+        del result['time_created']
+    return results
@@ -2,12 +2,14 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from support.models import Project, Issue, Comment
+from support.access import get_project_access
+from config.instrumentation import TimedSerializerMixin
 from authentication.models import User
 
 UserModel = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = UserModel
@@ -17,7 +19,7 @@ class UserSerializer(serializers.ModelSerializer):
         ]
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     
     author = UserSerializer(read_only=True)
 
@@ -31,7 +33,7 @@ class CommentSerializer(serializers.ModelSerializer):
         ]
 
 
-class IssueSerializer(serializers.ModelSerializer):
+class IssueSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     author = UserSerializer(read_only=True)
     attribution = UserSerializer(read_only=True)
@@ -53,11 +55,10 @@ class IssueSerializer(serializers.ModelSerializer):
         ]
 
 
-class IssueSerializerResume(serializers.ModelSerializer):
+class IssueSerializerResume(TimedSerializerMixin, serializers.ModelSerializer):
 
     author = UserSerializer(read_only=True)
     attribution = UserSerializer(read_only=True)
-    comments_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Issue
@@ -74,12 +75,8 @@ class IssueSerializerResume(serializers.ModelSerializer):
             "comments_count",
         ]
 
-    def get_comments_count(self, obj):
-            # 'obj' est l'instance de l'Issue en cours de traitement
-            return obj.comments.count()
 
-
-class CommentAdminSerializer(serializers.ModelSerializer):
+class CommentAdminSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Comment
@@ -90,22 +87,16 @@ class CommentAdminSerializer(serializers.ModelSerializer):
         ]
 
     def validate_issue(self, value):
-        client = self.context['request'].user.client
-        is_valid = Issue.objects.filter(
-            # le problème doit exister
-            id=value.id,
-            # il doit être un des projets du clients
-            project__author__client=client,
-            # l'utilisateur doit être contributeur du projet
-            project__contributors=self.context['request'].user,
-        ).exists()
-        if not is_valid:
+        # le problème doit appartenir à un projet actif du client
+        # dont l'utilisateur est contributeur
+        access = get_project_access(self.context['request'])
+        if not access.is_contributor(value.project_id):
             raise serializers.ValidationError("Référence inconnue")
 
         return value   
 
 
-class IssueAdminSerializer(serializers.ModelSerializer):
+class IssueAdminSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
 
     class Meta:
@@ -128,24 +119,52 @@ class IssueAdminSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Le changement de projet est interdit.")
         # S'il n'y a pas d'instance il s'agit d'un POST
         else:
-            user = self.context['request'].user
-            is_valid = Project.objects.filter(
-                # le projet doit exister
-                id=value.id,
-                # il doit être un des projets du clients
-                author__client=user.client,
-                # l'utilisateur doit être contributeur du projet
-                contributors=user,
-            ).exists()
-            if not is_valid:
+            # le projet doit être un projet du client dont l'utilisateur est contributeur
+            access = get_project_access(self.context['request'])
+            if not access.is_contributor(value.id):
                 raise serializers.ValidationError("Référence inconnue")
 
         return value 
     
 
-class ProjectListSerializer(serializers.ModelSerializer):
+class IssueBulkItemSerializer(serializers.ModelSerializer):
+    # Validation d'un élément d'une création en lot : project et attribution restent
+    # des ids, ils sont vérifiés pour tout le lot en une requête chacun (support.bulk)
+
+    project = serializers.IntegerField()
+    attribution = serializers.IntegerField()
+
+    class Meta:
+        model = Issue
+        fields = [
+            "name",
+            "description",
+            "priority",
+            "balise",
+            "progression",
+            "project",
+            "attribution",
+        ]
+        # l'unicité (name, project) est vérifiée pour tout le lot
+        validators = []
+
+
+class CommentBulkItemSerializer(serializers.ModelSerializer):
+    # issue reste un id, vérifié pour tout le lot (support.bulk)
+
+    issue = serializers.IntegerField()
+
+    class Meta:
+        model = Comment
+        fields = [
+            "description",
+            "issue",
+        ]
+        # l'unicité (description, issue) est vérifiée pour tout le lot
+        validators = []
+
 
-    issues_count = serializers.IntegerField(source='total_issues', read_only=True)
+class ProjectListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Project
@@ -160,12 +179,12 @@ class ProjectListSerializer(serializers.ModelSerializer):
     # Pour un même client, un projet ne peut pas avoir 2 fois le même nom
     def validate_name(self, value):
         user = self.context['request'].user
-        if Project.objects.filter(name=value, author__client=user.client).exists():
+        if Project.objects.filter(name=value, author__client_id=user.client_id).exists():
             raise serializers.ValidationError('Le projet existe déjà')
         return value
 
 
-class ProjectDetailSerializer(serializers.ModelSerializer):
+class ProjectDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     issues = IssueSerializer(many=True)
     author = UserSerializer(read_only=True)
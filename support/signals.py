@@ -0,0 +1,22 @@
+from itertools import chain
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from support.access import invalidate_project_access
+from support.models import Project, ProjectContributors
+
+
+@receiver([post_save, post_delete], sender=ProjectContributors)
+def invalidate_contributor_access(sender, instance, **kwargs):
+    invalidate_project_access([instance.contributor_id])
+
+
+@receiver(post_save, sender=Project)
+def invalidate_project_members_access(sender, instance, **kwargs):
+    # changement d'auteur ou désactivation : tous les membres sont concernés
+    contributor_ids = ProjectContributors.objects.filter(
+        project_id=instance.id,
+    ).values_list('contributor_id', flat=True)
+    # le queryset n'est évalué que si le cache inter-requêtes est actif
+    invalidate_project_access(chain([instance.author_id], contributor_ids))
@@ -0,0 +1,328 @@
+"""
+Synchronisation différentielle : ce qui a changé dans les projets visibles de
+l'utilisateur depuis un jeton.
+
+Chaque insertion ou modification d'un projet, lien contributeur, problème,
+commentaire ou trace de suppression (Tombstone) reçoit dans change_seq la
+valeur suivante de ChangeSequence, attribuée par un trigger SQLite (migration
+0017) dans la transaction qui écrit. SQLite n'ayant qu'un écrivain à la fois,
+une transaction ouverte tient le compteur jusqu'à sa validation : toute
+position qu'elle attribue dépasse la valeur lue par les autres connexions.
+La séquence suit donc l'ordre des validations, ni l'horloge ni la durée des
+transactions n'interviennent. Une migration qui recrée l'une de ces tables
+doit recréer ses triggers.
+
+Le jeton est la valeur du compteur à la fin de la synchronisation, avec la
+base qui l'a attribuée (chaque base a sa séquence) : la fenêtre suivante est
+(since, until], until étant lu à la première page. Chaque source est lue dans
+l'ordre de change_seq, les sources sont ensuite fusionnées : le curseur d'une
+page garde la position atteinte dans chacune.
+
+Un projet qui devient visible (lien contributeur créé dans la fenêtre) est
+envoyé en entier avec ses contributeurs, problèmes et commentaires. Un
+utilisateur retiré d'un projet reçoit la suppression du projet. La suppression
+d'un projet ou d'un problème vaut pour ses enfants.
+"""
+
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from support.models import Project, ProjectContributors, Issue, Comment, Tombstone, ChangeSequence
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+SOURCES = ('tombstone', 'project', 'contributor', 'issue', 'comment')
+# en deçà, une première synchronisation trie les commentaires du périmètre
+# plutôt que de parcourir l'index des modifications de tous les clients
+SCAN_MIN_COMMENTS = 20000
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    """Jeton illisible dans la séquence courante : synchronisation complète."""
+
+
+def record_deletions(kind, rows):
+    """Enregistre les suppressions données en (object_id, project_id[, user_id])."""
+    Tombstone.objects.bulk_create([
+        Tombstone(kind=kind, object_id=str(row[0]), project_id=row[1], user_id=row[2] if len(row) > 2 else None)
+        for row in rows
+    ])
+
+
+def sequence_database():
+    # base des écritures du client de la requête (config.shards)
+    return router.db_for_write(ChangeSequence)
+
+
+def current_sequence():
+    """Dernière position attribuée, toutes les précédentes sont validées."""
+    return ChangeSequence.objects.values_list('value', flat=True).first() or 0
+
+
+def oldest_token_date():
+    """Date en deçà de laquelle les suppressions ont pu être purgées."""
+    return timezone.now() - timedelta(days=getattr(settings, 'SUPPORT_SYNC_TOMBSTONE_DAYS', 90))
+
+
+def encode(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode(token):
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise InvalidToken
+
+
+def parse_moment(value):
+    if value is None:
+        return None
+    try:
+        moment = parse_datetime(value)
+    except (TypeError, ValueError):
+        moment = None
+    if moment is None or timezone.is_naive(moment):
+        raise InvalidToken
+    return moment
+
+
+def parse_position(value):
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise InvalidToken
+    return value
+
+
+def encode_token(until, database, issued_at=None):
+    return encode({
+        's': until,
+        'd': database,
+        't': (issued_at or timezone.now()).isoformat(),
+    })
+
+
+def decode_token(token):
+    """Retourne (position, base, date d'émission) ou lève InvalidToken."""
+    data = decode(token)
+    if not isinstance(data, dict):
+        raise InvalidToken
+    if 's' not in data and parse_moment(data.get('t')) is not None:
+        # jeton daté, antérieur à la séquence
+        raise ExpiredToken
+    try:
+        since = parse_position(data['s'])
+        database = data['d']
+        issued_at = parse_moment(data['t'])
+    except (TypeError, KeyError):
+        raise InvalidToken
+    if since is None or not isinstance(database, str) or issued_at is None:
+        raise InvalidToken
+    return since, database, issued_at
+
+
+class ChangeFeed:
+    """
+    Changements visibles par user dans la fenêtre (since, until]. since vaut
+    None pour une première synchronisation : tout le périmètre est envoyé.
+    """
+
+    def __init__(self, user, access, since, until, scan_comments=None):
+        self.user = user
+        self.since = since
+        self.until = until
+        self.visible_ids = access.contributed_ids | access.authored_ids
+        if since is None:
+            self.new_ids = set()
+        else:
+            self.new_ids = self.visible_ids & set(ProjectContributors.objects.filter(
+                contributor_id=user.id,
+                change_seq__gt=since,
+                change_seq__lte=until,
+            ).values_list('project_id', flat=True))
+        if scan_comments is None:
+            scan_comments = since is not None or self.count_visible_comments() >= SCAN_MIN_COMMENTS
+        self.scan_comments = scan_comments
+
+    def count_visible_comments(self):
+        return Issue.objects.filter(project_id__in=self.visible_ids).aggregate(
+            count=Sum('comments_count'),
+        )['count'] or 0
+
+    def encode_cursor(self, positions, database):
+        return encode({
+            's': self.since,
+            'u': self.until,
+            'd': database,
+            'p': positions,
+            'c': self.scan_comments,
+        })
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Retourne (since, until, base, positions, scan_comments) ou lève InvalidToken."""
+        data = decode(cursor)
+        try:
+            since = parse_position(data['s'])
+            until = parse_position(data['u'])
+            database = data['d']
+            positions = {
+                source: parse_position(position)
+                for source, position in data['p'].items()
+                if source in SOURCES
+            }
+            scan_comments = bool(data['c'])
+        except (TypeError, KeyError, AttributeError):
+            raise InvalidToken
+        if until is None or not isinstance(database, str):
+            raise InvalidToken
+        return since, until, database, positions, scan_comments
+
+    def page(self, positions, limit):
+        """
+        Retourne (changements, positions, reste) : au plus limit changements
+        triés par change_seq après les positions données.
+        """
+        rows = []
+        for source in SOURCES:
+            for change in getattr(self, f'read_{source}')(positions.get(source), limit + 1):
+                rows.append((source, change))
+        # chaque source est déjà triée : la page contient un préfixe de chacune
+        # (une position n'est attribuée qu'à une seule ligne de la base)
+        rows.sort(key=lambda row: row[1]['seq'])
+        page = rows[:limit]
+
+        positions = dict(positions)
+        for source, change in page:
+            positions[source] = change['seq']
+        return [change for source, change in page], positions, len(rows) > limit
+
+    def window(self, new_projects=None):
+        """(since, until], plus tout l'historique des projets devenus visibles."""
+        # borne basse explicite même sans jeton : sur une plage fermée SQLite
+        # parcourt l'index de change_seq au lieu de trier tout le périmètre
+        window = Q(change_seq__gt=self.since or 0, change_seq__lte=self.until)
+        if self.since is None or not self.new_ids or not new_projects:
+            return window
+        return window | Q(**{'change_seq__lte': self.until, f'{new_projects}__in': self.new_ids})
+
+    def read(self, queryset, position, limit, fields, new_projects=None):
+        queryset = queryset.filter(self.window(new_projects)).order_by('change_seq')
+        if position is not None:
+            queryset = queryset.filter(change_seq__gt=position)
+        return queryset.values('change_seq', *fields)[:limit]
+
+    def read_project(self, position, limit):
+        queryset = Project.objects.filter(id__in=self.visible_ids)
+        rows = self.read(queryset, position, limit, [
+            'id', 'name', 'description', 'type', 'author_id',
+            'time_created', 'updated_at', 'issues_count',
+        ], new_projects='id')
+        for row in rows:
+            yield change('project', UPSERT, row['id'], row['id'], row['change_seq'], row['updated_at'], {
+                'name': row['name'],
+                'description': row['description'],
+                'type': row['type'],
+                'author': row['author_id'],
+                'time_created': row['time_created'],
+                'issues_count': row['issues_count'],
+            })
+
+    def read_contributor(self, position, limit):
+        queryset = ProjectContributors.objects.filter(project_id__in=self.visible_ids)
+        rows = self.read(queryset, position, limit, [
+            'id', 'project_id', 'contributor_id', 'contributor__username', 'time_created',
+        ], new_projects='project_id')
+        for row in rows:
+            yield change(
+                'contributor', UPSERT, row['contributor_id'], row['project_id'], row['change_seq'], row['time_created'],
+                {'username': row['contributor__username']},
+            )
+
+    def read_issue(self, position, limit):
+        queryset = Issue.objects.filter(project_id__in=self.visible_ids)
+        rows = self.read(queryset, position, limit, [
+            'id', 'project_id', 'name', 'description', 'priority', 'balise', 'progression',
+            'author_id', 'attribution_id', 'time_created', 'updated_at', 'comments_count',
+        ], new_projects='project_id')
+        for row in rows:
+            yield change('issue', UPSERT, row['id'], row['project_id'], row['change_seq'], row['updated_at'], {
+                'name': row['name'],
+                'description': row['description'],
+                'priority': row['priority'],
+                'balise': row['balise'],
+                'progression': row['progression'],
+                'author': row['author_id'],
+                'attribution': row['attribution_id'],
+                'time_created': row['time_created'],
+                'comments_count': row['comments_count'],
+            })
+
+    def read_comment(self, position, limit):
+        if self.scan_comments:
+            # jointure : SQLite parcourt comment_sequence_idx dans l'ordre et s'arrête à la page
+            queryset = Comment.objects.filter(issue__project_id__in=self.visible_ids)
+        else:
+            # petit périmètre : ses commentaires sont lus par problème puis triés
+            queryset = Comment.objects.filter(
+                issue_id__in=Issue.objects.filter(project_id__in=self.visible_ids).values('id'),
+            )
+        rows = self.read(queryset, position, limit, [
+            'id', 'issue_id', 'issue__project_id', 'description', 'author_id', 'time_created', 'updated_at',
+        ], new_projects='issue__project_id')
+        for row in rows:
+            yield change(
+                'comment', UPSERT, row['id'], row['issue__project_id'], row['change_seq'], row['updated_at'], {
+                    'issue': row['issue_id'],
+                    'description': row['description'],
+                    'author': row['author_id'],
+                    'time_created': row['time_created'],
+                },
+            )
+
+    def read_tombstone(self, position, limit):
+        # projets dont l'utilisateur est ou a été membre, supprimés compris
+        member = (
+            Q(project_id__in=ProjectContributors.objects.filter(contributor_id=self.user.id).values('project_id'))
+            | Q(project_id__in=Project.all_objects.filter(author_id=self.user.id).values('id'))
+            | Q(kind=Tombstone.Kind.CONTRIBUTOR, user_id=self.user.id)
+        )
+        queryset = Tombstone.objects.filter(member)
+        rows = self.read(queryset, position, limit, [
+            'id', 'kind', 'object_id', 'project_id', 'user_id', 'time_deleted',
+        ])
+        for row in rows:
+            kind, object_id = row['kind'], row['object_id']
+            if kind == Tombstone.Kind.CONTRIBUTOR and row['user_id'] == self.user.id \
+                    and row['project_id'] not in self.visible_ids:
+                # l'utilisateur a perdu l'accès : le projet disparaît de son périmètre
+                kind, object_id = Tombstone.Kind.PROJECT, row['project_id']
+            elif kind != Tombstone.Kind.COMMENT:
+                object_id = int(object_id)
+            yield change(
+                kind, DELETE, object_id, row['project_id'], row['change_seq'], row['time_deleted'], None,
+            )
+
+
+def change(type, op, id, project, seq, changed_at, data):
+    return {
+        'type': type,
+        'op': op,
+        'id': id,
+        'project': project,
+        'seq': seq,
+        'changed_at': changed_at,
+        'data': data,
+    }
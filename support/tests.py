@@ -1,3 +1,1360 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from authentication.serializers import TenantTokenObtainPairSerializer
+from client.models import Client
+from support.models import Project, ProjectContributors, Issue, Comment, Tombstone
+from support.caching import project_detail_cache, HIT, MISS
+from support.search import TYPES, Highlighter, search_fts, search_icontains
+from support.sync import decode_token, encode, encode_token
+from support.views import ProjectListView, ProjectDetailView, ProjectIssuesView, IssueCommentsView
+from support.counters import reconcile_issues_count, reconcile_comments_count, update_comments_count
+from support.benchmark import BenchmarkContext, build_scenarios, run_scenario, compare_with_baseline
+from support.management.commands.generate_dataset import PASSWORD
+from support.management.commands.import_ndjson import Command as ImportCommand
+
+UserModel = get_user_model()
+
+
+def create_client(name="Meridien", domain="meridien.fr"):
+    return Client.objects.create(name=name, domain=domain)
+
+
+def create_user(username, client):
+    return UserModel.objects.create_user(
+        username=username,
+        password="pwd_2026",
+        date_birth="1980-01-01",
+        email=f"{username.lower()}@{client.domain}",
+    )
+
+
+def create_project(author, name, issues=0, comments=0, contributors=()):
+    """Crée un projet avec `issues` problèmes portant chacun `comments` commentaires."""
+    project = Project.objects.create(name=name, type=Project.Type.BACKEND, author=author)
+    ProjectContributors.objects.create(contributor=author, project=project)
+    for contributor in contributors:
+        ProjectContributors.objects.create(contributor=contributor, project=project)
+    for i in range(issues):
+        issue = Issue.objects.create(
+            name=f"{name} issue {i}",
+            priority=Issue.Priority.LOW,
+            balise=Issue.Balise.BUG,
+            author=author,
+            attribution=author,
+            project=project,
+        )
+        for j in range(comments):
+            Comment.objects.create(
+                description=f"{name} comment {i}-{j}",
+                issue=issue,
+                author=author,
+            )
+    reconcile_issues_count([project.id])
+    reconcile_comments_count(list(project.issues.values_list("id", flat=True)))
+    return project
+
+
+class ProjectViewsetQueryTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def test_list_query_count_does_not_depend_on_data_size(self):
+        create_project(self.alicia, "GeoNode", issues=2, comments=2)
+        with self.assertNumQueries(1) as small:
+            self.client.get(reverse("project-list"))
+
+        for i in range(5):
+            create_project(self.alicia, f"Leaflet {i}", issues=4, comments=3, contributors=[self.bob])
+        with self.assertNumQueries(len(small.captured_queries)):
+            response = self.client.get(reverse("project-list"), {"page_size": 10})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 6)
+
+    def test_list_issues_count_is_read_from_the_row(self):
+        create_project(self.alicia, "GeoNode", issues=3, contributors=[self.bob])
+
+        response = self.client.get(reverse("project-list"))
+
+        self.assertEqual(response.data["results"][0]["issues_count"], 3)
+
+    def test_list_includes_contributed_projects_once(self):
+        create_project(self.bob, "Atlas.co", contributors=[self.alicia])
+        create_project(self.bob, "Carto")
+
+        response = self.client.get(reverse("project-list"))
+
+        self.assertEqual([p["name"] for p in response.data["results"]], ["Atlas.co"])
+
+    def test_retrieve_query_count_does_not_depend_on_data_size(self):
+        small = create_project(self.alicia, "GeoNode", issues=1, comments=1)
+        big = create_project(self.alicia, "Leaflet", issues=6, comments=4, contributors=[self.bob])
+
+        # version du projet, projet, contributeurs, problèmes, commentaires
+        with self.assertNumQueries(5) as captured:
+            self.client.get(reverse("project-detail", args=[small.id]))
+        with self.assertNumQueries(len(captured.captured_queries)):
+            response = self.client.get(reverse("project-detail", args=[big.id]))
+
+        self.assertEqual(len(response.data["issues"]), 6)
+        self.assertEqual(len(response.data["issues"][0]["comments"]), 4)
+        self.assertEqual(len(response.data["contributors"]), 2)
+
+
+class KeysetPaginationTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.projects = [create_project(cls.alicia, f"Projet {i}") for i in range(12)]
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def test_walk_all_pages_forward_and_back(self):
+        url = reverse("project-list")
+        seen = []
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn("count", response.data)
+            pages.append(response.data)
+            seen.extend(p["id"] for p in response.data["results"])
+            url = response.data["next"]
+
+        expected = [p.id for p in sorted(self.projects, key=lambda p: (p.time_created, p.id), reverse=True)]
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page["results"]) for page in pages], [5, 5, 2])
+
+        response = self.client.get(pages[-1]["previous"])
+        self.assertEqual(response.data["results"], pages[1]["results"])
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("project-list"))
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data["next"])
+        with self.assertNumQueries(1):
+            self.client.get(response.data["next"])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("project-list"), {"cursor": "pas-un-curseur"})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class CounterTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+        self.project = create_project(self.alicia, "GeoNode", issues=1)
+        self.issue = self.project.issues.get()
+
+    def test_issue_create_and_delete_update_project_counter(self):
+        response = self.client.post(reverse("admin_issue-list"), {
+            "name": "Format GeoJson",
+            "priority": Issue.Priority.HIGH,
+            "balise": Issue.Balise.FEATURE,
+            "progression": Issue.Progression.TODO,
+            "project": self.project.id,
+            "attribution": self.alicia.id,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.issues_count, 2)
+
+        self.client.delete(reverse("admin_issue-detail", args=[response.data["id"]]))
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.issues_count, 1)
+
+    def test_comment_create_and_delete_update_issue_counter(self):
+        response = self.client.post(reverse("admin_comment-list"), {
+            "description": "Un thème sombre conviendrait ?",
+            "issue": self.issue.id,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.comments_count, 1)
+
+        self.client.delete(reverse("admin_comment-detail", args=[response.data["id"]]))
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.comments_count, 0)
+
+    def test_comment_moved_to_another_issue_updates_both_counters(self):
+        other_issue = create_project(self.alicia, "Leaflet", issues=1).issues.get()
+        comment = Comment.objects.create(description="Doublon", issue=self.issue, author=self.alicia)
+        update_comments_count(self.issue.id, 1)
+
+        response = self.client.patch(reverse("admin_comment-detail", args=[comment.id]), {"issue": other_issue.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.issue.refresh_from_db()
+        other_issue.refresh_from_db()
+        self.assertEqual(self.issue.comments_count, 0)
+        self.assertEqual(other_issue.comments_count, 1)
+
+    def test_reconcile_counters_command_fixes_drift(self):
+        Project.objects.filter(id=self.project.id).update(issues_count=42)
+        Issue.objects.filter(id=self.issue.id).update(comments_count=7)
+
+        call_command("reconcile_counters", chunk_size=1, stdout=StringIO())
+
+        self.project.refresh_from_db()
+        self.issue.refresh_from_db()
+        self.assertEqual(self.project.issues_count, 1)
+        self.assertEqual(self.issue.comments_count, 0)
+
+
+class NestedListQueryTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.small = create_project(cls.alicia, "GeoNode", issues=1, comments=1)
+        cls.big = create_project(cls.alicia, "Leaflet", issues=30, comments=30, contributors=[cls.bob])
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def test_project_issues_query_budget(self):
+        with self.assertNumQueries(3):
+            self.client.get(reverse("project_issues", args=[self.small.id]))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("project_issues", args=[self.big.id]), {"page_size": 100})
+
+        self.assertEqual(len(response.data["results"]), 30)
+        self.assertEqual(response.data["results"][0]["comments_count"], 30)
+
+    def test_issue_comments_query_budget(self):
+        small_issue = self.small.issues.get()
+        big_issue = self.big.issues.first()
+        with self.assertNumQueries(3):
+            self.client.get(reverse("issue_comments", args=[small_issue.id]))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("issue_comments", args=[big_issue.id]), {"page_size": 100})
+
+        self.assertEqual(len(response.data["results"]), 30)
+        self.assertEqual(response.data["results"][0]["author"]["username"], "Alicia")
+
+    def test_issue_comments_are_paginated(self):
+        big_issue = self.big.issues.first()
+
+        response = self.client.get(reverse("issue_comments", args=[big_issue.id]))
+
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_non_contributor_is_forbidden(self):
+        carla = create_user("Carla", self.client_company)
+        self.client.force_authenticate(user=carla)
+
+        response = self.client.get(reverse("project_issues", args=[self.big.id]))
+
+        self.assertEqual(response.status_code, 403)
+
+
+class ProjectAccessTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=1)
+        cls.issue = cls.project.issues.get()
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def test_comment_create_checks_access_with_one_query(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse("admin_comment-list"), {
+                "description": "Constaté à chaque fois ?",
+                "issue": self.issue.id,
+            })
+
+        self.assertEqual(response.status_code, 201)
+        access_queries = [q for q in captured.captured_queries if "support_projectcontributors" in q["sql"]]
+        self.assertEqual(len(access_queries), 1)
+
+    def test_non_contributor_cannot_create_issue(self):
+        self.client.force_authenticate(user=self.bob)
+
+        response = self.client.post(reverse("admin_issue-list"), {
+            "name": "Format GeoJson",
+            "priority": Issue.Priority.HIGH,
+            "balise": Issue.Balise.FEATURE,
+            "project": self.project.id,
+            "attribution": self.bob.id,
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("project", response.data)
+
+    @override_settings(SUPPORT_PROJECT_ACCESS_CACHE_TIMEOUT=30)
+    def test_cached_access_is_invalidated_when_contributors_change(self):
+        self.client.force_authenticate(user=self.bob)
+        url = reverse("project_issues", args=[self.project.id])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        ProjectContributors.objects.create(contributor=self.bob, project=self.project)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        ProjectContributors.objects.filter(contributor=self.bob).delete()
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class QueryPlanTest(APITestCase):
+    """Vérifie avec EXPLAIN QUERY PLAN que SQLite utilise les index des chemins d'accès."""
+
+    def assertUsesIndex(self, queryset, index_name, columns):
+        plan = queryset.explain()
+        self.assertIn(f"USING INDEX {index_name} ({columns})", plan)
+
+    def test_membership_check_uses_unique_index(self):
+        queryset = ProjectContributors.objects.filter(contributor_id=1, project_id=1)
+        plan = queryset.explain()
+
+        self.assertIn("SEARCH support_projectcontributors USING", plan)
+        self.assertIn("(contributor_id=? AND project_id=?)", plan)
+
+    def test_author_projects_use_partial_index(self):
+        queryset = Project.objects.filter(author_id=1).order_by("-time_created")
+
+        self.assertUsesIndex(queryset, "project_active_author_idx", "author_id=?")
+
+    def test_admin_issue_list_uses_author_project_index(self):
+        queryset = Issue.objects.filter(author_id=1, project_id=1)
+
+        self.assertUsesIndex(queryset, "issue_author_project_idx", "author_id=? AND project_id=?")
+
+    def test_project_issues_page_uses_recent_index(self):
+        queryset = Issue.objects.filter(project_id=1).order_by("-time_created", "-id")
+        plan = queryset.explain()
+
+        self.assertIn("USING INDEX issue_project_recent_idx (project_id=?)", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_triage_filters_use_triage_index(self):
+        queryset = Issue.objects.filter(
+            project_id=1, progression=Issue.Progression.TODO, priority=Issue.Priority.HIGH,
+        ).order_by("-time_created", "-id")
+        plan = queryset.explain()
+
+        self.assertIn("USING INDEX issue_project_triage_idx (project_id=? AND progression=? AND priority=?)", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_attribution_filter_uses_attribution_index(self):
+        queryset = Issue.objects.filter(project_id=1, attribution_id=1).order_by("-time_created", "-id")
+        plan = queryset.explain()
+
+        self.assertIn("USING INDEX issue_project_attribution_idx (project_id=? AND attribution_id=?)", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_admin_comment_list_uses_author_issue_index(self):
+        queryset = Comment.objects.filter(author_id=1, issue_id=1)
+
+        self.assertUsesIndex(queryset, "comment_author_issue_idx", "author_id=? AND issue_id=?")
+
+    def test_issue_comments_page_uses_recent_index(self):
+        queryset = Comment.objects.filter(issue_id=1).order_by("time_created", "id")
+        plan = queryset.explain()
+
+        self.assertIn("USING INDEX comment_issue_recent_idx (issue_id=?)", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class GenerateDatasetTest(APITestCase):
+
+    def generate(self):
+        call_command(
+            "generate_dataset", clients=2, users=5, projects=4, issues=40, comments=200,
+            seed=7, flush=True, stdout=StringIO(),
+        )
+        return sorted(Project.objects.values_list("name", "issues_count"))
+
+    def test_dataset_is_reproducible_and_counters_are_consistent(self):
+        first = self.generate()
+        second = self.generate()
+
+        self.assertEqual(first, second)
+        self.assertEqual(Project.objects.count(), 8)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertEqual(sum(count for _, count in second), Issue.objects.count())
+
+    def test_second_run_without_flush_is_refused(self):
+        self.generate()
+
+        with self.assertRaisesMessage(CommandError, "--flush"):
+            call_command("generate_dataset", clients=1, users=2, projects=1, issues=1, comments=1, stdout=StringIO())
+        output = StringIO()
+        call_command("reconcile_counters", stdout=output)
+        self.assertIn("Projets corrigés : 0", output.getvalue())
+        self.assertIn("Problèmes corrigés : 0", output.getvalue())
+
+
+class BenchmarkTest(APITestCase):
+
+    def test_every_scenario_returns_its_expected_status(self):
+        call_command(
+            "generate_dataset", clients=1, users=4, projects=3, issues=12, comments=30,
+            stdout=StringIO(),
+        )
+        context = BenchmarkContext(PASSWORD)
+
+        report = {"endpoints": {
+            scenario.name: run_scenario(scenario, context, iterations=1)
+            for scenario in build_scenarios()
+        }}
+
+        self.assertEqual(compare_with_baseline(report, {}, tolerance=1.5), [])
+
+    def test_budget_overrun_is_reported(self):
+        result = {"p50_ms": 1, "p95_ms": 3, "queries": 4, "peak_kb": 10, "statuses": [200], "expected_status": 200}
+        budget = {"p50_ms": 1, "p95_ms": 1, "queries": 3, "peak_kb": 10}
+
+        failures = compare_with_baseline(
+            {"endpoints": {"project-list": result}},
+            {"endpoints": {"project-list": budget}},
+            tolerance=1.5,
+        )
+
+        self.assertEqual(len(failures), 2)
+        self.assertIn("4 requêtes SQL (budget 3)", failures[0])
+
+
+class BulkIssueCreateTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.esri = create_client("Esri France", "esri.fr")
+        cls.andre = create_user("Andre", cls.esri)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=1, contributors=[cls.bob])
+        cls.other_project = create_project(cls.bob, "Carto")
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def item(self, name, **kwargs):
+        return {
+            "name": name,
+            "priority": Issue.Priority.LOW,
+            "balise": Issue.Balise.TASK,
+            "progression": Issue.Progression.TODO,
+            "project": self.project.id,
+            "attribution": self.bob.id,
+            **kwargs,
+        }
+
+    def test_bulk_create_uses_constant_queries(self):
+        items = [self.item(f"Import {i}") for i in range(50)]
+
+        # index des accès, utilisateurs, noms existants, insertion, compteur, version + savepoints
+        with self.assertNumQueries(8):
+            response = self.client.post(reverse("admin_issue-list"), items, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["created"]), 50)
+        self.assertEqual(response.data["errors"], [])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.issues_count, 51)
+
+    def test_invalid_items_are_reported_without_aborting_the_batch(self):
+        items = [
+            self.item("Import ok"),
+            self.item("GeoNode issue 0"),
+            self.item("Import doublon"),
+            self.item("Import doublon"),
+            self.item("Import autre projet", project=self.other_project.id),
+            self.item("Import autre client", attribution=self.andre.id),
+            self.item("Import priorité", priority="Urgent"),
+        ]
+
+        response = self.client.post(reverse("admin_issue-list"), items, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([issue["name"] for issue in response.data["created"]], ["Import ok", "Import doublon"])
+        errors = {error["index"]: set(error["errors"]) for error in response.data["errors"]}
+        self.assertEqual(errors, {1: {"name"}, 3: {"name"}, 4: {"project"}, 5: {"attribution"}, 6: {"priority"}})
+
+    def test_all_invalid_returns_400(self):
+        response = self.client.post(
+            reverse("admin_issue-list"), [self.item("Import", project=self.other_project.id)], format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Issue.objects.filter(name="Import").count(), 0)
+
+    def test_single_create_still_requires_project(self):
+        response = self.client.post(reverse("admin_issue-list"), {"name": "Sans projet"}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("project", response.data)
+
+
+class BulkCommentCreateTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=3, comments=1)
+        cls.other_project = create_project(cls.bob, "Carto", issues=1)
+        cls.issues = list(cls.project.issues.order_by("id"))
+        cls.foreign_issue = cls.other_project.issues.get()
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def test_bulk_create_across_issues_uses_constant_queries(self):
+        items = [
+            {"description": f"Message {i}", "issue": self.issues[i % 3].id}
+            for i in range(90)
+        ]
+
+        # problèmes référencés, index des accès, doublons, insertion, 3 compteurs,
+        # versions des problèmes et du projet + savepoints
+        with self.assertNumQueries(11):
+            response = self.client.post(reverse("admin_comment-list"), items, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["created"]), 90)
+        for issue in self.issues:
+            issue.refresh_from_db()
+            self.assertEqual(issue.comments_count, 31)
+
+    def test_duplicates_and_unknown_issues_are_reported(self):
+        existing = self.issues[0].comments.get()
+        items = [
+            {"description": "Nouveau", "issue": self.issues[0].id},
+            {"description": existing.description, "issue": self.issues[0].id},
+            {"description": "Nouveau", "issue": self.issues[0].id},
+            {"description": "Nouveau", "issue": self.issues[1].id},
+            {"description": "Ailleurs", "issue": self.foreign_issue.id},
+            {"description": "Inconnu", "issue": 999999},
+            {"description": "Sans problème"},
+        ]
+
+        response = self.client.post(reverse("admin_comment-list"), items, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(len(response.data["created"]), 2)
+        errors = {error["index"]: set(error["errors"]) for error in response.data["errors"]}
+        self.assertEqual(errors, {1: {"description"}, 2: {"description"}, 4: {"issue"}, 5: {"issue"}, 6: {"issue"}})
+
+    def test_batch_size_is_limited(self):
+        items = [{"description": f"Message {i}", "issue": self.issues[0].id} for i in range(5001)]
+
+        response = self.client.post(reverse("admin_comment-list"), items, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ProjectExportTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=3, comments=2, contributors=[cls.bob])
+        cls.other_project = create_project(cls.bob, "Carto", issues=1)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def export(self, project, **params):
+        return self.client.get(reverse("project-export", args=[project.id]), params)
+
+    def test_ndjson_export_streams_every_record(self):
+        response = self.export(self.project)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        # le projet est lu par la vue, puis contributeurs, problèmes et commentaires en flux
+        with self.assertNumQueries(3):
+            content = b"".join(response.streaming_content)
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        types = [record["type"] for record in records]
+        self.assertEqual(types, ["project"] + ["contributor"] * 2 + ["issue"] * 3 + ["comment"] * 6)
+        self.assertEqual(records[0]["author"], "Alicia")
+        issue_ids = {record["id"] for record in records if record["type"] == "issue"}
+        self.assertTrue(all(record["parent"] in issue_ids for record in records if record["type"] == "comment"))
+
+    def test_csv_export(self):
+        response = self.export(self.project, output="csv")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[3]["name"], "GeoNode issue 0")
+        self.assertEqual(rows[3]["parent"], str(self.project.id))
+
+    def test_gzip_export(self):
+        response = self.export(self.project, compress="gzip")
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="project-%d.ndjson.gz"' % self.project.id, response["Content-Disposition"])
+        content = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(len(content.decode().splitlines()), 12)
+
+    async def test_asgi_export_streams_chunk_by_chunk(self):
+        access = TenantTokenObtainPairSerializer.get_token(self.alicia).access_token
+        url = reverse("project-export", args=[self.project.id])
+
+        response = await self.async_client.get(url, headers={"authorization": f"Bearer {access}"})
+
+        # un itérateur synchrone serait lu en entier par le gestionnaire ASGI
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.decode().splitlines()), 12)
+
+    def test_export_is_limited_to_known_projects(self):
+        self.assertEqual(self.export(self.other_project).status_code, 404)
+        self.assertEqual(self.export(self.project, output="xml").status_code, 400)
+
+
+class ImportNdjsonTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=4, comments=3, contributors=[cls.bob])
+        cls.esri = create_client("Esri France", "esri.fr")
+        cls.andre = create_user("Andre", cls.esri)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+        response = self.client.get(reverse("project-export", args=[self.project.id]))
+        handle, self.path = tempfile.mkstemp(suffix=".ndjson")
+        with os.fdopen(handle, "wb") as output:
+            output.writelines(response.streaming_content)
+        self.addCleanup(os.remove, self.path)
+
+    def run_import(self, *args, client="meridien.fr", stderr=None):
+        out = StringIO()
+        call_command("import_ndjson", self.path, "--client", client, *args, stdout=out, stderr=stderr or StringIO())
+        return out.getvalue()
+
+    def imported_project(self):
+        return Project.objects.exclude(id=self.project.id).get()
+
+    def test_import_recreates_project_for_client_users(self):
+        self.run_import("--batch-size", "5")
+
+        project = self.imported_project()
+        self.assertEqual(project.issues_count, 4)
+        self.assertEqual(project.time_created, self.project.time_created)
+        self.assertEqual(project.author, self.alicia)
+        self.assertEqual(set(project.contributors.all()), {self.alicia, self.bob})
+        self.assertEqual(Comment.objects.filter(issue__project=project).count(), 12)
+        self.assertEqual(set(project.issues.values_list("comments_count", flat=True)), {3})
+
+    def test_import_resumes_after_last_committed_batch(self):
+        original = ImportCommand.import_batch
+        calls = []
+
+        def failing_batch(command, batch):
+            calls.append(batch)
+            if len(calls) == 3:
+                raise RuntimeError("interruption")
+            original(command, batch)
+
+        with mock.patch.object(ImportCommand, "import_batch", failing_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import("--batch-size", "4")
+        # deux lots de 4 lignes enregistrés (projet, contributeurs, problèmes, un commentaire)
+        self.assertEqual(Comment.objects.exclude(issue__project=self.project).count(), 1)
+        version = self.imported_project().version
+
+        self.run_import("--batch-size", "4")
+
+        project = self.imported_project()
+        self.assertEqual(project.issues.count(), 4)
+        # détail en cache et ETag du projet d'un lot précédent invalidés
+        self.assertGreater(project.version, version)
+        self.assertEqual(Comment.objects.filter(issue__project=project).count(), 12)
+
+        # un fichier terminé n'est pas réimporté
+        self.run_import()
+        self.assertEqual(Project.objects.count(), 2)
+
+    def test_users_are_matched_within_the_client_only(self):
+        out = self.run_import(client="esri.fr")
+
+        self.assertIn("1 lignes ignorées : auteur de projet inconnu", out)
+        self.assertIn("12 lignes ignorées : commentaire : problème ou auteur inconnu", out)
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_malformed_lines_are_reported_and_skipped(self):
+        with open(self.path, "a") as output:
+            output.write('{"type": "issue", "id": 900, "parent": %d, "name": "Sans priorité"}\n' % self.project.id)
+            output.write('{"type": "project", "id": 901, "name": "Kepler", "project_type": "COBOL", "author": "Alicia"}\n')
+            output.write('{"type": "comment", "author": "Alicia"\n')
+            output.write('["comment"]\n')
+        err = StringIO()
+
+        out = self.run_import(stderr=err)
+
+        self.assertIn("4 lignes ignorées : ligne invalide", out)
+        errors = err.getvalue().splitlines()
+        self.assertIn("Ligne 20 ignorée : champs manquants : priority, balise, progression, author, attribution", errors)
+        self.assertIn("Ligne 21 ignorée : project_type invalide : 'COBOL'", errors)
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(self.imported_project().issues.count(), 4)
+
+    def test_concurrent_creates_keep_their_timestamp(self):
+        original = ImportCommand.import_batch
+
+        def batch_with_concurrent_write(command, batch):
+            original(command, batch)
+            # création par l'API pendant l'import
+            self.assertIsNotNone(Comment.objects.create(
+                description="Pendant l'import", issue=self.project.issues.first(), author=self.bob,
+            ).time_created)
+
+        with mock.patch.object(ImportCommand, "import_batch", batch_with_concurrent_write):
+            self.run_import()
+
+
+class ConditionalGetTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=2, comments=2, contributors=[cls.bob])
+        cls.issue = cls.project.issues.order_by("id").first()
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+
+    def test_project_detail_answers_304_from_the_version_lookup(self):
+        url = reverse("project-detail", args=[self.project.id])
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_child_writes_change_the_project_version(self):
+        detail = reverse("project-detail", args=[self.project.id])
+        issues = reverse("project_issues", args=[self.project.id])
+        comments = reverse("issue_comments", args=[self.issue.id])
+        etags = {url: self.client.get(url)["ETag"] for url in (detail, issues, comments)}
+
+        response = self.client.post(reverse("admin_comment-list"), {"description": "Nouveau", "issue": self.issue.id})
+        self.assertEqual(response.status_code, 201)
+
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_contributor_change_invalidates_the_detail(self):
+        url = reverse("project-detail", args=[self.project.id])
+        etag = self.client.get(url)["ETag"]
+
+        data = {"project": self.project.id, "contributor": self.bob.id}
+        self.client.delete(reverse("project_delete_contributor"), data)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_username_change_invalidates_the_reads_that_show_it(self):
+        detail = reverse("project-detail", args=[self.project.id])
+        comments = reverse("issue_comments", args=[self.issue.id])
+        etags = {url: self.client.get(url)["ETag"] for url in (detail, comments)}
+
+        response = self.client.patch(reverse("user_update", args=[self.alicia.id]), {"username": "Alice"})
+        self.assertEqual(response.status_code, 200)
+
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertIn('"Alice"', response.content.decode(), url)
+
+    def test_issue_lists_answer_304_before_serialization(self):
+        url = reverse("issue_comments", args=[self.issue.id])
+        response = self.client.get(url)
+
+        # problème + projet, index des accès
+        with self.assertNumQueries(2):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        # chaque page a sa propre version
+        other_page = self.client.get(url, {"page_size": 1}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(other_page.status_code, 200)
+
+    def test_if_modified_since(self):
+        url = reverse("project_issues", args=[self.project.id])
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_project_is_not_found(self):
+        other = create_project(self.bob, "Carto")
+
+        self.assertEqual(self.client.get(reverse("project-detail", args=[other.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("project-detail", args=["abc"])).status_code, 404)
+
+
+class ProjectDetailCacheTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=2, comments=2, contributors=[cls.bob])
+        cls.issue = cls.project.issues.order_by("id").first()
+
+    def setUp(self):
+        caches["project_detail"].clear()
+        self.client.force_authenticate(user=self.alicia)
+        self.url = reverse("project-detail", args=[self.project.id])
+
+    def test_second_read_is_served_from_the_cache(self):
+        first = self.client.get(self.url)
+
+        # seule la version du projet est lue
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_write_paths_bump_the_version(self):
+        writes = [
+            lambda: self.client.patch(reverse("admin_project-detail", args=[self.project.id]), {"name": "GeoNode 2"}),
+            lambda: self.client.post(reverse("admin_comment-list"), {"description": "Nouveau", "issue": self.issue.id}),
+            lambda: self.client.patch(
+                reverse("issue_change_attribution", args=[self.issue.id]), {"attribution": self.bob.id},
+            ),
+            lambda: self.client.delete(
+                reverse("project_delete_contributor"), {"project": self.project.id, "contributor": self.bob.id},
+            ),
+        ]
+        self.client.get(self.url)
+        for write in writes:
+            version = Project.objects.get(id=self.project.id).version
+            self.assertLess(write().status_code, 300)
+            self.assertEqual(Project.objects.get(id=self.project.id).version, version + 1)
+            self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["name"], "GeoNode 2")
+        self.assertEqual([user["username"] for user in response.data["contributors"]], ["Alicia"])
+
+    @override_settings(SUPPORT_PROJECT_DETAIL_STALE_TIMEOUT=60)
+    def test_stale_entry_is_served_while_another_request_rebuilds(self):
+        self.client.get(self.url)
+        self.client.post(reverse("admin_comment-list"), {"description": "Nouveau", "issue": self.issue.id})
+        # une autre requête a pris le verrou de reconstruction
+        caches["project_detail"].add(f"project_detail:{self.project.id}:refresh", 1)
+
+        stale = self.client.get(self.url)
+
+        self.assertEqual(stale["X-Cache"], "STALE")
+        self.assertEqual(len(stale.data["issues"][0]["comments"]), 2)
+        caches["project_detail"].delete(f"project_detail:{self.project.id}:refresh")
+        fresh = self.client.get(self.url)
+        self.assertEqual(fresh["X-Cache"], "MISS")
+        self.assertNotEqual(fresh["ETag"], stale["ETag"])
+
+    def test_metrics_are_counted(self):
+        metrics = project_detail_cache.metrics.copy()
+
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        self.assertEqual(project_detail_cache.metrics[MISS] - metrics[MISS], 1)
+        self.assertEqual(project_detail_cache.metrics[HIT] - metrics[HIT], 1)
+
+    @override_settings(SUPPORT_PROJECT_DETAIL_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        self.client.get(self.url)
+
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+
+
+class SearchTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=3, comments=2, contributors=[cls.bob])
+        cls.private = create_project(cls.bob, "Privé", issues=1, comments=1)
+        other_client = create_client("Autre", "autre.fr")
+        cls.other = create_project(create_user("Oscar", other_client), "GeoNode ailleurs", issues=1, comments=1)
+
+        cls.issue = Issue.objects.create(
+            name="Écran noir au démarrage",
+            description="L'écran reste <b>noir</b> après la connexion",
+            priority=Issue.Priority.HIGH,
+            balise=Issue.Balise.BUG,
+            author=cls.alicia,
+            attribution=cls.bob,
+            project=cls.project,
+        )
+        cls.comment = Comment.objects.create(
+            description="Reproduit sur la tablette, écran noir aussi", issue=cls.issue, author=cls.bob,
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+        self.url = reverse("search")
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_ranks_issues_and_comments_with_highlights(self):
+        results = self.search(q="ecran noir")
+
+        self.assertEqual([(r["type"], r["id"]) for r in results], [
+            ("issue", self.issue.id), ("comment", self.comment.id),
+        ])
+        issue, comment = results
+        # le nom pèse plus que la description
+        self.assertLess(issue["rank"], comment["rank"])
+        self.assertEqual(issue["title"], "<mark>Écran</mark> <mark>noir</mark> au démarrage")
+        # le texte de l'utilisateur est échappé
+        self.assertIn("&lt;b&gt;<mark>noir</mark>&lt;/b&gt;", issue["snippet"])
+        self.assertEqual(comment["issue"], self.issue.id)
+        self.assertEqual(comment["title"], "Écran noir au démarrage")
+
+    def test_scope_is_limited_to_the_user_projects(self):
+        results = self.search(q="GeoNode")
+
+        self.assertTrue(results)
+        self.assertEqual({r["project"] for r in results}, {self.project.id})
+        self.assertEqual(self.search(q="Privé"), [])
+
+    def test_filters_and_prefix(self):
+        self.assertEqual({r["type"] for r in self.search(q="tabl")}, {"comment"})
+        self.assertEqual({r["type"] for r in self.search(q="ecran", type="issue")}, {"issue"})
+        self.assertEqual(len(self.search(q="GeoNode", project=self.project.id, page_size=20)), 9)
+
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"q": "x", "type": "project"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"q": "x", "project": self.private.id}).status_code, 404)
+
+    def test_fts_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search(q='"noir"* -('), self.search(q="noir"))
+        # les opérateurs sont des termes comme les autres
+        self.assertEqual(self.search(q="noir OR tablette"), [])
+
+    def test_pagination(self):
+        response = self.client.get(self.url, {"q": "GeoNode", "page_size": 4})
+        self.assertEqual(len(response.data["results"]), 4)
+        self.assertIsNone(response.data["previous"])
+
+        seen = [r["id"] for r in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            seen += [r["id"] for r in response.data["results"]]
+
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(len(set(seen)), 9)
+        self.assertEqual(self.client.get(self.url, {"q": "GeoNode", "page": 0}).status_code, 404)
+
+    def test_index_follows_writes(self):
+        self.comment.description = "Corrigé par la mise à jour"
+        self.comment.save()
+        Comment.objects.bulk_create([
+            Comment(description="Import : régression clavier", issue=self.issue, author=self.alicia),
+        ])
+
+        self.assertEqual([r["type"] for r in self.search(q="ecran noir")], ["issue"])
+        self.assertEqual(len(self.search(q="corrige")), 1)
+        self.assertEqual(len(self.search(q="regression")), 1)
+
+        # suppression en cascade des commentaires
+        self.issue.delete()
+        self.assertEqual(self.search(q="clavier"), [])
+        self.assertEqual(self.search(q="ecran"), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO support_comment_fts(support_comment_fts) VALUES ('delete-all')")
+        self.assertEqual(self.search(q="tablette"), [])
+
+        call_command("rebuild_search_index", "--optimize", stdout=StringIO())
+
+        self.assertEqual(len(self.search(q="tablette")), 1)
+
+    def test_snippet_is_cut_around_the_first_match(self):
+        text = " ".join(f"mot{i}" for i in range(40)) + " <écran> " + " ".join(f"fin{i}" for i in range(40))
+
+        snippet = Highlighter(["ECRAN"]).snippet(text, size=8)
+
+        self.assertEqual(snippet, "…mot38 mot39 &lt;<mark>écran</mark>&gt; fin0 fin1 fin2 fin3 fin4…")
+
+    def test_icontains_fallback_finds_the_same_rows(self):
+        project_ids = {self.project.id}
+        for query in (["GeoNode", "comment"], ["noir"]):
+            fts = search_fts(query, project_ids, TYPES, 20, 0)
+            fallback = search_icontains(query, project_ids, TYPES, 20, 0)
+            self.assertEqual({r["id"] for r in fallback}, {r["id"] for r in fts})
+
+
+class IssueFilterTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", contributors=[cls.bob])
+        cls.issues = []
+        priorities = [Issue.Priority.LOW, Issue.Priority.HIGH, Issue.Priority.MEDIUM]
+        progressions = [Issue.Progression.TODO, Issue.Progression.FINISHED]
+        for i in range(12):
+            cls.issues.append(Issue.objects.create(
+                name=f"Problème {i}",
+                priority=priorities[i % 3],
+                progression=progressions[i % 2],
+                balise=Issue.Balise.BUG if i < 6 else Issue.Balise.TASK,
+                author=cls.alicia,
+                attribution=cls.bob if i % 4 == 0 else cls.alicia,
+                project=cls.project,
+            ))
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+        self.url = reverse("project_issues", args=[self.project.id])
+
+    def walk(self, url, params):
+        ids = []
+        response = self.client.get(url, {**params, "page_size": 5})
+        while True:
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [issue["id"] for issue in response.data["results"]]
+            if not response.data["next"]:
+                return ids
+            response = self.client.get(response.data["next"])
+
+    def expected(self, keep, key=None):
+        issues = [issue for issue in self.issues if keep(issue)]
+        issues.sort(key=lambda issue: (issue.time_created, issue.id), reverse=True)
+        if key is not None:
+            issues.sort(key=key)
+        return [issue.id for issue in issues]
+
+    def test_filters(self):
+        cases = [
+            ({"progression": "To Do", "priority": "High"},
+             lambda i: i.progression == "To Do" and i.priority == "High"),
+            ({"priority": "High,Medium"}, lambda i: i.priority in ("High", "Medium")),
+            ({"balise": "Tâche", "attribution": "me"}, lambda i: i.balise == "Tâche" and i.attribution_id == self.alicia.id),
+            ({"attribution": f"{self.bob.id}"}, lambda i: i.attribution_id == self.bob.id),
+        ]
+        for params, keep in cases:
+            self.assertEqual(self.walk(self.url, params), self.expected(keep), params)
+
+    def test_time_created_range(self):
+        middle = self.issues[6].time_created
+        params = {"created_after": middle.isoformat(), "created_before": self.issues[9].time_created.isoformat()}
+
+        self.assertEqual(self.walk(self.url, params), self.expected(lambda i: middle <= i.time_created < self.issues[9].time_created))
+        self.assertEqual(self.walk(self.url, {"created_after": "2999-01-01"}), [])
+
+    def test_ordering_walks_all_pages(self):
+        rank = {"Low": 0, "Medium": 1, "High": 2}
+        self.assertEqual(
+            self.walk(self.url, {"ordering": "-priority"}),
+            self.expected(lambda i: True, key=lambda i: -rank[i.priority]),
+        )
+        self.assertEqual(
+            self.walk(self.url, {"ordering": "priority", "progression": "To Do"}),
+            self.expected(lambda i: i.progression == "To Do", key=lambda i: rank[i.priority]),
+        )
+        self.assertEqual(self.walk(self.url, {"ordering": "time_created"}), self.expected(lambda i: True)[::-1])
+
+    def test_invalid_parameters_return_400(self):
+        for params in ({"priority": "Urgent"}, {"attribution": "bob"}, {"created_after": "hier"}, {"ordering": "name"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_admin_issue_list_accepts_the_same_filters(self):
+        url = reverse("admin_issue-list")
+        params = {"project": self.project.id, "progression": "Finished", "ordering": "-priority"}
+        rank = {"Low": 0, "Medium": 1, "High": 2}
+
+        self.assertEqual(
+            self.walk(url, params),
+            self.expected(lambda i: i.progression == "Finished", key=lambda i: -rank[i.priority]),
+        )
+
+    def test_filtered_pages_cost_one_query(self):
+        self.client.get(self.url, {"priority": "High"})
+
+        # projet, index des accès, page
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {"priority": "High", "ordering": "-priority"})
+
+
+class SyncTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.carla = create_user("Carla", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=2, comments=2, contributors=[cls.bob])
+        cls.other = create_project(cls.alicia, "Potree", issues=1, comments=1)
+        cls.hidden = create_project(cls.carla, "OpenLayers", issues=1, comments=1)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.alicia)
+        self.url = reverse("sync")
+
+    def sync(self, token=None, **params):
+        """Parcourt toutes les pages, retourne (changements, jeton suivant)."""
+        if token is not None:
+            params["since"] = token
+        response = self.client.get(self.url, params)
+        changes = []
+        while True:
+            self.assertEqual(response.status_code, 200, response.data)
+            changes += response.data["changes"]
+            if not response.data["next"]:
+                self.assertIsNotNone(response.data["token"])
+                return changes, response.data["token"]
+            self.assertIsNone(response.data["token"])
+            response = self.client.get(response.data["next"])
+
+    def keys(self, changes):
+        return {(change["type"], change["op"], str(change["id"])) for change in changes}
+
+    def test_full_sync_returns_the_visible_projects(self):
+        changes, _ = self.sync()
+
+        expected = {("contributor", "upsert", str(self.alicia.id)), ("contributor", "upsert", str(self.bob.id))}
+        for project in (self.project, self.other):
+            expected.add(("project", "upsert", str(project.id)))
+            for issue in project.issues.all():
+                expected.add(("issue", "upsert", str(issue.id)))
+                expected |= {("comment", "upsert", str(id)) for id in issue.comments.values_list("id", flat=True)}
+        self.assertEqual(self.keys(changes), expected)
+        self.assertEqual(len(changes), 13)
+        # les changements suivent la séquence
+        self.assertEqual(changes, sorted(changes, key=lambda change: change["seq"]))
+
+    def test_pages_split_the_sequence_without_gaps(self):
+        changes, _ = self.sync()
+        paged, _ = self.sync(page_size=2)
+
+        self.assertEqual([change["id"] for change in paged], [change["id"] for change in changes])
+
+    def test_delta_contains_writes_and_deletions(self):
+        _, token = self.sync()
+        issue = self.project.issues.first()
+        comment = issue.comments.first()
+
+        self.client.patch(reverse("admin_issue-detail", args=[issue.id]), {"progression": "Finished"})
+        self.client.delete(reverse("admin_comment-detail", args=[comment.id]))
+        changes, token = self.sync(token)
+
+        self.assertEqual(self.keys(changes), {
+            ("project", "upsert", str(self.project.id)),
+            ("issue", "upsert", str(issue.id)),
+            ("comment", "delete", str(comment.id)),
+        })
+        self.assertEqual(self.sync(token)[0], [])
+
+    def test_project_soft_delete_reaches_contributors(self):
+        self.client.force_authenticate(user=self.bob)
+        _, token = self.sync()
+        self.client.force_authenticate(user=self.alicia)
+        self.client.delete(reverse("admin_project-detail", args=[self.project.id]))
+
+        self.client.force_authenticate(user=self.bob)
+        changes, _ = self.sync(token)
+        self.assertEqual(self.keys(changes), {("project", "delete", str(self.project.id))})
+
+    def test_removed_contributor_loses_the_project(self):
+        self.client.force_authenticate(user=self.bob)
+        _, bob_token = self.sync()
+        self.client.force_authenticate(user=self.alicia)
+        _, alicia_token = self.sync()
+
+        self.client.delete(reverse("project_delete_contributor"), {"project": self.project.id, "contributor": self.bob.id})
+
+        self.assertIn(("contributor", "delete", str(self.bob.id)), self.keys(self.sync(alicia_token)[0]))
+        self.client.force_authenticate(user=self.bob)
+        self.assertEqual(self.keys(self.sync(bob_token)[0]), {("project", "delete", str(self.project.id))})
+
+    def test_new_contributor_receives_the_whole_project(self):
+        self.client.force_authenticate(user=self.carla)
+        _, token = self.sync()
+        ProjectContributors.objects.create(contributor=self.carla, project=self.other)
+
+        changes, _ = self.sync(token)
+        issue = self.other.issues.get()
+        self.assertEqual(self.keys(changes), {
+            ("project", "upsert", str(self.other.id)),
+            ("contributor", "upsert", str(self.alicia.id)),
+            ("contributor", "upsert", str(self.carla.id)),
+            ("issue", "upsert", str(issue.id)),
+            ("comment", "upsert", str(issue.comments.get().id)),
+        })
+
+    def test_comment_moved_out_of_sight_is_deleted(self):
+        self.client.force_authenticate(user=self.bob)
+        _, token = self.sync()
+        comment = self.project.issues.first().comments.first()
+        self.client.force_authenticate(user=self.alicia)
+        response = self.client.patch(
+            reverse("admin_comment-detail", args=[comment.id]), {"issue": self.other.issues.get().id},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_authenticate(user=self.bob)
+        changes, _ = self.sync(token)
+        self.assertIn(("comment", "delete", str(comment.id)), self.keys(changes))
+        self.assertNotIn(("comment", "upsert", str(comment.id)), self.keys(changes))
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(self.client.get(self.url, {"since": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"cursor": "abc"}).status_code, 404)
+
+        _, token = self.sync()
+        since, database, issued_at = decode_token(token)
+        expired = encode_token(since, database, issued_at.replace(year=2000))
+        self.assertEqual(self.client.get(self.url, {"since": expired}).status_code, 410)
+        # jeton daté d'avant la séquence des changements
+        self.assertEqual(self.client.get(self.url, {"since": encode({"t": issued_at.isoformat()})}).status_code, 410)
+        # séquence remise à zéro (base restaurée)
+        ahead = encode_token(since + 100, database)
+        self.assertEqual(self.client.get(self.url, {"since": ahead}).status_code, 410)
+
+    @override_settings(SUPPORT_SYNC_TOMBSTONE_DAYS=0)
+    def test_purge_tombstones_removes_expired_traces(self):
+        self.client.delete(reverse("admin_project-detail", args=[self.other.id]))
+
+        call_command("purge_tombstones", stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_page_cost_does_not_depend_on_the_volume(self):
+        _, token = self.sync()
+        create_project(self.alicia, "Cesium", issues=5, comments=5)
+
+        # index des accès, position courante, projets devenus visibles, puis
+        # une requête par source
+        with self.assertNumQueries(8):
+            self.client.get(self.url, {"since": token})
+
+
+class AsyncReadViewTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.carla = create_user("Carla", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=3, comments=2)
+        cls.issue = cls.project.issues.first()
+
+    def setUp(self):
+        caches["project_detail"].clear()
+
+    def headers(self, user):
+        access = TenantTokenObtainPairSerializer.get_token(user).access_token
+        return {"authorization": f"Bearer {access}"}
+
+    def urls(self):
+        return [
+            reverse("project-list"),
+            reverse("project-detail", args=[self.project.id]),
+            reverse("project_issues", args=[self.project.id]),
+            reverse("issue_comments", args=[self.issue.id]),
+        ]
+
+    def test_read_views_are_async(self):
+        for view in (ProjectListView, ProjectDetailView, ProjectIssuesView, IssueCommentsView):
+            self.assertTrue(view.view_is_async, view.__name__)
+
+    async def test_asgi_responses_match_wsgi(self):
+        for url in self.urls():
+            response = await self.async_client.get(url, headers=self.headers(self.alicia))
+            self.assertEqual(response.status_code, 200, url)
+            caches["project_detail"].clear()
+            self.client.force_authenticate(user=self.alicia)
+            expected = await sync_to_async(self.client.get)(url)
+            self.assertEqual(response.json(), expected.json(), url)
+
+    async def test_asgi_permissions_and_errors(self):
+        headers = self.headers(self.carla)
+        url = reverse("project_issues", args=[self.project.id])
+        self.assertEqual((await self.async_client.get(url, headers=headers)).status_code, 403)
+        url = reverse("issue_comments", args=[self.issue.id])
+        self.assertEqual((await self.async_client.get(url, headers=headers)).status_code, 403)
+        url = reverse("project-detail", args=[self.project.id])
+        self.assertEqual((await self.async_client.get(url, headers=headers)).status_code, 404)
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+
+    async def test_asgi_pages_follow_the_cursor(self):
+        url = reverse("project_issues", args=[self.project.id])
+        headers = self.headers(self.alicia)
+        response = await self.async_client.get(url, {"page_size": 2}, headers=headers)
+        ids = [issue["id"] for issue in response.json()["results"]]
+        response = await self.async_client.get(response.json()["next"], headers=headers)
+        ids += [issue["id"] for issue in response.json()["results"]]
+
+        self.assertIsNone(response.json()["next"])
+        self.assertEqual(sorted(ids), sorted([issue.id async for issue in self.project.issues.all()]))
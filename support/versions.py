@@ -0,0 +1,75 @@
+"""
+Versions des lectures de projets et problèmes.
+
+updated_at d'un projet change à chaque écriture sur le projet, ses
+contributeurs, ses problèmes ou leurs commentaires ; celui d'un problème à
+chaque écriture sur le problème ou ses commentaires. Les vues d'écriture
+appellent touch() (save() ne suffit pas : il ne met à jour que sa propre ligne).
+
+Les vues de lecture comparent ensuite If-None-Match / If-Modified-Since à
+cette version et répondent 304 avant toute sérialisation. Le compteur version
+des projets sert en plus de clé au cache des détails (support.caching).
+"""
+
+import hashlib
+
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from support.models import Project, Issue
+
+
+def touch(project_ids=(), issue_ids=()):
+    """
+    Change la version des projets et problèmes donnés. Une écriture sur un
+    commentaire doit passer le problème et son projet.
+    """
+    now = timezone.now()
+    project_ids = set(project_ids)
+    issue_ids = set(issue_ids)
+    if issue_ids:
+        Issue.objects.filter(id__in=issue_ids).update(updated_at=now)
+    if project_ids:
+        Project.all_objects.filter(id__in=project_ids).update(updated_at=now, version=F('version') + 1)
+
+
+def touch_user(user_id):
+    """
+    Change la version des lectures qui affichent le nom de l'utilisateur :
+    ses projets (auteur ou contributeur) et les problèmes qu'il a créés, qui
+    lui sont attribués ou qu'il a commentés.
+    """
+    touch(
+        project_ids=Project.all_objects.filter(Q(author_id=user_id) | Q(contributors=user_id)).values_list('id', flat=True),
+        issue_ids=Issue.objects.filter(
+            Q(author_id=user_id) | Q(attribution_id=user_id) | Q(comments__author_id=user_id),
+        ).values_list('id', flat=True),
+    )
+
+
+def get_etag(request, updated_at):
+    # la réponse dépend aussi de la page demandée et du format négocié
+    key = f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}|{updated_at.isoformat()}"
+    return f'W/"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def not_modified(request, updated_at):
+    """Réponse 304 si le client a déjà cette version, None sinon."""
+    response = get_conditional_response(
+        request,
+        etag=get_etag(request, updated_at),
+        last_modified=int(updated_at.timestamp()),
+    )
+    if response is not None:
+        set_validators(request, response, updated_at)
+    return response
+
+
+def set_validators(request, response, updated_at):
+    response['ETag'] = get_etag(request, updated_at)
+    response['Last-Modified'] = http_date(updated_at.timestamp())
+    # réponse propre à l'utilisateur, toujours revalidée
+    response['Cache-Control'] = 'private, no-cache'
+    return response
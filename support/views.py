@@ -1,22 +1,31 @@
 from rest_framework.viewsets import (
-    ReadOnlyModelViewSet,
+    GenericViewSet,
     ModelViewSet,
 )
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.exceptions import (
+    NotFound,
     ValidationError,
 )
 
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count
+from django.http import Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.shortcuts import aget_object_or_404
+from django.db import transaction
+from django.db.models import Q, Prefetch
 
+from config.replicas import ReplicaReadsMixin
 from support.models import (
     Project,
     Comment,
     Issue,
+    ProjectContributors,
+    Tombstone,
 )
 from support.serializers import (
     ProjectDetailSerializer,
@@ -26,6 +35,32 @@ from support.serializers import (
     IssueSerializerResume,
     CommentSerializer,
 )
+from support.bulk import BulkCreateMixin, bulk_create_comments, bulk_create_issues
+from support.export import export_records, ndjson_lines, csv_lines, buffered, gzipped, aiterate
+from support.counters import update_issues_count, update_comments_count
+from support.versions import touch, not_modified, set_validators
+from support.caching import project_detail_cache
+from support.filters import IssueFilter
+from support.access import get_project_access
+from support.async_views import AsyncAPIView
+from support.search import TYPES, parse_terms, search
+from support.sync import (
+    ChangeFeed,
+    ExpiredToken,
+    InvalidToken,
+    current_sequence,
+    decode_token,
+    encode_token,
+    oldest_token_date,
+    record_deletions,
+    sequence_database,
+)
+from support.pagination import (
+    KeysetPagination,
+    ChronologicalKeysetPagination,
+    RankedPagination,
+    SyncPagination,
+)
 from support.permissions import (
     IsAuthenticated,
     IsObjectAuthor,
@@ -36,46 +71,129 @@ from support.permissions import (
 UserModel = get_user_model()
 
 
-class MultipleSerializerMixin:
+def visible_projects(request):
+    """Projets actifs du client dont l'utilisateur est auteur ou contributeur, ?type= en option."""
+    user = request.user
+    # on passe par une sous-requête sur la table de liaison plutôt que par
+    # une jointure sur contributors : pas de doublons donc pas de DISTINCT
+    contributed_projects = ProjectContributors.objects.filter(
+        contributor_id=user.id,
+    ).values('project_id')
+    queryset = Project.objects.filter(
+        author__client_id=user.client_id,
+    ).filter(
+        Q(author_id=user.id) | Q(id__in=contributed_projects)
+    ).order_by('-time_created')
 
-    detail_serializer_class = None
+    type = request.query_params.get('type')
 
-    def get_serializer_class(self):
-        if self.action == 'retrieve' and self.detail_serializer_class is not None:
-            return self.detail_serializer_class
-        return super().get_serializer_class()
-    
+    if type is not None:
+        queryset = queryset.filter(type=type)
 
-class ProjectViewset(MultipleSerializerMixin, ReadOnlyModelViewSet):
+    return queryset
+
+
+def project_tree(queryset):
+    # exactement les données utilisées par ProjectDetailSerializer
+    comments = Comment.objects.select_related('author')
+    issues = Issue.objects.select_related(
+        'author',
+        'attribution',
+    ).prefetch_related(
+        Prefetch('comments', queryset=comments),
+    )
+    return queryset.select_related('author').prefetch_related(
+        'contributors',
+        Prefetch('issues', queryset=issues),
+    )
+
+
+class ProjectListView(ReplicaReadsMixin, AsyncAPIView):
 
-    serializer_class = ProjectListSerializer
-    detail_serializer_class = ProjectDetailSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
-    def get_queryset(self):
+    async def get(self, request):
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(visible_projects(request), request, view=self)
+        # ProjectListSerializer lit le compteur issues_count directement sur la ligne
+        serializer = ProjectListSerializer(page, many=True, context={'request': request, 'view': self})
+        return paginator.get_paginated_response(serializer.data)
 
-        user = self.request.user
-        queryset = Project.objects.filter(
-            author__client=user.client,
-        ).filter(
-            Q(author=user) | Q(contributors=user)
-        ).distinct().prefetch_related(
-            'contributors',
-            'issues__comments',
-            'issues__comments__author'
-        ).annotate(
-            total_issues=Count('issues')
-        ).order_by('-time_created')
-
-        type = self.request.query_params.get('type')
-
-        if type is not None:
-            queryset = queryset.filter(type=type)
 
-        return queryset
+class ProjectDetailView(ReplicaReadsMixin, AsyncAPIView):
+
+    permission_classes = [IsAuthenticated]
 
+    async def get(self, request, pk):
+        queryset = visible_projects(request)
+        # seule la version est lue avant de décider de charger l'arbre complet du projet
+        try:
+            row = await queryset.filter(pk=pk).values_list('version', 'updated_at').afirst()
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            raise Http404
+        version, updated_at = row
+        response = not_modified(request, updated_at)
+        if response is not None:
+            return response
+
+        async def build():
+            try:
+                project = await project_tree(queryset).aget(pk=pk)
+            except Project.DoesNotExist:
+                raise Http404
+            await self.acheck_object_permissions(request, project)
+            return ProjectDetailSerializer(project, context={'request': request, 'view': self}).data
+
+        data, data_updated_at, event = await project_detail_cache.aget_or_build(pk, version, updated_at, build)
+        response = set_validators(request, Response(data), data_updated_at)
+        response['X-Cache'] = event.upper()
+        return response
+
+
+class ProjectViewset(ReplicaReadsMixin, GenericViewSet):
+    # lectures : ProjectListView et ProjectDetailView, asynchrones
 
-class AdminProjectViewset(ModelViewSet):
+    serializer_class = ProjectListSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # l'auteur est lu pour la première ligne, le reste est lu en flux
+        return visible_projects(self.request).select_related('author')
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Export en flux du projet, de ses contributeurs, problèmes et commentaires.
+        ?output=ndjson (défaut) ou csv, ?compress=gzip pour un fichier compressé.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            raise ValidationError({"output": "Valeurs possibles : ndjson, csv."})
+        compress = request.query_params.get('compress')
+        if compress not in (None, 'gzip'):
+            raise ValidationError({"compress": "Valeur possible : gzip."})
+
+        project = self.get_object()
+        lines = ndjson_lines if output == 'ndjson' else csv_lines
+        chunks = buffered(lines(export_records(project)))
+        filename = f"project-{project.id}.{output}"
+        content_type = 'application/x-ndjson' if output == 'ndjson' else 'text/csv'
+        if compress:
+            chunks = gzipped(chunks)
+            filename += '.gz'
+            content_type = 'application/gzip'
+
+        if isinstance(request._request, ASGIRequest):
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class AdminProjectViewset(ReplicaReadsMixin, ModelViewSet):
     
     serializer_class = ProjectListSerializer
     permission_classes = [IsAuthenticated, IsObjectAuthor]
@@ -83,25 +201,34 @@ class AdminProjectViewset(ModelViewSet):
     def get_queryset(self):
 
         user = self.request.user
-        queryset = Project.objects.filter(author=user)
+        queryset = Project.objects.filter(author_id=user.id)
         return queryset
     
     def perform_create(self, serializer):
 
         project = serializer.save(author=self.request.user)
         project.contributors.add(self.request.user)
+
+    def perform_update(self, serializer):
+
+        project = serializer.save()
+        touch(project_ids=[project.id])
     
     def perform_destroy(self, instance):
 
-        instance.is_active = False
-        instance.save()
+        with transaction.atomic():
+            instance.is_active = False
+            instance.save()
+            record_deletions(Tombstone.Kind.PROJECT, [(instance.id, instance.id)])
 
 
-class AdminIssueViewset(ModelViewSet):
+class AdminIssueViewset(ReplicaReadsMixin, BulkCreateMixin, ModelViewSet):
 
     serializer_class = IssueAdminSerializer
+    pagination_class = KeysetPagination
     permission_classes = [IsAuthenticated, IsObjectAuthor]
     http_method_names = ['get', 'post', 'patch', 'delete']
+    bulk_create_function = staticmethod(bulk_create_issues)
 
     def initial(self, request, *args, **kwargs):
         """Vérifie la présence de project selon l'action demandée."""
@@ -112,7 +239,8 @@ class AdminIssueViewset(ModelViewSet):
                 raise ValidationError({"detail": "Le paramètre d'URL 'project' est requis pour lister les issues."})
         
         elif self.action == "create":
-            if 'project' not in request.data:
+            # une liste est une création en lot, project est vérifié élément par élément
+            if not self.is_bulk_request(request) and 'project' not in request.data:
                 raise ValidationError({"project": "Ce champ est obligatoire dans le corps de la requête."})
 
     def get_queryset(self):
@@ -120,25 +248,47 @@ class AdminIssueViewset(ModelViewSet):
         user = self.request.user
         # filtre de base, s'applique aux actions list, retrieve, create, update, partial_update er destroy
         queryset = Issue.objects.filter(
-            author=user,
+            author_id=user.id,
             project__is_active=True,
         )
 
         if self.action == "list":
             project_id = self.request.query_params.get('project')
-            queryset = queryset.filter(project_id=project_id)
+            issue_filter = IssueFilter(self.request)
+            queryset = issue_filter.filter_queryset(queryset.filter(project_id=project_id))
+            self.keyset_ordering = issue_filter.ordering
         
         return queryset
     
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            issue = serializer.save(author=self.request.user)
+            update_issues_count(issue.project_id, 1)
+            touch(project_ids=[issue.project_id])
+
+    def perform_update(self, serializer):
+        previous_project_id = serializer.instance.project_id
+        with transaction.atomic():
+            issue = serializer.save()
+            touch(project_ids=[previous_project_id, issue.project_id])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_deletions(Tombstone.Kind.ISSUE, [(instance.id, instance.project_id)])
+            instance.delete()
+            update_issues_count(instance.project_id, -1)
+            touch(project_ids=[instance.project_id])
 
 
-class AdminCommentViewset(ModelViewSet):
+class AdminCommentViewset(ReplicaReadsMixin, BulkCreateMixin, ModelViewSet):
 
     serializer_class = CommentAdminSerializer
+    pagination_class = KeysetPagination
     permission_classes = [IsAuthenticated, IsObjectAuthor]
     http_method_names = ['get', 'post', 'patch', 'delete']
+    bulk_create_function = staticmethod(bulk_create_comments)
+    # synchronisation de fils de discussion : les lots sont plus gros
+    max_bulk_size = 5000
 
     def initial(self, request, *args, **kwargs):
         """Vérifie la présence de issue selon l'action demandée."""
@@ -149,7 +299,8 @@ class AdminCommentViewset(ModelViewSet):
                 raise ValidationError({"detail": "Le paramètre d'URL 'issue' est requis pour lister les commentaires."})
         
         elif self.action == "create":
-            if 'issue' not in request.data:
+            # une liste est une création en lot, issue est vérifié élément par élément
+            if not self.is_bulk_request(request) and 'issue' not in request.data:
                 raise ValidationError({"issue": "Ce champ est obligatoire dans le corps de la requête."})
             
     def get_queryset(self):
@@ -157,7 +308,7 @@ class AdminCommentViewset(ModelViewSet):
         user = self.request.user
         # filtre de base, s'applique aux actions list, retrieve, create, update, partial_update er destroy
         queryset = Comment.objects.filter(
-            author=user,
+            author_id=user.id,
             issue__project__is_active=True,
         )
 
@@ -168,30 +319,178 @@ class AdminCommentViewset(ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user)
+            update_comments_count(comment.issue_id, 1)
+            touch(project_ids=[comment.issue.project_id], issue_ids=[comment.issue_id])
+
+    def perform_update(self, serializer):
+        previous_issue = serializer.instance.issue
+        with transaction.atomic():
+            # avant save() : la suppression précède l'ajout dans la séquence de synchronisation
+            issue = serializer.validated_data.get('issue', previous_issue)
+            if issue.project_id != previous_issue.project_id:
+                record_deletions(Tombstone.Kind.COMMENT, [(serializer.instance.id, previous_issue.project_id)])
+            comment = serializer.save()
+            if comment.issue_id != previous_issue.id:
+                update_comments_count(previous_issue.id, -1)
+                update_comments_count(comment.issue_id, 1)
+            touch(
+                project_ids=[previous_issue.project_id, comment.issue.project_id],
+                issue_ids=[previous_issue.id, comment.issue_id],
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_deletions(Tombstone.Kind.COMMENT, [(instance.id, instance.issue.project_id)])
+            instance.delete()
+            update_comments_count(instance.issue_id, -1)
+            touch(project_ids=[instance.issue.project_id], issue_ids=[instance.issue_id])
 
 
-class ProjectIssuesView(APIView):
+class ProjectIssuesView(ReplicaReadsMixin, AsyncAPIView):
     
     permission_classes = [IsAuthenticated, IsProjectContributor]
-
-    def get(self, request, project_id):
-        project = get_object_or_404(Project, id=project_id)
-        self.check_object_permissions(request, project)
-        issues = Issue.objects.filter(project_id=project_id)
-        serializer = IssueSerializerResume(issues, many=True)
-        return Response(serializer.data)
+    pagination_class = KeysetPagination
+
+    async def get(self, request, project_id):
+        project = await aget_object_or_404(Project, id=project_id)
+        await self.acheck_object_permissions(request, project)
+        # paramètres invalides : 400 même si le client a une version en cache
+        issue_filter = IssueFilter(request)
+        # updated_at du projet change avec ses problèmes et leurs commentaires
+        response = not_modified(request, project.updated_at)
+        if response is not None:
+            return response
+        # comments_count est lu sur la ligne, author et attribution sont joints :
+        # une seule requête par page quel que soit le nombre de problèmes
+        issues = issue_filter.filter_queryset(Issue.objects.filter(project_id=project_id)).select_related(
+            'author',
+            'attribution',
+        )
+        self.keyset_ordering = issue_filter.ordering
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(issues, request, view=self)
+        serializer = IssueSerializerResume(page, many=True)
+        return set_validators(request, paginator.get_paginated_response(serializer.data), project.updated_at)
 
 
-class IssueCommentsView(APIView):
+class IssueCommentsView(ReplicaReadsMixin, AsyncAPIView):
 
     permission_classes = [IsAuthenticated, IsProjectContributor]
+    pagination_class = ChronologicalKeysetPagination
 
-    def get(self, request, issue_id):
-        issue = get_object_or_404(Issue, id=issue_id)
+    async def get(self, request, issue_id):
+        issue = await aget_object_or_404(Issue.objects.select_related('project'), id=issue_id)
         project = issue.project
-        self.check_object_permissions(request, project)
-        comments = Comment.objects.filter(issue_id=issue_id)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        await self.acheck_object_permissions(request, project)
+        response = not_modified(request, issue.updated_at)
+        if response is not None:
+            return response
+        comments = Comment.objects.filter(issue_id=issue_id).select_related('author')
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(comments, request, view=self)
+        serializer = CommentSerializer(page, many=True)
+        return set_validators(request, paginator.get_paginated_response(serializer.data), issue.updated_at)
+
+
+class SearchView(ReplicaReadsMixin, APIView):
+    """
+    Recherche dans les problèmes et commentaires des projets de l'utilisateur.
+    ?q= (obligatoire), ?project=<id> pour un seul projet, ?type=issue|comment.
+    """
 
+    permission_classes = [IsAuthenticated]
+    pagination_class = RankedPagination
+
+    def get(self, request):
+        terms = parse_terms(request.query_params.get('q'))
+        if not terms:
+            raise ValidationError({"q": "Ce paramètre est obligatoire."})
+
+        type = request.query_params.get('type')
+        if type is not None and type not in TYPES:
+            raise ValidationError({"type": "Valeurs possibles : issue, comment."})
+        types = TYPES if type is None else (type,)
+
+        access = get_project_access(request)
+        project_ids = access.contributed_ids | access.authored_ids
+        project = request.query_params.get('project')
+        if project is not None:
+            if not access.is_known(project):
+                raise NotFound("Projet introuvable.")
+            project_ids = {int(project)}
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_results(
+            lambda limit, offset: search(terms, project_ids, types, limit, offset),
+            request,
+        )
+        return paginator.get_paginated_response(page)
+
+
+class SyncView(APIView):
+    """
+    Changements des projets de l'utilisateur depuis ?since=<jeton>, sans
+    jeton tout le périmètre. Les pages suivent ?cursor= (lien next) ; la
+    dernière page donne le jeton de la prochaine synchronisation.
+
+    Toujours lue sur default : un réplica en retard sur la fin de fenêtre
+    ferait perdre définitivement des changements au client.
+    """
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = SyncPagination
+
+    def get(self, request):
+        paginator = self.pagination_class()
+        cursor = request.query_params.get(paginator.cursor_query_param)
+        current_database = sequence_database()
+        if cursor:
+            try:
+                since, until, database, positions, scan_comments = ChangeFeed.decode_cursor(cursor)
+            except InvalidToken:
+                raise NotFound("Curseur invalide.")
+            if database != current_database:
+                return self.expired()
+        else:
+            since, positions, scan_comments = None, {}, None
+            token = request.query_params.get('since')
+            if token:
+                try:
+                    since, database, issued_at = decode_token(token)
+                except ExpiredToken:
+                    return self.expired()
+                except InvalidToken:
+                    raise ValidationError({"since": "Jeton invalide."})
+                # base quittée par le client (move_client) ou traces de
+                # suppression déjà purgées
+                if database != current_database or issued_at < oldest_token_date():
+                    return self.expired()
+            until = current_sequence()
+            if since is not None and since >= until:
+                if since > until:
+                    # séquence d'une autre copie de la base
+                    return self.expired()
+                # rien n'a été écrit depuis ce jeton, réémis à la date du jour
+                return Response({'next': None, 'token': encode_token(until, current_database), 'changes': []})
+
+        feed = ChangeFeed(request.user, get_project_access(request), since, until, scan_comments)
+        changes, positions, has_more = feed.page(positions, paginator.get_page_size(request))
+        next_link = None
+        if has_more:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), paginator.cursor_query_param,
+                feed.encode_cursor(positions, current_database),
+            )
+        return Response({
+            'next': next_link,
+            'token': None if has_more else encode_token(until, current_database),
+            'changes': changes,
+        })
+
+    def expired(self):
+        return Response(
+            {"detail": "Jeton expiré, une synchronisation complète est nécessaire."},
+            status=status.HTTP_410_GONE,
+        )
@@ -0,0 +1,71 @@
+import json
+
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from authentication.serializers import TenantTokenObtainPairSerializer
+from support.tests import create_client, create_user, create_project
+
+
+@override_settings(REQUEST_INSTRUMENTATION=True)
+class RequestInstrumentationMiddlewareTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=3, comments=2)
+
+    def setUp(self):
+        # chaque test mesure une construction complète du détail du projet
+        caches["project_detail"].clear()
+        access = TenantTokenObtainPairSerializer.get_token(self.alicia).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_headers_report_queries_and_phases(self):
+        with self.assertLogs("softdesk.requests", level="INFO") as logs:
+            response = self.client.get(reverse("project-detail", args=[self.project.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Query-Count"], "5")
+        metrics = {metric.split(";")[0] for metric in response["Server-Timing"].split(", ")}
+        self.assertEqual(metrics, {"db", "auth", "view", "serialize", "render", "total"})
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["path"], reverse("project-detail", args=[self.project.id]))
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["queries"], 5)
+        self.assertEqual(record["user_id"], self.alicia.id)
+
+    def test_nested_serializers_are_counted_once(self):
+        with self.assertLogs("softdesk.requests", level="INFO"):
+            response = self.client.get(reverse("project-detail", args=[self.project.id]))
+
+        durations = {
+            metric.split(";")[0]: float(metric.split("dur=")[1].split(";")[0])
+            for metric in response["Server-Timing"].split(", ")
+        }
+        self.assertLessEqual(durations["serialize"], durations["view"])
+
+    async def test_asgi_requests_are_measured(self):
+        # AsyncClient passe par le gestionnaire ASGI : middleware et vue asynchrones
+        with self.assertLogs("softdesk.requests", level="INFO") as logs:
+            response = await self.async_client.get(
+                reverse("project-detail", args=[self.project.id]),
+                headers={"authorization": self.client._credentials["HTTP_AUTHORIZATION"]},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Query-Count"], "5")
+        self.assertEqual(json.loads(logs.records[0].getMessage())["queries"], 5)
+
+
+class RequestInstrumentationDisabledTest(APITestCase):
+
+    def test_no_headers_when_disabled(self):
+        response = self.client.get(reverse("user_inscription"))
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertNotIn("X-Query-Count", response)
@@ -0,0 +1,149 @@
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from authentication.serializers import TenantTokenObtainPairSerializer
+from config import replicas
+from config.replicas import ReadRouting, ReplicaRouter, measure_lag, sync_replica, write_heartbeat
+from support.models import Project
+from support.tests import create_client, create_user, create_project
+
+
+@override_settings(DATABASE_READ_REPLICAS=["replica"])
+class ReplicaRoutingTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_company = create_client()
+        cls.alicia = create_user("Alicia", cls.client_company)
+        cls.bob = create_user("Bob", cls.client_company)
+        cls.project = create_project(cls.alicia, "GeoNode", issues=2, contributors=[cls.bob])
+
+    def setUp(self):
+        # replica n'est pas déclarée dans DATABASES hors DATABASE_READ_REPLICAS,
+        # et une copie ne verrait pas les données non validées du TestCase : en
+        # test le réplica est la connexion de default
+        connections["replica"] = connection
+        self.addCleanup(connections.__delitem__, "replica")
+        write_heartbeat(connection)
+        replicas._lags.clear()
+
+        # bases choisies pour les lectures des vues, None : default
+        self.reads = []
+        database = ReadRouting.database
+
+        def record(routing):
+            alias = database(routing)
+            self.reads.append(alias)
+            return alias
+
+        patcher = mock.patch.object(ReadRouting, "database", record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def authenticate(self, user):
+        access = TenantTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def get(self, url):
+        self.reads.clear()
+        response = self.client.get(url)
+        return response, set(self.reads)
+
+    def test_safe_reads_use_replica(self):
+        self.authenticate(self.alicia)
+
+        for url in (reverse("project-list"), reverse("admin_project-detail", args=[self.project.id])):
+            response, reads = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(reads, {"replica"})
+
+    def test_writer_reads_primary_for_a_while(self):
+        self.authenticate(self.alicia)
+        response = self.client.patch(reverse("admin_project-detail", args=[self.project.id]), {"name": "GeoNode 2"})
+        self.assertEqual(response.status_code, 200)
+        # retenue côté client : tout processus qui reçoit la requête suivante la voit
+        self.assertEqual(response.cookies["replica_pin"]["max-age"], 5)
+
+        response, reads = self.get(reverse("project-detail", args=[self.project.id]))
+        self.assertEqual(response.data["name"], "GeoNode 2")
+        self.assertEqual(reads, {None})
+
+        # les autres utilisateurs continuent de lire le réplica
+        self.authenticate(self.bob)
+        response, reads = self.get(reverse("project-detail", args=[self.project.id]))
+        self.assertEqual(reads, {"replica"})
+
+        with override_settings(DATABASE_REPLICA_STICKY_SECONDS=0):
+            self.authenticate(self.alicia)
+            self.client.patch(reverse("admin_project-detail", args=[self.project.id]), {"name": "GeoNode 3"})
+        response, reads = self.get(reverse("project-detail", args=[self.project.id]))
+        self.assertEqual(reads, {"replica"})
+
+    def test_lagging_replica_is_skipped(self):
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE replica_heartbeat SET written_at = %s", [time.time() - 60])
+        self.authenticate(self.alicia)
+
+        with override_settings(DATABASE_REPLICA_MAX_LAG=30):
+            response, reads = self.get(reverse("project-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(reads, {None})
+
+    def test_sync_reads_primary(self):
+        self.authenticate(self.alicia)
+
+        response, reads = self.get(reverse("sync"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("replica", reads)
+
+    def test_objects_read_on_replica_are_saved_on_primary(self):
+        project = Project.objects.using("replica").get(pk=self.project.pk)
+
+        self.assertEqual(ReplicaRouter().db_for_write(Project, instance=project), "default")
+
+
+class SyncReplicaTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.primary = self.wrapper("primary", directory / "primary.sqlite3")
+        self.replica = self.wrapper("replica_copy", directory / "replica.sqlite3")
+
+    def wrapper(self, alias, path):
+        settings_dict = {**connection.settings_dict, "ENGINE": "config.sqlite", "NAME": str(path), "OPTIONS": {}}
+        wrapper = load_backend("config.sqlite").DatabaseWrapper(settings_dict, alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def names(self):
+        with self.replica.cursor() as cursor:
+            cursor.execute("SELECT name FROM item ORDER BY id")
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_backup_copies_primary_and_measures_lag(self):
+        with self.primary.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)")
+            cursor.execute("INSERT INTO item (name) VALUES ('first')")
+        self.assertIsNone(measure_lag(self.replica))
+
+        sync_replica(self.primary, self.replica)
+        self.assertEqual(self.names(), ["first"])
+        self.assertLess(measure_lag(self.replica), 1)
+
+        # le réplica garde sa copie jusqu'à la suivante
+        with self.primary.cursor() as cursor:
+            cursor.execute("INSERT INTO item (name) VALUES ('second')")
+        self.assertEqual(self.names(), ["first"])
+        sync_replica(self.primary, self.replica)
+        self.assertEqual(self.names(), ["first", "second"])
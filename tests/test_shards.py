@@ -0,0 +1,270 @@
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from authentication.models import User
+from authentication.serializers import TenantTokenObtainPairSerializer
+from client.models import Client
+from config.shard_moves import ClientMove
+from config.shards import seed_ids, shard_map, using_shard
+from support.benchmark import capture_queries
+from support.models import Project, Issue, Comment
+from support.search import search
+from support.sync import decode_token
+from support.tests import create_client, create_user, create_project
+
+SHARDS = {"default": 0, "shard1": 1_000_000}
+
+
+class Shard1Database:
+    """
+    Déclare shard1, absente de DATABASES tant que DATABASE_SHARDS ne la nomme
+    pas, et crée sa base de test pour la durée de la classe. shard1_file
+    la place dans un fichier : en mémoire, une écriture en cours bloque les
+    lectures des autres connexions.
+    """
+
+    shard1_file = False
+
+    @classmethod
+    def setUpClass(cls):
+        # hors de l'attribut de classe : le lanceur de tests ne doit pas
+        # chercher shard1 avant qu'elle existe
+        cls.databases = {"default", "shard1"}
+        shard1 = {"ENGINE": "config.sqlite", "NAME": "shard1"}
+        if cls.shard1_file:
+            directory = tempfile.mkdtemp()
+            cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+            shard1["TEST"] = {"NAME": os.path.join(directory, "shard1.sqlite3")}
+        databases = connections.configure_settings({**connections.settings, "shard1": shard1})
+        connections.settings["shard1"] = databases["shard1"]
+        cls.addClassCleanup(cls.remove_shard1)
+        connections["shard1"].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        super().setUpClass()
+
+    @classmethod
+    def remove_shard1(cls):
+        connections["shard1"].creation.destroy_test_db("shard1", verbosity=0)
+        del connections["shard1"]
+        del connections.settings["shard1"]
+
+
+@override_settings(DATABASE_SHARDS=SHARDS, DATABASE_SHARD_MAP_TTL=0)
+class ShardRoutingTest(Shard1Database, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_ids("shard1")
+        cls.client_company = Client.objects.create(name="Meridien", domain="meridien.fr", shard="shard1")
+        cls.other_company = create_client("Boreal", "boreal.fr")
+        with using_shard("shard1"):
+            cls.alicia = create_user("Alicia", cls.client_company)
+            cls.project = create_project(cls.alicia, "GeoNode", issues=1, comments=1)
+        cls.bob = create_user("Bob", cls.other_company)
+
+    def authenticate(self, user):
+        access = TenantTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_client_data_lives_in_its_shard(self):
+        self.assertGreaterEqual(self.alicia.id, SHARDS["shard1"])
+        self.assertGreaterEqual(self.project.id, SHARDS["shard1"])
+        self.assertFalse(User.objects.using("default").filter(id=self.alicia.id).exists())
+        self.assertLess(self.bob.id, SHARDS["shard1"])
+
+    def test_requests_use_the_shard_of_the_token_client(self):
+        self.authenticate(self.alicia)
+
+        response = self.client.get(reverse("project-list"))
+        self.assertEqual([project["id"] for project in response.data["results"]], [self.project.id])
+
+        response = self.client.post(reverse("admin_issue-list"), {
+            "name": "Format GeoJson",
+            "priority": Issue.Priority.HIGH,
+            "balise": Issue.Balise.FEATURE,
+            "progression": Issue.Progression.TODO,
+            "project": self.project.id,
+            "attribution": self.alicia.id,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Issue.objects.using("shard1").filter(id=response.data["id"]).exists())
+
+        response = self.client.get(reverse("search"), {"q": "GeoNode comment"})
+        self.assertEqual([result["type"] for result in response.data["results"]], ["comment"])
+
+        # les autres clients restent sur default
+        self.authenticate(self.bob)
+        response = self.client.get(reverse("project-list"))
+        self.assertEqual(response.data["results"], [])
+
+    def test_token_version_is_read_in_client_shard(self):
+        self.authenticate(self.alicia)
+        cache.clear()
+
+        response = self.client.get(reverse("project-list"))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_benchmark_counts_queries_of_every_database(self):
+        with capture_queries() as captured:
+            Project.objects.using("shard1").count()
+            Project.objects.using("default").count()
+
+        self.assertEqual(len(captured), 2)
+
+    def test_login_and_refresh_in_shard(self):
+        response = self.client.post(reverse("token_obtain_pair"), {"username": "Alicia", "password": "pwd_2026"})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(reverse("token_refresh"), {"refresh": response.data["refresh"]})
+        self.assertEqual(response.status_code, 200)
+
+    def test_signup_creates_user_in_client_shard(self):
+        data = {"password": "pwd_2026", "date_birth": "1980-01-01"}
+
+        response = self.client.post(reverse("user_inscription"), {**data, "username": "Carla", "email": "carla@meridien.fr"})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.using("shard1").filter(username="Carla").exists())
+
+        # nom déjà pris dans une autre base
+        response = self.client.post(reverse("user_inscription"), {**data, "username": "Alicia", "email": "alicia@boreal.fr"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("username", response.data)
+
+    def test_writes_refused_while_moving(self):
+        self.client_company.moving = True
+        self.client_company.save()
+        self.authenticate(self.alicia)
+
+        self.assertEqual(self.client.get(reverse("project-list")).status_code, 200)
+        response = self.client.patch(reverse("admin_project-detail", args=[self.project.id]), {"name": "GeoNode 2"})
+        self.assertEqual(response.status_code, 503)
+
+
+@override_settings(DATABASE_SHARDS=SHARDS, DATABASE_SHARD_MAP_TTL=0)
+class MoveClientTest(Shard1Database, TransactionTestCase):
+
+    client_class = APIClient
+
+    def setUp(self):
+        seed_ids("shard1")
+        shard_map.invalidate()
+        self.company = create_client()
+        self.other = create_client("Boreal", "boreal.fr")
+        self.alicia = create_user("Alicia", self.company)
+        self.project = create_project(self.alicia, "GeoNode", issues=2, comments=2)
+        create_project(create_user("Bob", self.other), "Kepler", issues=1)
+
+    def test_move_copies_then_removes_client_rows(self):
+        call_command("move_client", self.company.id, "shard1", wait=0, batch_size=3, stdout=StringIO())
+
+        self.company.refresh_from_db()
+        self.assertEqual((self.company.shard, self.company.moving), ("shard1", False))
+        self.assertEqual(Comment.objects.using("shard1").count(), 4)
+        self.assertEqual(Project.objects.using("shard1").get().updated_at, self.project.updated_at)
+        self.assertFalse(User.objects.using("default").filter(client=self.company).exists())
+        self.assertEqual(Project.objects.using("default").get().name, "Kepler")
+
+        # l'index de recherche de la base cible a suivi les copies
+        with using_shard("shard1"):
+            self.assertEqual(len(search(["GeoNode", "comment"], [self.project.id])), 4)
+
+        # retour vers une base de plage plus basse refusé
+        with self.assertRaisesMessage(CommandError, "au-delà de la plage"):
+            call_command("move_client", self.company.id, "default", wait=0, stdout=StringIO())
+
+    def test_catch_up_applies_writes_made_during_the_copy(self):
+        issue = self.project.issues.first()
+        comment = Comment.objects.exclude(issue=issue).filter(issue__project=self.project).first()
+        pause = ClientMove.pause
+
+        def write_in_flight(move, reason):
+            # écritures d'une requête commencée avant Client.moving
+            if not move.client.moving or move.client.shard != "default":
+                return pause(move, reason)
+            Comment.objects.filter(pk=comment.pk).update(description="GeoNode edited", updated_at=timezone.now())
+            issue.delete()
+
+        with mock.patch.object(ClientMove, "pause", write_in_flight):
+            call_command("move_client", self.company.id, "shard1", wait=0, stdout=StringIO())
+
+        self.assertFalse(Issue.objects.using("shard1").filter(pk=issue.pk).exists())
+        self.assertEqual(Comment.objects.using("shard1").count(), 2)
+        self.assertEqual(Comment.objects.using("shard1").get(pk=comment.pk).description, "GeoNode edited")
+
+    def test_move_expires_sync_tokens(self):
+        access = TenantTokenObtainPairSerializer.get_token(self.alicia).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        token = self.client.get(reverse("sync")).data["token"]
+
+        call_command("move_client", self.company.id, "shard1", wait=0, stdout=StringIO())
+
+        # positions de la séquence de default, sans rapport avec celle de shard1
+        self.assertEqual(self.client.get(reverse("sync"), {"since": token}).status_code, 410)
+        response = self.client.get(reverse("sync"))
+        self.assertIn(("project", self.project.id), [(change["type"], change["id"]) for change in response.data["changes"]])
+        self.assertEqual(decode_token(response.data["token"])[1], "shard1")
+
+
+@override_settings(DATABASE_SHARDS=SHARDS, DATABASE_SHARD_MAP_TTL=0)
+class ShardSyncTest(Shard1Database, TransactionTestCase):
+
+    client_class = APIClient
+    shard1_file = True
+
+    def setUp(self):
+        seed_ids("shard1")
+        shard_map.invalidate()
+        company = Client.objects.create(name="Meridien", domain="meridien.fr", shard="shard1")
+        with using_shard("shard1"):
+            self.alicia = create_user("Alicia", company)
+            self.issue = create_project(self.alicia, "GeoNode", issues=1).issues.get()
+        access = TenantTokenObtainPairSerializer.get_token(self.alicia).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def sync(self, token=None):
+        response = self.client.get(reverse("sync"), {"since": token} if token else {})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertIsNone(response.data["next"])
+        return response.data["changes"], response.data["token"]
+
+    def test_slow_transaction_is_read_after_the_token(self):
+        _, token = self.sync()
+        written, release = threading.Event(), threading.Event()
+
+        def write():
+            try:
+                with using_shard("shard1"), transaction.atomic(using="shard1"):
+                    Comment.objects.create(description="Commentaire lent", issue=self.issue, author=self.alicia)
+                    written.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            self.assertTrue(written.wait(10))
+            # écrit avant ce jeton, validé après
+            changes, token = self.sync(token)
+            self.assertEqual(changes, [])
+        finally:
+            release.set()
+            writer.join()
+
+        changes, _ = self.sync(token)
+        self.assertEqual([(change["type"], change["data"]["description"]) for change in changes if change["type"] == "comment"], [
+            ("comment", "Commentaire lent"),
+        ])
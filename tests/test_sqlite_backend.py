@@ -0,0 +1,107 @@
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class TunedSQLiteBackendTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = str(directory / "db.sqlite3")
+
+    def wrapper(self, alias="tuned", **options):
+        settings_dict = {
+            **connection.settings_dict,
+            "ENGINE": "config.sqlite",
+            "NAME": self.path,
+            "CONN_MAX_AGE": None,
+            "OPTIONS": options,
+        }
+        wrapper = load_backend("config.sqlite").DatabaseWrapper(settings_dict, alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_on_connection(self):
+        wrapper = self.wrapper()
+
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
+        self.assertEqual(self.pragma(wrapper, "synchronous"), 1)
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 5000)
+        self.assertEqual(self.pragma(wrapper, "temp_store"), 2)
+        self.assertEqual(self.pragma(wrapper, "cache_size"), -64000)
+        self.assertEqual(wrapper.transaction_mode, "IMMEDIATE")
+
+    def test_options_override_defaults(self):
+        wrapper = self.wrapper(pragmas={"busy_timeout": 250, "mmap_size": None}, transaction_mode="DEFERRED")
+
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 250)
+        self.assertEqual(self.pragma(wrapper, "mmap_size"), 0)
+        self.assertEqual(wrapper.transaction_mode, "DEFERRED")
+
+    def test_transactions_take_the_write_lock_at_begin(self):
+        writer = self.wrapper("writer")
+        other = self.wrapper("other", pragmas={"busy_timeout": 0})
+        with writer.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+
+        # BEGIN IMMEDIATE sans aucune requête : le verrou est déjà pris
+        writer._start_transaction_under_autocommit()
+        try:
+            with self.assertRaisesMessage(OperationalError, "database is locked"):
+                with other.cursor() as cursor:
+                    cursor.execute("INSERT INTO item DEFAULT VALUES")
+        finally:
+            writer.connection.rollback()
+
+    def test_optimize_runs_periodically_on_persistent_connections(self):
+        wrapper = self.wrapper(optimize_interval=60)
+        wrapper.ensure_connection()
+
+        with CaptureQueriesContext(wrapper) as queries:
+            wrapper.close_if_unusable_or_obsolete()
+        self.assertEqual(len(queries), 0)
+
+        wrapper.optimized_at -= 60
+        with CaptureQueriesContext(wrapper) as queries:
+            wrapper.close_if_unusable_or_obsolete()
+        self.assertEqual([query["sql"] for query in queries], ["PRAGMA optimize"])
+        self.assertIsNotNone(wrapper.connection)
+
+
+    def test_broken_connection_is_closed_without_optimize(self):
+        wrapper = self.wrapper(optimize_interval=60)
+        wrapper.ensure_connection()
+        wrapper.optimized_at -= 60
+        raw = wrapper.connection
+        broken = mock.Mock(execute=mock.Mock(side_effect=sqlite3.OperationalError("disk I/O error")))
+        wrapper.connection = broken
+
+        wrapper.close()
+
+        broken.close.assert_called_once_with()
+        self.assertIsNone(wrapper.connection)
+        raw.close()
+
+class OptimizeDatabaseCommandTest(TestCase):
+
+    def test_analyze_collects_statistics(self):
+        call_command("optimize_database", stdout=StringIO())
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            self.assertEqual(cursor.fetchone()[0], 1)